@@ -0,0 +1,63 @@
+import argparse
+import time
+
+import numpy as np
+
+import scripts.game_logic as GameLogic
+
+
+
+def time_call(function, *args, **kwargs) -> tuple[float, object]:
+    '''Calls a function once and measures its duration
+
+    :param function: The function to call
+    :return tuple[float, object]: The duration in seconds and the value returned by the function
+    '''
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def benchmark(grid_size: tuple[int, int], density: float, seed: int) -> dict:
+    '''Compares the flood fill of discover_cell with the labelled region reveal on the largest region of a grid
+
+    :param tuple[int, int] grid_size: The size of the grid, using format (width, height)
+    :param float density: The proportion of cells containing a mine
+    :param int seed: The seed of the random generator
+    :return dict: The measured durations, in seconds
+    '''
+    rng = np.random.default_rng(seed)
+    grid = GameLogic.create_grid(grid_size, int(grid_size[0] * grid_size[1] * density), rng=rng)
+    neighbours_grid = GameLogic.create_neighbours_grid(grid)
+
+    label_time, regions = time_call(GameLogic.Regions, neighbours_grid)
+    x, y = regions.members(np.argmax(regions.sizes[1:]) + 1)[0]
+
+    discovered_grid = GameLogic.create_discovered_grid(grid)
+    loop_time, (_, loop_cells) = time_call(GameLogic.discover_cell, grid, neighbours_grid, discovered_grid, x, y)
+
+    discovered_grid = GameLogic.create_discovered_grid(grid)
+    reveal_time, (_, region_cells) = time_call(GameLogic.discover_cell, grid, neighbours_grid, discovered_grid, x, y, regions=regions)
+
+    assert len(loop_cells) == len(region_cells)
+    return {
+        'cells': grid.size,
+        'revealed': len(region_cells),
+        'loop': loop_time,
+        'label': label_time,
+        'reveal': reveal_time,
+    }
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the reveal of a large region')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 2000], help='the side lengths of the square grids')
+    parser.add_argument('--density', type=float, default=.05, help='the proportion of cells containing a mine')
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the random generator')
+    args = parser.parse_args()
+
+    print(f'{"cells":>10} {"revealed":>10} {"loop (s)":>10} {"label (s)":>10} {"reveal (s)":>10} {"speedup":>8}')
+    for size in args.sizes:
+        r = benchmark((size, size), args.density, args.seed)
+        print(f'{r["cells"]:>10} {r["revealed"]:>10} {r["loop"]:>10.3f} {r["label"]:>10.3f} {r["reveal"]:>10.4f} {r["loop"] / (r["label"] + r["reveal"]):>7.1f}x')
@@ -0,0 +1,119 @@
+import argparse
+import io
+import time
+
+import numpy as np
+
+import scripts.engine as Engine
+import scripts.game_logic as GameLogic
+import scripts.replay as Replay
+
+
+
+def create_archive(game_count: int, grid_size: tuple[int, int], mine_count: int, mistake_rate: float, seed: int) -> bytes:
+    '''Plays games with the batch engine and records them in an archive
+    Each move discovers a random safe cell, or a random cell with a probability of mistake_rate, so that the games are
+    as long as real games and end with every result
+
+    :param int game_count: The number of games
+    :param tuple[int, int] grid_size: The size of the grids, using format (width, height)
+    :param int mine_count: The number of mines in each grid
+    :param float mistake_rate: The probability of a move to discover a random cell
+    :param int seed: The seed of the random generator
+    :return bytes: The archive
+    '''
+    rng = np.random.default_rng(seed)
+    seeds = rng.integers(2**63, size=game_count)
+    xs, ys = rng.integers(grid_size[0], size=game_count), rng.integers(grid_size[1], size=game_count)
+    mines = np.stack([
+        GameLogic.create_mine_mask(grid_size, mine_count, GameLogic.safe_zone(int(x), int(y), grid_size, mine_count), np.random.default_rng(int(s)))
+        for s, x, y in zip(seeds, xs, ys)
+    ])
+
+    moves = [[(0, Engine.DISCOVER, int(x), int(y))] for x, y in zip(xs, ys)]
+    results = np.full(game_count, Replay.RESULT_NONE)
+
+    engine = Engine.BatchEngine(game_count, grid_size, mine_count)
+    outcome = engine.load(mines, xs, ys)
+    tick = 0
+    while True:
+        results[outcome.hit_mine] = Replay.RESULT_LOST
+        results[outcome.won] = Replay.RESULT_WON
+        playing = np.flatnonzero(~engine.finished)
+        if len(playing) == 0:
+            break
+
+        # Picks a random safe hidden cell of each board, or a random cell
+        tick += 1
+        scores = rng.random(engine.grid.shape)
+        safe = (engine.grid == 0) & (engine.discovered_grid != 2)
+        scores[~safe & (rng.random(game_count) >= mistake_rate)[:, None, None]] = -1
+        cells = scores.reshape(game_count, -1).argmax(axis=1)
+        cx, cy = np.unravel_index(cells, grid_size)
+        for i in playing.tolist():
+            moves[i].append((tick, Engine.DISCOVER, int(cx[i]), int(cy[i])))
+        outcome = engine.step(np.full(game_count, Engine.DISCOVER), cx, cy)
+
+    # The games are written one after the other, as they would be in an archive of recorded games
+    archive = io.BytesIO()
+    for s, game, result in zip(seeds.tolist(), moves, results.tolist()):
+        writer = Replay.ReplayWriter(archive, grid_size, mine_count, s)
+        for move in game:
+            writer.record(*move)
+        writer.close(game[-1][0], result)
+    return archive.getvalue()
+
+
+def benchmark(game_count: int, grid_size: tuple[int, int], mine_count: int, mistake_rate: float, seed: int, batch_size: int) -> dict:
+    '''Measures the time taken to read and verify an archive, game by game with game_logic and in batches with the engine
+
+    :param int game_count: The number of games
+    :param tuple[int, int] grid_size: The size of the grids, using format (width, height)
+    :param int mine_count: The number of mines in each grid
+    :param float mistake_rate: The probability of a move to discover a random cell
+    :param int seed: The seed of the random generator
+    :param int batch_size: The number of replays played at once by the engine
+    :return dict: The durations in seconds, the size of the archive and the number of mismatches
+    '''
+    archive = create_archive(game_count, grid_size, mine_count, mistake_rate, seed)
+
+    start = time.perf_counter()
+    replays = list(Replay.read_replays(io.BytesIO(archive)))
+    read = time.perf_counter() - start
+
+    start = time.perf_counter()
+    mismatches = sum(Replay.simulate(r) != r.result for r in replays)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, batch_mismatches = Replay.verify(iter(replays), batch_size)
+    batch = time.perf_counter() - start
+
+    return {
+        'games': len(replays),
+        'moves': sum(len(r.records) for r in replays),
+        'bytes': len(archive),
+        'read': read,
+        'single': single,
+        'batch': batch,
+        'mismatches': mismatches + len(batch_mismatches),
+    }
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the reading and the verification of replays')
+    parser.add_argument('--games', type=int, default=2000, help='the number of games of the archive')
+    parser.add_argument('--width', type=int, default=16, help='the width of the grids')
+    parser.add_argument('--height', type=int, default=16, help='the height of the grids')
+    parser.add_argument('--mines', type=int, default=40, help='the number of mines in each grid')
+    parser.add_argument('--mistake-rate', type=float, default=.01, help='the probability of a move to discover a random cell')
+    parser.add_argument('--batch-size', type=int, default=1024, help='the number of replays played at once by the engine')
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the random generator')
+    args = parser.parse_args()
+
+    r = benchmark(args.games, (args.width, args.height), args.mines, args.mistake_rate, args.seed, args.batch_size)
+    print(f'{r["games"]} games, {r["moves"]} moves, {r["bytes"] / 1024:.1f} KiB, {r["mismatches"]} mismatch(es)')
+    print(f'{"":<12} {"time (s)":>10} {"games/s":>10}')
+    for name in ('read', 'single', 'batch'):
+        print(f'{name:<12} {r[name]:>10.3f} {r["games"] / max(r[name], 1e-9):>10.0f}')
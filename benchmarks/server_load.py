@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+import scripts.engine as Engine
+import scripts.server as Server
+
+
+
+async def play(client: Server.Client, grid_size: tuple[int, int], mine_count: int, flag_rate: float, rng: np.random.Generator, deadline: float, latencies: list[float]) -> dict:
+    '''Plays games on a connection until the deadline, choosing random hidden cells from what the server sent
+
+    :param Server.Client client: The connection to the server
+    :param tuple[int, int] grid_size: The size of the grids, using format (width, height)
+    :param int mine_count: The number of mines in each grid
+    :param float flag_rate: The probability of an action to flag a cell instead of discovering it
+    :param np.random.Generator rng: The random generator to use
+    :param float deadline: The time at which to stop, from time.perf_counter
+    :param list[float] latencies: The time taken by each action, in seconds, appended to
+    :return dict: The number of games played, won and lost
+    '''
+    counts = {'games': 0, 'won': 0, 'lost': 0}
+    while time.perf_counter() < deadline:
+        game_id = await client.new_game(grid_size, mine_count)
+        view = np.full(grid_size, Server.HIDDEN, dtype=np.int8) # What the client knows of the grid
+        status = Server.PLAYING
+        first = True
+
+        while status == Server.PLAYING and time.perf_counter() < deadline:
+            hidden = np.flatnonzero(view == Server.HIDDEN)
+            x, y = np.unravel_index(hidden[rng.integers(len(hidden))], grid_size)
+            action = Engine.FLAG if not first and rng.random() < flag_rate else Engine.DISCOVER
+
+            start = time.perf_counter()
+            status, cells = await client.act(game_id, action, int(x), int(y))
+            latencies.append(time.perf_counter() - start)
+            view[cells['x'], cells['y']] = cells['value']
+            first = False
+
+        await client.close_game(game_id)
+        counts['games'] += 1
+        counts['won'] += status == Server.WON
+        counts['lost'] += status == Server.LOST
+    return counts
+
+
+async def benchmark(host: str | None, port: int, connections: int, duration: float, grid_size: tuple[int, int], mine_count: int, flag_rate: float, seed: int) -> dict:
+    '''Measures the actions per second and the latency that a server sustains under many concurrent connections
+    The server is started in the same process when no host is given, in which case it shares the CPU with the clients
+
+    :param str host: The address of the server, None to start one
+    :param int port: The port of the server
+    :param int connections: The number of concurrent connections, each one playing one game at a time
+    :param float duration: The duration of the measurement in seconds
+    :param tuple[int, int] grid_size: The size of the grids, using format (width, height)
+    :param int mine_count: The number of mines in each grid
+    :param float flag_rate: The probability of an action to flag a cell instead of discovering it
+    :param int seed: The seed of the random generators
+    :return dict: The throughput, the latency percentiles in seconds and the number of games
+    '''
+    listener = None
+    if host is None:
+        listener = await Server.GameServer(seed=seed).serve('127.0.0.1', 0)
+        host, port = listener.sockets[0].getsockname()[:2]
+
+    clients = [await Server.Client.connect(host, port) for _ in range(connections)]
+    rngs = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(connections)]
+    latencies = []
+    start = time.perf_counter()
+    counts = await asyncio.gather(*(
+        play(client, grid_size, mine_count, flag_rate, rng, start + duration, latencies) for client, rng in zip(clients, rngs)
+    ))
+    elapsed = time.perf_counter() - start
+
+    for client in clients:
+        await client.close()
+    if listener is not None:
+        listener.close()
+        await listener.wait_closed()
+
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return {
+        'actions': len(latencies),
+        'actions_per_second': len(latencies) / elapsed,
+        'p50': float(p50),
+        'p99': float(p99),
+        'max': float(max(latencies)),
+        **{key: sum(c[key] for c in counts) for key in ('games', 'won', 'lost')},
+    }
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the game server with many concurrent clients')
+    parser.add_argument('--host', help='the address of a running server, a server being started in the process if omitted')
+    parser.add_argument('--port', type=int, default=8765, help='the port of the running server')
+    parser.add_argument('--connections', type=int, default=64, help='the number of concurrent connections')
+    parser.add_argument('--duration', type=float, default=10., help='the duration of the measurement in seconds')
+    parser.add_argument('--width', type=int, default=16, help='the width of the grids')
+    parser.add_argument('--height', type=int, default=16, help='the height of the grids')
+    parser.add_argument('--mines', type=int, default=40, help='the number of mines in each grid')
+    parser.add_argument('--flag-rate', type=float, default=.1, help='the probability of an action to flag a cell')
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the random generators')
+    args = parser.parse_args()
+
+    r = asyncio.run(benchmark(args.host, args.port, args.connections, args.duration, (args.width, args.height), args.mines, args.flag_rate, args.seed))
+    print(f'{r["actions"]} actions, {r["actions_per_second"]:.0f} actions/s')
+    print(f'latency p50 {r["p50"] * 1000:.2f}ms, p99 {r["p99"] * 1000:.2f}ms, max {r["max"] * 1000:.2f}ms')
+    print(f'{r["games"]} games, {r["won"]} won, {r["lost"]} lost')
@@ -0,0 +1,76 @@
+import argparse
+import time
+
+import numpy as np
+
+import scripts.game_logic as GameLogic
+from scripts.solver import Solver
+
+
+
+def create_frontier(length: int, depth: int, density: float, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray, int]:
+    '''Creates a grid whose safe cells are discovered up to a straight frontier
+
+    :param int length: The length of the frontier, which is the height of the grid
+    :param int depth: The number of columns on each side of the frontier
+    :param float density: The proportion of cells containing a mine
+    :param np.random.Generator rng: The random generator to use
+    :return tuple[np.ndarray, np.ndarray, int]: The grid of neighbours, the grid of discovered cells and the number of mines
+    '''
+    grid_size = (2 * depth, length)
+    mine_count = int(grid_size[0] * grid_size[1] * density)
+    grid = GameLogic.create_grid(grid_size, mine_count, rng=rng)
+    neighbours_grid = GameLogic.create_neighbours_grid(grid)
+    discovered_grid = GameLogic.create_discovered_grid(grid)
+    discovered_grid[:depth][grid[:depth] == 0] = 2
+    return neighbours_grid, discovered_grid, mine_count
+
+
+def benchmark(length: int, depth: int, density: float, seed: int, repeats: int) -> dict:
+    '''Measures the time taken to solve a grid with a wide frontier, with an empty cache and with the cache filled
+
+    :param int length: The length of the frontier
+    :param int depth: The number of columns on each side of the frontier
+    :param float density: The proportion of cells containing a mine
+    :param int seed: The seed of the random generator
+    :param int repeats: The number of grids to solve
+    :return dict: The median durations, in seconds, and the number of independent components of the frontier
+    '''
+    rng = np.random.default_rng(seed)
+    cold, warm, components = [], [], []
+    for _ in range(repeats):
+        neighbours_grid, discovered_grid, mine_count = create_frontier(length, depth, density, rng)
+        solver = Solver()
+
+        start = time.perf_counter()
+        solver.solve(neighbours_grid, discovered_grid, mine_count)
+        cold.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        solver.solve(neighbours_grid, discovered_grid, mine_count)
+        warm.append(time.perf_counter() - start)
+
+        components.append(len(solver.cache))
+
+    return {
+        'length': length,
+        'components': int(np.median(components)),
+        'cold': float(np.median(cold)),
+        'warm': float(np.median(warm)),
+    }
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the solver on grids with a wide frontier')
+    parser.add_argument('--lengths', type=int, nargs='+', default=[16, 64, 256, 1024], help='the lengths of the frontiers')
+    parser.add_argument('--depth', type=int, default=8, help='the number of columns on each side of the frontier')
+    parser.add_argument('--density', type=float, default=.2, help='the proportion of cells containing a mine')
+    parser.add_argument('--repeats', type=int, default=5, help='the number of grids to solve for each length')
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the random generator')
+    args = parser.parse_args()
+
+    print(f'{"length":>8} {"components":>11} {"cold (ms)":>10} {"warm (ms)":>10}')
+    for length in args.lengths:
+        r = benchmark(length, args.depth, args.density, args.seed, args.repeats)
+        print(f'{r["length"]:>8} {r["components"]:>11} {r["cold"] * 1000:>10.2f} {r["warm"] * 1000:>10.2f}')
@@ -0,0 +1,244 @@
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy') # Runs on machines without a display or a sound card
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pygame
+
+import scripts.assets as Assets
+import scripts.game_logic as GameLogic
+import scripts.renderer as Renderer
+from scripts.board import Board
+from scripts.camera import Camera
+
+
+
+def setup_create_grid(grid_size: tuple[int, int], mine_count: int, rng: np.random.Generator, cell_size: int):
+    '''Prepares the generation of a grid'''
+    return lambda: GameLogic.create_grid(grid_size, mine_count, rng=rng)
+
+
+def setup_create_neighbours_grid(grid_size: tuple[int, int], mine_count: int, rng: np.random.Generator, cell_size: int):
+    '''Prepares the count of the neighbouring mines of a grid'''
+    grid = GameLogic.create_grid(grid_size, mine_count, rng=rng)
+    return lambda: GameLogic.create_neighbours_grid(grid)
+
+
+def setup_discover_cell(grid_size: tuple[int, int], mine_count: int, rng: np.random.Generator, cell_size: int, regions: bool = True):
+    '''Prepares the discovery of the largest region of a grid, with the labelled regions or with the flood fill'''
+    grid = GameLogic.create_grid(grid_size, mine_count, rng=rng)
+    neighbours_grid = GameLogic.create_neighbours_grid(grid)
+    labelled = GameLogic.Regions(neighbours_grid)
+    if labelled.region_count: # Clicks in the largest region, which is the worst case
+        x, y = labelled.members(np.argmax(labelled.sizes[1:]) + 1)[0]
+    else:
+        x, y = np.argwhere(grid == 0)[0]
+    return lambda: GameLogic.discover_cell(grid, neighbours_grid, GameLogic.create_discovered_grid(grid), x, y, regions=labelled if regions else None)
+
+
+def setup_flood_fill(grid_size: tuple[int, int], mine_count: int, rng: np.random.Generator, cell_size: int):
+    '''Prepares the discovery of the largest region of a grid with the flood fill'''
+    return setup_discover_cell(grid_size, mine_count, rng, cell_size, regions=False)
+
+
+def setup_check_win(grid_size: tuple[int, int], mine_count: int, rng: np.random.Generator, cell_size: int):
+    '''Prepares the win check of a partly discovered grid'''
+    grid = GameLogic.create_grid(grid_size, mine_count, rng=rng)
+    discovered_grid = rng.integers(0, 3, grid_size)
+    return lambda: GameLogic.check_win(grid, discovered_grid, mine_count)
+
+
+def create_render_state(grid_size: tuple[int, int], mine_count: int, rng: np.random.Generator, cell_size: int) -> tuple:
+    '''Creates a surface, the textures and a grid of which a random half of the cells is discovered'''
+    grid = GameLogic.create_grid(grid_size, mine_count, rng=rng)
+    neighbours_grid = GameLogic.create_neighbours_grid(grid)
+    discovered_grid = np.where(rng.random(grid_size) < .5, 2, rng.integers(0, 2, grid_size))
+    screen = pygame.Surface((grid_size[0] * cell_size, grid_size[1] * cell_size))
+    textures = Assets.Textures(cell_size, pygame.font.SysFont('Arial', cell_size, bold=True))
+    return screen, grid, neighbours_grid, discovered_grid, textures
+
+
+def setup_render_grid(grid_size: tuple[int, int], mine_count: int, rng: np.random.Generator, cell_size: int):
+    '''Prepares the rendering of a partly discovered grid'''
+    screen, grid, neighbours_grid, discovered_grid, textures = create_render_state(grid_size, mine_count, rng, cell_size)
+    return lambda: Renderer.render_grid(screen, grid, neighbours_grid, discovered_grid, cell_size, textures)
+
+
+def setup_render_entire_grid(grid_size: tuple[int, int], mine_count: int, rng: np.random.Generator, cell_size: int):
+    '''Prepares the rendering of a grid at the end of a game'''
+    screen, grid, neighbours_grid, _, textures = create_render_state(grid_size, mine_count, rng, cell_size)
+    return lambda: Renderer.render_entire_grid(screen, grid, neighbours_grid, cell_size, textures)
+
+
+def create_board_state(grid_size: tuple[int, int], mine_count: int, rng: np.random.Generator) -> Board:
+    '''Creates a board of which a random half of the cells is discovered'''
+    grid = GameLogic.create_grid(grid_size, mine_count, rng=rng)
+    discovered_grid = np.where(rng.random(grid_size) < .5, 2, rng.integers(0, 2, grid_size))
+    return Board.from_grids(grid, GameLogic.create_neighbours_grid(grid), discovered_grid)
+
+
+def setup_render_lod(grid_size: tuple[int, int], mine_count: int, rng: np.random.Generator, cell_size: int):
+    '''Prepares the rendering of a 1280x960 screen of a board zoomed out to 2 pixels per cell, drawn as plain colors'''
+    board = create_board_state(grid_size, mine_count, rng)
+    screen = pygame.Surface((1280, 960))
+    camera = Camera(screen.get_size(), 2, grid_size, min_cell_size=1)
+
+    def render():
+        x0, y0, x1, y1 = camera.visible_cells()
+        Renderer.render_view(screen, *board.window(x0, y0, x1, y1), (x0, y0), camera, None)
+    return render
+
+
+def setup_render_minimap(grid_size: tuple[int, int], mine_count: int, rng: np.random.Generator, cell_size: int):
+    '''Prepares the rendering of the minimap of a board'''
+    board = create_board_state(grid_size, mine_count, rng)
+    screen = pygame.Surface((1280, 960))
+    return lambda: Renderer.render_minimap(screen, Renderer.sample_tiles(board.grid, board.neighbours_grid, board.discovered_grid, 192), (.25, .25, .5, .5), 192)
+
+
+def setup_animate_reveal(grid_size: tuple[int, int], mine_count: int, rng: np.random.Generator, cell_size: int):
+    '''Prepares a cascade revealing every discovered cell of a board, advanced frame by frame at 60 frames per second
+    until it ends, without drawing it. The animation is taken from the pool, as in the game
+    '''
+    cells = np.argwhere(create_board_state(grid_size, mine_count, rng).discovered)
+    scheduler = Renderer.AnimationScheduler()
+
+    def animate():
+        scheduler.reveal(cells, (grid_size[0] // 2, grid_size[1] // 2))
+        while scheduler.active:
+            scheduler.update(1 / 60)
+    return animate
+
+
+# Each operation is prepared by a function taking the grid size, the mine count, a random generator and the cell size,
+# and returning the call to measure. The preparation is not measured
+OPERATIONS = {
+    'create_grid': setup_create_grid,
+    'create_neighbours_grid': setup_create_neighbours_grid,
+    'discover_cell': setup_discover_cell,
+    'discover_cell_flood_fill': setup_flood_fill,
+    'check_win': setup_check_win,
+    'render_grid': setup_render_grid,
+    'render_entire_grid': setup_render_entire_grid,
+    'render_lod': setup_render_lod,
+    'render_minimap': setup_render_minimap,
+    'animate_reveal': setup_animate_reveal,
+}
+RENDER_OPERATIONS = ('render_grid', 'render_entire_grid')
+
+
+
+def measure(call, repeats: int) -> tuple[float, int]:
+    '''Measures the duration and the peak memory of a call
+    The memory is measured on a separate call, since tracing the allocations slows the call down
+
+    :param call: The call to measure
+    :param int repeats: The number of timed calls
+    :return tuple[float, int]: The median duration in seconds, and the peak memory allocated during the call in bytes
+    '''
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        call()
+        durations.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return float(np.median(durations)), peak
+
+
+def run(operations: list[str], sizes: list[int], densities: list[float], repeats: int, seed: int, cell_size: int, max_render_cells: int) -> list[dict]:
+    '''Measures every operation on every size and density of grid
+
+    :param list[str] operations: The names of the operations to measure
+    :param list[int] sizes: The side lengths of the square grids
+    :param list[float] densities: The proportions of cells containing a mine
+    :param int repeats: The number of timed calls of each measurement
+    :param int seed: The seed of the random generator
+    :param int cell_size: The size of each cell, for the rendering operations
+    :param int max_render_cells: The number of cells above which the rendering operations are skipped
+    :return list[dict]: The measurements
+    '''
+    results = []
+    for name in operations:
+        for size in sizes:
+            if name in RENDER_OPERATIONS and size * size > max_render_cells:
+                continue
+            for density in densities:
+                rng = np.random.default_rng(seed)
+                call = OPERATIONS[name]((size, size), int(size * size * density), rng, cell_size)
+                duration, peak = measure(call, repeats)
+                results.append({'operation': name, 'size': size, 'density': density, 'time': duration, 'peak_memory': peak})
+                print(f'{name:<26} {size:>6} {density:>8.2f} {duration * 1000:>12.3f} {peak / 1024:>12.1f}', file=sys.stderr)
+    return results
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> list[dict]:
+    '''Compares measurements with a baseline
+
+    :param list[dict] results: The new measurements
+    :param list[dict] baseline: The measurements of the baseline
+    :param float tolerance: The relative increase of time or memory above which a measurement is a regression
+    :return list[dict]: The measurements that regressed, with their ratios to the baseline
+    '''
+    reference = {(r['operation'], r['size'], r['density']): r for r in baseline}
+    regressions = []
+    for r in results:
+        base = reference.get((r['operation'], r['size'], r['density']))
+        if base is None:
+            continue
+        time_ratio = r['time'] / base['time'] if base['time'] > 0 else 1.
+        memory_ratio = r['peak_memory'] / base['peak_memory'] if base['peak_memory'] > 0 else 1.
+        if time_ratio > 1 + tolerance or memory_ratio > 1 + tolerance:
+            regressions.append({**r, 'time_ratio': time_ratio, 'memory_ratio': memory_ratio})
+    return regressions
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the hot paths of game_logic and renderer')
+    parser.add_argument('--operations', nargs='+', default=list(OPERATIONS), choices=list(OPERATIONS), help='the operations to measure')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[32, 128, 512], help='the side lengths of the square grids')
+    parser.add_argument('--densities', type=float, nargs='+', default=[.1, .2], help='the proportions of cells containing a mine')
+    parser.add_argument('--repeats', type=int, default=5, help='the number of timed calls of each measurement')
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the random generator')
+    parser.add_argument('--cell-size', type=int, default=16, help='the size of each cell, for the rendering operations')
+    parser.add_argument('--max-render-cells', type=int, default=128 * 128, help='the number of cells above which the rendering operations are skipped')
+    parser.add_argument('--output', help='the JSON file to write the results to')
+    parser.add_argument('--compare', help='the JSON file of a baseline to compare the results with')
+    parser.add_argument('--tolerance', type=float, default=.2, help='the relative increase above which a measurement is a regression')
+    args = parser.parse_args()
+
+    pygame.font.init()
+    print(f'{"operation":<26} {"size":>6} {"density":>8} {"time (ms)":>12} {"peak (KiB)":>12}', file=sys.stderr)
+    results = run(args.operations, args.sizes, args.densities, args.repeats, args.seed, args.cell_size, args.max_render_cells)
+
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pygame': pygame.version.ver,
+        'machine': platform.machine(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for r in regressions:
+            print(f'regression: {r["operation"]} size={r["size"]} density={r["density"]} '
+                  f'time x{r["time_ratio"]:.2f} memory x{r["memory_ratio"]:.2f}')
+        print(f'{len(regressions)} regression(s) against {args.compare}')
+        sys.exit(1 if regressions else 0)
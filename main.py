@@ -1,112 +1,481 @@
+import time
+START_TIME = time.perf_counter() # Measured before the imports, which are part of the startup time
+
+import os
+import argparse
 import pygame
 import configparser
 
 import scripts.assets as Assets
+import scripts.engine as Engine
 import scripts.game_logic as GameLogic
+from scripts.board import Board
+from scripts.camera import Camera
+from scripts.history import History
+import scripts.profiler as Profiler
 import scripts.renderer as Renderer
+import scripts.replay as Replay
+import scripts.topology as Topology
 
 import numpy as np
 
 
+CAPTION = 'minesweeper'
+GUESS_CAPTION = 'minesweeper - no grid without guessing was found, this one may need a guess' # Shown until the next game
+GENERATOR_POLL_INTERVAL = 100 # The time between two collections of the boards prepared in the background, in milliseconds
+HINT_POLL_INTERVAL = 20 # The time between two checks for the hints of the worker, in milliseconds
+# The chunked boards, the generator and the hints are imported when they are enabled, since the generator pulls in the solver
+
+
 
-def init_config() -> None:
-    '''Reads the config.ini file'''
+def init_config(replay: Replay.Replay | None = None) -> None:
+    '''Reads the config.ini file
+
+    :param Replay.Replay replay: The replay to play, whose grid replaces the grid of the config (optional)
+    '''
     config = configparser.ConfigParser()
-    config.read('config.ini')
+    config.read(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.ini'))
 
-    global GRID_WIDTH, GRID_HEIGHT, MINE_COUNT, CELL_SIZE, GAME_FPS, SFX_VOLUME, MUSIC_VOLUME
+    global GRID_WIDTH, GRID_HEIGHT, TOPOLOGY, INFINITE, CHUNK_SIZE, CHUNK_CACHE_SIZE, MINE_COUNT, DEBUG, NO_GUESS, GENERATOR_WORKERS, QUEUE_SIZE, CELL_SIZE, MIN_CELL_SIZE, SHOW_MINIMAP, MINIMAP_SIZE, ANIMATIONS, SHOW_HINTS, HISTORY_BUDGET, CHECKPOINT_INTERVAL, WINDOW_WIDTH, WINDOW_HEIGHT, GAME_FPS, EVENT_DRIVEN, SFX_VOLUME, MUSIC_VOLUME, RECORD_REPLAYS, REPLAY_DIRECTORY, PROFILE, SHOW_HUD, PROFILE_HISTORY, PROFILE_OUTPUT, CAPTURE_DIRECTORY
     GRID_WIDTH      = config.getint('grid', 'width')
     GRID_HEIGHT     = config.getint('grid', 'height')
+    TOPOLOGY        = config.get('grid', 'topology')
+    INFINITE        = config.getboolean('grid', 'infinite')
+    CHUNK_SIZE      = config.getint('grid', 'chunk_size')
+    CHUNK_CACHE_SIZE = config.getint('grid', 'chunk_cache_size')
     MINE_COUNT      = config.getint('game', 'mine_count')
+    DEBUG           = config.getboolean('game', 'debug')
+    NO_GUESS        = config.getboolean('generator', 'no_guess')
+    GENERATOR_WORKERS = config.getint('generator', 'workers')
+    QUEUE_SIZE      = config.getint('generator', 'queue_size')
+    if replay is not None: # The recorded games are played on a bounded grid, without the generator
+        (GRID_WIDTH, GRID_HEIGHT), MINE_COUNT, TOPOLOGY = replay.grid_size, replay.mine_count, replay.topology
+        INFINITE = NO_GUESS = False
+    if INFINITE and TOPOLOGY != Topology.SQUARE:
+        raise ValueError('An infinite grid can only have a square topology')
     CELL_SIZE       = config.getint('renderer', 'cell_size')
+    MIN_CELL_SIZE   = config.getint('renderer', 'min_cell_size')
+    SHOW_MINIMAP    = config.getboolean('renderer', 'minimap')
+    MINIMAP_SIZE    = config.getint('renderer', 'minimap_size')
+    ANIMATIONS      = config.getboolean('renderer', 'animations')
+    SHOW_HINTS      = config.getboolean('hints', 'enabled')
+    HISTORY_BUDGET  = int(config.getfloat('history', 'budget_mb') * (1 << 20))
+    CHECKPOINT_INTERVAL = config.getint('history', 'checkpoint_interval')
+    WINDOW_WIDTH    = config.getint('renderer', 'window_width') or GRID_WIDTH * CELL_SIZE
+    WINDOW_HEIGHT   = config.getint('renderer', 'window_height') or GRID_HEIGHT * CELL_SIZE + (CELL_SIZE // 2 if TOPOLOGY == Topology.HEX else 0)
     GAME_FPS        = config.getint('renderer', 'frames_per_second')
+    EVENT_DRIVEN    = config.getboolean('renderer', 'event_driven')
     SFX_VOLUME      = config.getfloat('audio', 'sound_effects_volume')
     MUSIC_VOLUME    = config.getfloat('audio', 'music_volume')
-
-
-
-
-def game_loop() -> None:
-    '''Main game loop'''
-    init_config()
-    pygame.init()
-    pygame.mixer.init()
+    RECORD_REPLAYS  = config.getboolean('replay', 'record') and replay is None
+    REPLAY_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), config.get('replay', 'directory'))
+    PROFILE         = config.getboolean('profiler', 'enabled')
+    SHOW_HUD        = config.getboolean('profiler', 'hud')
+    PROFILE_HISTORY = config.getint('profiler', 'history')
+    PROFILE_OUTPUT  = config.get('profiler', 'output')
+    if PROFILE_OUTPUT and not PROFILE_OUTPUT.endswith(Profiler.OUTPUT_FORMATS): # Checked before playing rather than on exit
+        raise ValueError(f'Unsupported profiler output {PROFILE_OUTPUT}, the file must be a {" or a ".join(Profiler.OUTPUT_FORMATS)} file')
+    CAPTURE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), config.get('profiler', 'capture_directory'))
+
+
+
+
+def game_loop(replay_path: str | None = None) -> None:
+    '''Main game loop
+
+    :param str replay_path: The path of a replay to play instead of letting the player play (optional)
+    '''
+    replay = None
+    if replay_path is not None:
+        with open(replay_path, 'rb') as file:
+            replay = next(Replay.read_replays(file), None)
+        if replay is None:
+            raise ValueError(f'{replay_path} does not contain any replay')
+    init_config(replay)
+    pygame.display.init() # The mixer is initialized by the audio loader, so that audio devices cannot delay the first frame
     pygame.font.init()
 
-    screen = pygame.display.set_mode((
-        GRID_WIDTH * CELL_SIZE,
-        GRID_HEIGHT * CELL_SIZE
-    ))
-    pygame.display.set_caption('minesweeper')
-
-    grid = np.zeros((GRID_WIDTH, GRID_HEIGHT), dtype=int)
-    neighbours_grid = GameLogic.create_neighbours_grid(grid)
-    discovered_grid = GameLogic.create_discovered_grid(grid)
-    number_font = pygame.font.SysFont('Arial', CELL_SIZE, bold=True)
-    text_font = pygame.font.SysFont('Arial', CELL_SIZE*GRID_WIDTH//10, bold=True)
-    textures = Assets.Textures(CELL_SIZE, number_font)
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    pygame.display.set_caption(CAPTION)
+
+    text_font = None # Created at the end of the first game, since looking up the system fonts is slow
+    textures_by_size = {} # The textures of each cell size the camera was zoomed to
+
+    def get_textures(cell_size: int) -> Assets.Textures | None:
+        '''Returns the textures of a cell size, creating them the first time, None for the cells drawn as plain colors'''
+        if cell_size < Renderer.LOD_CELL_SIZE:
+            return None
+        if cell_size not in textures_by_size:
+            textures_by_size[cell_size] = Assets.Textures.load(cell_size)
+        return textures_by_size[cell_size]
+
+    def new_chunked_board() -> 'ChunkedBoard':
+        '''Creates an unbounded board from a random seed, with its first cell discovered'''
+        from scripts.chunked_board import ChunkedBoard
+        board = ChunkedBoard(int(np.random.SeedSequence().entropy), MINE_COUNT / (GRID_WIDTH * GRID_HEIGHT), CHUNK_SIZE, CHUNK_CACHE_SIZE)
+        board.discover(0, 0) # The cells around (0, 0) are free of mines
+        return board
+
+    topology = Topology.get_topology(TOPOLOGY, (GRID_WIDTH, GRID_HEIGHT)) # A square board has no table, so it costs nothing
+    # An unbounded board is not zoomed out to plain colors, which would generate thousands of chunks
+    min_cell_size = max(MIN_CELL_SIZE, Renderer.LOD_CELL_SIZE) if INFINITE else MIN_CELL_SIZE
+    camera = Camera(screen.get_size(), CELL_SIZE, None if INFINITE else (GRID_WIDTH, GRID_HEIGHT), min_cell_size, stagger=topology.staggered)
+    board = new_chunked_board() if INFINITE else Board.empty((GRID_WIDTH, GRID_HEIGHT))
+    if INFINITE:
+        camera.center_on(0, 0)
+    textures = get_textures(camera.cell_size)
     sound_effects = Assets.SoundEffects(SFX_VOLUME)
-    music = Assets.Music(SFX_VOLUME)
-
+    music = Assets.Music(MUSIC_VOLUME)
+    Assets.load_audio(sound_effects, music)
+
+    generator = None
+    if NO_GUESS and not INFINITE:
+        from scripts.generator import Generator
+        generator = Generator((GRID_WIDTH, GRID_HEIGHT), MINE_COUNT, GENERATOR_WORKERS, QUEUE_SIZE, topology=TOPOLOGY)
+
+
+    profiler = Profiler.FrameProfiler(PROFILE_HISTORY) if PROFILE else Profiler.NullProfiler()
+    capture = Profiler.ProfileCapture(CAPTURE_DIRECTORY)
+    show_hud = SHOW_HUD and PROFILE
+    hud_font = None
+    hud_rect = pygame.Rect(0, 0, 0, 0) # The area covered by the HUD, which only grows so that it covers its previous text
+    show_minimap = SHOW_MINIMAP and not INFINITE
+
+    def render_minimap() -> pygame.Rect | None:
+        '''Displays the overview of the board when it does not fit on the screen, returning the area drawn on'''
+        width, height = GRID_WIDTH * camera.cell_size, GRID_HEIGHT * camera.cell_size
+        if not show_minimap or (width <= screen.get_width() and height <= screen.get_height()):
+            return None
+        # The whole grid is revealed at the end of the game, which a broadcast array does without allocating it
+        discovered_grid = np.broadcast_to(np.int8(2), board.shape) if has_won or has_lost else board.discovered_grid
+        tiles = Renderer.sample_tiles(board.grid, board.neighbours_grid, discovered_grid, MINIMAP_SIZE)
+        view = (camera.x / width, camera.y / height, screen.get_width() / width, screen.get_height() / height)
+        return Renderer.render_minimap(screen, tiles, view, MINIMAP_SIZE)
+
+    # The moves of the player can be undone, but not those of a replay, nor on an unbounded board which has no grid to restore
+    history = History(HISTORY_BUDGET, CHECKPOINT_INTERVAL) if replay is None and not INFINITE else None
+    history_keys = {pygame.K_z: -1, pygame.K_y: 1} # Undo and redo with the control key held
+
+    def new_state(board: Board) -> GameLogic.GameState:
+        '''Creates the counters of a new board, whose moves the history starts recording'''
+        if history is not None:
+            history.reset(board.discovered_grid)
+        return GameLogic.GameState(board.grid, board.discovered_grid, MINE_COUNT, DEBUG, history)
 
     clock = pygame.time.Clock()
+    pygame.key.set_repeat(200, 1000 // GAME_FPS) # Held arrow keys keep panning without polling the keyboard
+    arrows = {pygame.K_LEFT: (-1, 0), pygame.K_RIGHT: (1, 0), pygame.K_UP: (0, -1), pygame.K_DOWN: (0, 1)}
+
+    animations = Renderer.AnimationScheduler()
+    frame_interval = 1000 // GAME_FPS # The time between two frames while animations are running, in milliseconds
+    last_frame = time.perf_counter()
 
     running = True
-    first_click = True
+    first_click = not INFINITE # An unbounded board starts with its first cell discovered
+    state = None # The counters of the game, created along with the grid
     has_won = False
     has_lost = False
-    while running:
-
-        for event in pygame.event.get():
-
-            if event.type == pygame.QUIT:
-                running = False
-
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-
-                if not has_won and not has_lost: # Check that the game is still running
-                    
-                    x, y = pygame.mouse.get_pos()
-                    x, y = x // CELL_SIZE, y // CELL_SIZE
-
-                    if event.button == 1: # The left mouse button
-
-                        if first_click: # If it is the first clock, generate the grid
-                            grid, neighbours_grid, discovered_grid = GameLogic.create_from_coords(x, y, (GRID_WIDTH, GRID_HEIGHT), MINE_COUNT)
-                            first_click = False
-                            sound_effects.cell_discovered.play()
-
-                        elif GameLogic.discover_cell(grid, neighbours_grid, discovered_grid, x, y)[0]:
+    exploded = None # The mine that ended the game
+    full_redraw = True # The whole screen is drawn on the first frame
+    dirty_cells = []   # The cells that changed since the last frame
+    first_frame = True
+    game_start = pygame.time.get_ticks() # The ticks of the moves are counted from the start of the game
+    recorder = None    # The writer of the replay of the current game
+    replay_index = 0   # The next record of the replay to play
+    show_hints = SHOW_HINTS and not INFINITE
+    hint_worker = None # Started when the hints are first shown
+    hinted_board = None # The board whose visible cells were copied to the worker
+    hints = None       # The probabilities of the cells of the current board, once the worker published them
+    try:
+        while running:
+
+            if EVENT_DRIVEN: # Sleep until something happens, waking up regularly only while the generator or the hints are working
+                timeout = GENERATOR_POLL_INTERVAL if generator is not None and generator.pending else 0
+                if show_hints and hint_worker is not None and hint_worker.pending:
+                    timeout = min(timeout or HINT_POLL_INTERVAL, HINT_POLL_INTERVAL)
+                if replay is not None and replay_index < len(replay.records): # Wakes up for the next move of the replay
+                    delay = max(1, game_start + int(replay.records['tick'][replay_index]) - pygame.time.get_ticks())
+                    timeout = min(timeout or delay, delay)
+                if animations.active or (INFINITE and board.revealing(camera.visible_cells())):
+                    timeout = min(timeout or frame_interval, frame_interval)
+                events = [pygame.event.wait(timeout)] + pygame.event.get()
+            else:
+                events = pygame.event.get()
+            profiler.begin_frame() # The time spent waiting for the events is not part of the frame
+            now = time.perf_counter()
+            dt = now - last_frame if animations.active else 0. # The animations started in this frame start from 0
+            last_frame = now
+
+            moves = [] # The moves of the player or of the replay, as (action, x, y)
+            for event in events:
+
+                if event.type == pygame.QUIT:
+                    running = False
+
+                elif event.type in (pygame.VIDEORESIZE, pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    full_redraw = True
+
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_r: # Start a new game, or the replay again
+                    if recorder is not None: # The current game is abandoned
+                        recorder.close(pygame.time.get_ticks() - game_start, Replay.RESULT_NONE)
+                        recorder = None
+                    game_start = pygame.time.get_ticks()
+                    replay_index = 0
+                    animations.stop()
+
+                    prepared = generator.pop() if generator is not None else None
+                    if INFINITE:
+                        board = new_chunked_board()
+                        camera.center_on(0, 0)
+                    elif prepared is not None: # A prepared grid is ready, with its first cell discovered
+                        board, x, y = prepared
+                        state = new_state(board)
+                        first_click = False
+                        if RECORD_REPLAYS:
+                            recorder = Replay.ReplayWriter.create(REPLAY_DIRECTORY, (GRID_WIDTH, GRID_HEIGHT), MINE_COUNT, 0, board.mines, TOPOLOGY)
+                            recorder.record(0, Engine.DISCOVER, x, y)
+                    else:
+                        board = Board.empty((GRID_WIDTH, GRID_HEIGHT))
+                        state = None
+                        first_click = True
+                    has_won = has_lost = False
+                    exploded = None
+                    full_redraw = True
+                    pygame.display.set_caption(CAPTION)
+
+                elif event.type == pygame.KEYDOWN and state is not None and history is not None and (
+                    event.key in (pygame.K_HOME, pygame.K_END) or (event.key in history_keys and event.mod & pygame.KMOD_CTRL)
+                ): # Undo or redo a move, or go to the first or the last move that was kept
+                    if event.key in history_keys:
+                        position = history.position + history_keys[event.key]
+                    else:
+                        position = history.first if event.key == pygame.K_HOME else history.last
+                    position = min(max(position, history.first), history.last)
+                    if position != history.position:
+                        if recorder is not None: # A replay cannot undo moves, so it stops at the first undo
+                            recorder.close(pygame.time.get_ticks() - game_start, Replay.RESULT_NONE)
+                            recorder = None
+                        if has_won or has_lost: # The whole grid was revealed, and the last move was not sent to the worker
+                            hinted_board = None
+                            full_redraw = True
+                        if animations.active: # The cascades would reveal cells that are hidden again
+                            animations.stop()
+                            full_redraw = True
+                        dirty_cells.append(history.jump(position, state))
+                        exploded = history.exploded
+                        has_lost = exploded is not None
+                        has_won = state.has_won()
+                        full_redraw = full_redraw or has_won or has_lost
+
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3 and profiler.enabled: # Show or hide the profiler
+                    show_hud = not show_hud
+                    full_redraw = True
+
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4 and profiler.enabled: # Start or stop a cProfile capture
+                    path = capture.toggle()
+                    profiler.note('capture', f'capture saved to {os.path.basename(path)}' if path else 'capture started')
+                    full_redraw = full_redraw or show_hud # The HUD shows whether a capture is running
+
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_h and not INFINITE: # Show or hide the hints
+                    show_hints = not show_hints
+                    hinted_board = hints = None # The moves played while they were hidden were not sent to the worker
+                    full_redraw = True
+
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_m and not INFINITE: # Show or hide the minimap
+                    show_minimap = not show_minimap
+                    full_redraw = True
+
+                elif event.type == pygame.KEYDOWN and event.key in arrows: # Pan with the arrow keys
+                    dx, dy = arrows[event.key]
+                    camera.pan(dx * camera.cell_size // 2, dy * camera.cell_size // 2)
+                    full_redraw = True
+
+                elif event.type == pygame.MOUSEWHEEL and event.y != 0: # Zoom around the mouse, ignoring horizontal scrolling
+                    if camera.zoom(event.y, pygame.mouse.get_pos()):
+                        textures = get_textures(camera.cell_size)
+                        full_redraw = True
+
+                elif event.type == pygame.MOUSEMOTION and event.buttons[1]: # Pan while the middle mouse button is held
+                    camera.pan(-event.rel[0], -event.rel[1])
+                    full_redraw = True
+
+                elif event.type == pygame.MOUSEBUTTONDOWN and event.button in (1, 3) and replay is None:
+                    x, y = camera.screen_to_cell(pygame.mouse.get_pos())
+                    if camera.contains(x, y):
+                        moves.append((Engine.DISCOVER if event.button == 1 else Engine.FLAG, x, y))
+
+            if replay is not None: # Plays the moves of the replay whose time has come
+                now = pygame.time.get_ticks() - game_start
+                while replay_index < len(replay.records) and replay.records['tick'][replay_index] <= now:
+                    record = replay.records[replay_index]
+                    moves.append((int(record['action']), int(record['x']), int(record['y'])))
+                    replay_index += 1
+            profiler.lap('events')
+
+            for action, x, y in moves:
+                if has_won or has_lost: # Check that the game is still running
+                    break
+                tick = pygame.time.get_ticks() - game_start
+
+                if action == Engine.DISCOVER: # A left click
+
+                    if first_click: # If it is the first clock, generate the grid
+                        seed = 0
+                        board = generator.generate(x, y) if generator is not None else None
+                        if replay is not None:
+                            board = Board.from_mines(replay.create_mines(), x, y, topology)
+                        elif board is None: # No grid without guessing was found, or it was not asked for
+                            if generator is not None: # The player is told that the grid may need a guess
+                                pygame.display.set_caption(GUESS_CAPTION)
+                            seed = int(np.random.SeedSequence().generate_state(1, np.uint64)[0])
+                            board = Board.from_coords(x, y, (GRID_WIDTH, GRID_HEIGHT), MINE_COUNT, np.random.default_rng(seed), topology)
+                        if RECORD_REPLAYS: # The grids that were not generated from the seed are saved in the replay
+                            recorder = Replay.ReplayWriter.create(REPLAY_DIRECTORY, (GRID_WIDTH, GRID_HEIGHT), MINE_COUNT, seed, None if seed else board.mines, TOPOLOGY)
+                        state = new_state(board)
+                        first_click = False
+                        if ANIMATIONS and textures is not None:
+                            animations.reveal(np.argwhere(board.discovered), (x, y))
+                        sound_effects.cell_discovered.play()
+                        full_redraw = True # Flags placed before the grid existed are discarded
+
+                    else:
+                        is_mine, changed = board.discover(x, y, state)
+                        dirty_cells.append(changed)
+
+                        if is_mine:
                             has_lost = True
+                            exploded = (x, y)
+                            full_redraw = True
+                            animations.stop() # The whole grid is revealed, the explosion being the last animation
+                            if ANIMATIONS:
+                                animations.explode(x, y, camera.cell_size)
                             sound_effects.bomb_explodes.play()
-                        
                         else:
+                            if ANIMATIONS and textures is not None:
+                                animations.reveal(changed, (x, y))
                             sound_effects.cell_discovered.play()
 
-                    elif event.button == 3: # The right mouse button
-                        GameLogic.flag_cell(discovered_grid, x, y)
-                        sound_effects.flag_placed.play()
-
-        # Check for a win
-        if GameLogic.check_win(grid, discovered_grid, MINE_COUNT):
-            has_won = True
-
-
-
-        
-        if not (has_won or has_lost): # If the game is still running
-            Renderer.render_grid(screen, grid, neighbours_grid, discovered_grid, CELL_SIZE, textures)
-
-        else: # If the game has ended
-            Renderer.render_entire_grid(screen, grid, neighbours_grid, CELL_SIZE, textures)
-            Renderer.render_end_text(screen, has_won, text_font)
-        
-        pygame.display.flip()
-        clock.tick(GAME_FPS)
-
-    pygame.quit()
+                elif action == Engine.FLAG: # A right click
+                    dirty_cells.append(board.flag(x, y, state))
+                    sound_effects.flag_placed.play()
+
+                if recorder is not None:
+                    recorder.record(tick, action, x, y)
+                profiler.lap('moves')
+
+                # Check for a win, after each move so that the moves following a win are ignored like in the replays
+                if state is not None and state.has_won():
+                    has_won = True
+                    full_redraw = True
+                    animations.stop()
+                profiler.lap('win_check')
+
+            if INFINITE and board.revealing(camera.visible_cells()): # Goes on discovering the regions seen by the player
+                dirty_cells.append(board.reveal(camera.visible_cells()))
+                profiler.lap('moves')
+
+            if generator is not None: # Prepare the next grids while the player thinks
+                generator.poll()
+
+            if recorder is not None and (has_won or has_lost):
+                recorder.close(pygame.time.get_ticks() - game_start, Replay.RESULT_WON if has_won else Replay.RESULT_LOST)
+                recorder = None
+            profiler.lap('generator')
+
+            if show_hints and not (has_won or has_lost): # Sends the changes to the worker and collects its hints
+                if hint_worker is None:
+                    from scripts.hints import HintWorker
+                    hint_worker = HintWorker((GRID_WIDTH, GRID_HEIGHT), MINE_COUNT, TOPOLOGY)
+                if board is not hinted_board or dirty_cells:
+                    hint_worker.update(board.cells, None if board is not hinted_board else np.concatenate(dirty_cells))
+                    hinted_board = board
+                    hints = None # The hints of the previous generation are wiped from the screen
+                    full_redraw = True
+                probabilities = hint_worker.poll()
+                if probabilities is not None:
+                    hints = probabilities
+                    full_redraw = True
+            profiler.lap('hints')
+
+            revealed = animations.update(dt)
+            if len(revealed):
+                dirty_cells.append(revealed)
+            profiler.lap('animations')
+
+
+            if dirty_cells and textures is None: # The cells drawn as plain colors are all drawn again, which costs little
+                full_redraw = True
+
+            if full_redraw: # Only the cells seen by the camera are drawn
+                x0, y0, x1, y1 = camera.visible_cells()
+                grid, neighbours_grid, discovered_grid = board.window(x0, y0, x1, y1)
+                if has_won or has_lost: # If the game has ended, reveal the whole grid
+                    discovered_grid = np.full_like(discovered_grid, 2)
+                Renderer.render_view(screen, grid, neighbours_grid, discovered_grid, (x0, y0), camera, textures, exploded)
+                animations.render(screen, camera, textures, full=True)
+                if show_hints and hints is not None and textures is not None and not (has_won or has_lost):
+                    Renderer.render_hints(screen, hints[x0:x1, y0:y1], (x0, y0), camera)
+                render_minimap()
+
+                if has_won or has_lost:
+                    text_font = text_font or pygame.font.SysFont('Arial', WINDOW_WIDTH//10, bold=True)
+                    Renderer.render_end_text(screen, has_won, text_font)
+
+                if show_hud:
+                    hud_font = hud_font or pygame.font.Font(None, 20)
+                    hud_rect = Renderer.render_hud(screen, profiler.hud_lines(), hud_font, hud_rect.size)
+                profiler.lap('render')
+
+                pygame.display.flip()
+                profiler.lap('display')
+                if first_frame:
+                    profiler.note('first_frame', f'first frame after {(time.perf_counter() - START_TIME) * 1000:.0f}ms')
+                    first_frame = False
+
+            elif dirty_cells or animations.active: # Only redraw the cells that changed and the animations
+                rects = []
+                if dirty_cells:
+                    rects = Renderer.render_cells(screen, board.grid, board.neighbours_grid, board.discovered_grid, np.concatenate(dirty_cells), camera.cell_size, textures, camera.offset, camera.stagger)
+                rects += animations.render(screen, camera, textures)
+                if has_won or has_lost: # The explosion is drawn under the end of the game message
+                    rects.append(Renderer.render_end_text(screen, has_won, text_font))
+                minimap_rect = render_minimap() # The minimap shows the changed cells, and is drawn again over them
+                if minimap_rect is not None:
+                    rects.append(minimap_rect)
+                if show_hud: # The HUD is drawn again over the cells
+                    hud_rect = Renderer.render_hud(screen, profiler.hud_lines(), hud_font, hud_rect.size)
+                    rects.append(hud_rect)
+                profiler.lap('render')
+
+                pygame.display.update(rects)
+                profiler.lap('display')
+
+            full_redraw = False
+            dirty_cells.clear()
+            profiler.end_frame()
+            if not EVENT_DRIVEN:
+                clock.tick(GAME_FPS)
+
+    finally: # The workers are stopped even if the game or the export of the profiler fails
+        animations.stop()
+        try:
+            if recorder is not None:
+                recorder.close(pygame.time.get_ticks() - game_start, Replay.RESULT_NONE)
+            if capture.active:
+                capture.toggle()
+            if profiler.enabled and PROFILE_OUTPUT:
+                profiler.dump(os.path.join(os.path.dirname(os.path.abspath(__file__)), PROFILE_OUTPUT))
+        finally:
+            if generator is not None:
+                generator.close()
+            if hint_worker is not None:
+                hint_worker.close()
+            pygame.quit()
 
 
 
 if __name__ == '__main__':
-    game_loop()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Plays minesweeper')
+    parser.add_argument('--replay', help='the replay file to play back instead of playing')
+    args = parser.parse_args()
+    game_loop(args.replay)
\ No newline at end of file
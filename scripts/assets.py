@@ -1,8 +1,32 @@
+import os
+import re
+import threading
+
 import pygame
 
 
+# The paths are relative to the repository rather than to the working directory
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOUNDS_DIRECTORY = os.path.join(ROOT_DIRECTORY, 'sounds')
+TEXTURE_CACHE_DIRECTORY = os.path.join(ROOT_DIRECTORY, 'cache', 'textures')
+TEXTURE_VERSION = 1 # Must be increased when the drawing of the textures changes, to invalidate the cache
+STRIP_LENGTH = 12 # The number of textures of a cached strip, see Textures.layers
+
+# The tiles of the atlas, one for each state a cell can be rendered in
+TILE_HIDDEN = 0
+TILE_FLAG = 1
+TILE_NUMBER = 2     # A discovered cell with n neighbouring mines uses the tile TILE_NUMBER + n
+TILE_MINE = 11
+TILE_EXPLODED = 12  # The mine that ended the game
+TILE_COUNT = 13
+
+
+
 class Textures:
-    '''A class to store all the textures'''
+    '''A class to store all the textures
+    The textures are also pre-composited into an atlas holding one tile per state of a cell, so that a cell is rendered
+    with a single blit of an area of the atlas
+    '''
     hidden_cell_background: pygame.Surface
     cell_background: pygame.Surface
     mine: pygame.Surface
@@ -15,15 +39,71 @@ class Textures:
     number_6: pygame.Surface
     number_7: pygame.Surface
     number_8: pygame.Surface
+    numbers: list[pygame.Surface | None]
+    atlas: pygame.Surface
+    tiles: list[pygame.Rect]
+
+    def __init__(self, cell_size: int, number_font: pygame.font.Font | None = None, strip: pygame.Surface | None = None) -> None:
+        '''Initializes the textures, either by drawing them or from a strip saved by a previous run'''
+
+        if strip is None:
+            self.init_hidden_cell_background(cell_size)
+            self.init_cell_background(cell_size)
+            self.init_mine(cell_size)
+            self.init_flag(cell_size)
+            self.init_numbers(cell_size, number_font)
+        else:
+            self.init_from_strip(cell_size, strip)
+        self.init_atlas(cell_size)
 
-    def __init__(self, cell_size: int, number_font: pygame.font.Font) -> None:
-        '''Initializes the textures'''
+    @classmethod
+    def load(cls, cell_size: int, font_name: str = 'Arial', bold: bool = True, cache_directory: str = TEXTURE_CACHE_DIRECTORY) -> 'Textures':
+        '''Loads the textures from the disk cache, drawing and saving them if they are not cached
+        The font is only created on a cache miss, since looking up the system fonts is slow
 
-        self.init_hidden_cell_background(cell_size)
-        self.init_cell_background(cell_size)
-        self.init_mine(cell_size)
-        self.init_flag(cell_size)
-        self.init_numbers(cell_size, number_font)
+        :param int cell_size: The size of each cell
+        :param str font_name: The name of the system font of the numbers
+        :param bool bold: Whether the numbers are bold
+        :param str cache_directory: The directory of the cached textures
+        :return Textures: The textures
+        '''
+        key = re.sub(r'[^A-Za-z0-9.]+', '_', f'{cell_size}_{font_name}_{bold}_{pygame.version.ver}_v{TEXTURE_VERSION}')
+        path = os.path.join(cache_directory, f'textures_{key}.png')
+        try:
+            strip = pygame.image.load(path)
+        except (pygame.error, FileNotFoundError):
+            strip = None
+        if strip is not None and strip.get_size() == (cell_size * STRIP_LENGTH, cell_size): # Otherwise it is drawn again
+            return cls(cell_size, strip=strip)
+
+        textures = cls(cell_size, pygame.font.SysFont(font_name, cell_size, bold=bold))
+        try:
+            os.makedirs(cache_directory, exist_ok=True)
+            pygame.image.save(textures.to_strip(), path)
+        except (pygame.error, OSError): # A read-only directory only disables the cache
+            pass
+        return textures
+
+    def layers(self) -> list[pygame.Surface]:
+        '''Returns the textures the atlas is composited from, in the order of the strip'''
+        return [self.hidden_cell_background, self.cell_background, self.mine, self.flag] + self.numbers[1:]
+
+    def to_strip(self) -> pygame.Surface:
+        '''Returns the textures side by side on one surface, keeping their transparency'''
+        layers = self.layers()
+        cell_size = layers[0].get_width()
+        strip = pygame.Surface((cell_size * len(layers), cell_size), pygame.SRCALPHA)
+        for i, layer in enumerate(layers):
+            strip.blit(layer, (i * cell_size, 0))
+        return strip
+
+    def init_from_strip(self, cell_size: int, strip: pygame.Surface) -> None:
+        '''Initializes the textures from a strip returned by to_strip'''
+        layers = [strip.subsurface((i * cell_size, 0, cell_size, cell_size)) for i in range(STRIP_LENGTH)]
+        self.hidden_cell_background, self.cell_background, self.mine, self.flag = layers[:4]
+        self.numbers = [None] + layers[4:]
+        for i in range(1, 9):
+            self.__dict__[f'number_{i}'] = self.numbers[i]
 
 
 
@@ -112,26 +192,94 @@ class Textures:
                 (cell_size - t_h) // 2
             ))
             self.__dict__[f'number_{i}'] = s
+        self.numbers = [None] + [self.__dict__[f'number_{i}'] for i in range(1, 9)]
+
+    def init_atlas(self, cell_size: int) -> None:
+        '''Initializes the atlas, converted to the format of the display when it exists so that blitting it is fast'''
+        exploded_background = pygame.Surface((cell_size, cell_size))
+        exploded_background.fill('#FF0000')
+
+        layers = {
+            TILE_HIDDEN: [self.hidden_cell_background],
+            TILE_FLAG: [self.hidden_cell_background, self.flag],
+            TILE_NUMBER: [self.cell_background],
+            TILE_MINE: [self.cell_background, self.mine],
+            TILE_EXPLODED: [exploded_background, self.mine],
+        }
+        for i in range(1, 9):
+            layers[TILE_NUMBER + i] = [self.cell_background, self.numbers[i]]
+
+        self.atlas = pygame.Surface((cell_size * TILE_COUNT, cell_size))
+        self.tiles = [pygame.Rect(i * cell_size, 0, cell_size, cell_size) for i in range(TILE_COUNT)]
+        for tile, surfaces in layers.items():
+            for surface in surfaces:
+                self.atlas.blit(surface, self.tiles[tile])
+
+        if pygame.display.get_surface() is not None:
+            self.atlas = self.atlas.convert()
+
+
+
+class SilentSound:
+    '''A sound that does nothing, used until the sounds are loaded or when there is no audio device'''
+
+    def play(self, *args, **kwargs) -> None:
+        pass
+
+    def set_volume(self, volume: float) -> None:
+        pass
+
+SILENT = SilentSound()
 
 
 
 class SoundEffects:
 
     def __init__(self, sound_volume: float) -> None:
-        '''Initializes the sound effects'''
-        self.bomb_explodes = pygame.mixer.Sound('sounds/bomb_explodes.wav')
-        self.flag_placed = pygame.mixer.Sound('sounds/flag_placed.wav')
-        self.cell_discovered = pygame.mixer.Sound('sounds/cell_discovered.wav')
+        '''Initializes the sound effects, which stay silent until load is called'''
+        self.sound_volume = sound_volume
+        self.bomb_explodes = SILENT
+        self.flag_placed = SILENT
+        self.cell_discovered = SILENT
 
-        self.bomb_explodes.set_volume(sound_volume)
-        self.flag_placed.set_volume(sound_volume)
-        self.cell_discovered.set_volume(sound_volume)
+    def load(self) -> None:
+        '''Loads the sound effects, the mixer must be initialized'''
+        sounds = [pygame.mixer.Sound(os.path.join(SOUNDS_DIRECTORY, f'{name}.wav')) for name in ('bomb_explodes', 'flag_placed', 'cell_discovered')]
+        for sound in sounds:
+            sound.set_volume(self.sound_volume)
+        self.bomb_explodes, self.flag_placed, self.cell_discovered = sounds
 
 
 class Music:
 
     def __init__(self, sound_volume: float) -> None:
-        '''Initializes the music'''
-        self.music = pygame.mixer.music.load('sounds/background_music.mp3')
-        pygame.mixer.music.set_volume(sound_volume)
-        pygame.mixer.music.play(-1)
\ No newline at end of file
+        '''Initializes the music, which starts when load is called'''
+        self.sound_volume = sound_volume
+
+    def load(self) -> None:
+        '''Loads and plays the music, the mixer must be initialized'''
+        pygame.mixer.music.load(os.path.join(SOUNDS_DIRECTORY, 'background_music.mp3'))
+        pygame.mixer.music.set_volume(self.sound_volume)
+        pygame.mixer.music.play(-1)
+
+
+
+def load_audio(sound_effects: SoundEffects, music: Music) -> threading.Thread:
+    '''Initializes the mixer and loads the audio in a background thread, so that the game starts without waiting for it
+    The sound effects play silently until they are loaded, and for the whole game if the audio fails to load
+
+    :param SoundEffects sound_effects: The sound effects to load
+    :param Music music: The music to load and play
+    :return threading.Thread: The thread loading the audio
+    '''
+    def run() -> None:
+        try:
+            pygame.mixer.init()
+            sound_effects.load()
+            music.load()
+        except (pygame.error, FileNotFoundError) as e:
+            print(f'The audio could not be loaded, the game continues without sound: {e}')
+
+    thread = threading.Thread(target=run, name='audio loader', daemon=True)
+    thread.start()
+    return thread
\ No newline at end of file
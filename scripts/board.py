@@ -0,0 +1,240 @@
+import numpy as np
+from numpy.lib.mixins import NDArrayOperatorsMixin
+
+import scripts.game_logic as GameLogic
+from scripts.topology import Topology
+
+
+# Layout of a cell of the packed array
+NEIGHBOURS_MASK = 0x0F  # The 4 low bits store the number of neighbouring mines
+MINE = 0x0F             # A mine is stored as a neighbour count that cannot happen
+DISCOVERED_SHIFT = 4    # The 2 next bits store the value of the discovered grid
+DISCOVERED_MASK = 0x30
+
+
+
+class Field(NDArrayOperatorsMixin):
+    '''A view of one of the grids packed in the cells of a board
+    It supports indexing, assignment and NumPy operations like the array it replaces, so it can be passed to the
+    functions of game_logic and renderer in place of that array
+    '''
+    __slots__ = ('cells',)
+
+    def __init__(self, cells: np.ndarray) -> None:
+        '''Initializes the view
+
+        :param np.ndarray cells: The packed cells of the board
+        '''
+        self.cells = cells
+
+    def decode(self, raw: np.ndarray) -> np.ndarray:
+        '''Extracts the values of the field from packed cells'''
+        raise NotImplementedError('The decode method must be implemented in a subclass')
+
+    def encode(self, raw: np.ndarray, value: np.ndarray) -> np.ndarray:
+        '''Returns packed cells in which the field has been replaced by the given values'''
+        raise NotImplementedError('The encode method must be implemented in a subclass')
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        return self.cells.shape
+
+    @property
+    def ndim(self) -> int:
+        return self.cells.ndim
+
+    @property
+    def size(self) -> int:
+        return self.cells.size
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def __getitem__(self, key) -> np.ndarray:
+        return self.decode(self.cells[key])
+
+    def __setitem__(self, key, value) -> None:
+        self.cells[key] = self.encode(self.cells[key], np.asarray(value))
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        array = self.decode(self.cells)
+        return array if dtype is None else array.astype(dtype)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if any(isinstance(o, Field) for o in kwargs.get('out', ())):
+            return NotImplemented
+        inputs = tuple(np.asarray(i) if isinstance(i, Field) else i for i in inputs)
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+
+class MineField(Field):
+    '''The view of the grid of mines, in which 1 represents a mine
+    Assigning it does not update the neighbour counts, which must be recomputed afterwards
+    '''
+    __slots__ = ()
+
+    def decode(self, raw: np.ndarray) -> np.ndarray:
+        return ((raw & NEIGHBOURS_MASK) == MINE).astype(np.int8)
+
+    def encode(self, raw: np.ndarray, value: np.ndarray) -> np.ndarray:
+        return np.where(value != 0, raw | MINE, raw & (0xFF ^ NEIGHBOURS_MASK)).astype(np.uint8)
+
+
+class NeighboursField(Field):
+    '''The view of the grid of neighbours, in which mines have a value of -1'''
+    __slots__ = ()
+
+    def decode(self, raw: np.ndarray) -> np.ndarray:
+        return (((raw & NEIGHBOURS_MASK) + 1) & NEIGHBOURS_MASK).astype(np.int8) - 1
+
+    def encode(self, raw: np.ndarray, value: np.ndarray) -> np.ndarray:
+        return ((raw & (0xFF ^ NEIGHBOURS_MASK)) | (value & NEIGHBOURS_MASK)).astype(np.uint8)
+
+
+class DiscoveredField(Field):
+    '''The view of the grid of discovered cells, in which 0 is hidden, 1 is flagged and 2 is discovered'''
+    __slots__ = ()
+
+    def decode(self, raw: np.ndarray) -> np.ndarray:
+        return ((raw & DISCOVERED_MASK) >> DISCOVERED_SHIFT).astype(np.int8)
+
+    def encode(self, raw: np.ndarray, value: np.ndarray) -> np.ndarray:
+        return ((raw & (0xFF ^ DISCOVERED_MASK)) | (value.astype(np.uint8) << DISCOVERED_SHIFT)).astype(np.uint8)
+
+
+
+class Board:
+    '''A grid of the game, storing the mines, the neighbour counts and the discovered state of each cell in one byte
+    The grid, neighbours_grid and discovered_grid attributes are views that can be passed to the functions taking the
+    separate arrays, while the mines, flagged and discovered properties are boolean masks for vectorized queries
+    '''
+    __slots__ = ('cells', 'mine_count', 'regions', 'topology', 'grid', 'neighbours_grid', 'discovered_grid')
+
+    def __init__(self, cells: np.ndarray, mine_count: int, regions: GameLogic.Regions | None = None, topology: Topology | None = None) -> None:
+        '''Initializes the board
+
+        :param np.ndarray cells: The packed cells, as a 2D uint8 array
+        :param int mine_count: The number of mines in the grid
+        :param GameLogic.Regions regions: The labelled regions of the grid (optional)
+        :param Topology topology: The neighbours of the cells, a square board by default (optional)
+        '''
+        self.cells = cells
+        self.mine_count = mine_count
+        self.regions = regions
+        self.topology = topology
+        self.grid = MineField(cells)
+        self.neighbours_grid = NeighboursField(cells)
+        self.discovered_grid = DiscoveredField(cells)
+
+    @classmethod
+    def empty(cls, grid_size: tuple[int, int]) -> 'Board':
+        '''Creates a board without mines, used before the grid is generated
+
+        :param tuple[int, int] grid_size: The size of the grid, using format (width, height)
+        :return Board: The board
+        '''
+        return cls(np.zeros(grid_size, dtype=np.uint8), 0)
+
+    @classmethod
+    def from_grids(cls, grid: np.ndarray, neighbours_grid: np.ndarray, discovered_grid: np.ndarray, regions: GameLogic.Regions | None = None) -> 'Board':
+        '''Packs the separate grids of a game into a board
+
+        :param np.ndarray grid: The grid of the game
+        :param np.ndarray neighbours_grid: The grid of neighbours
+        :param np.ndarray discovered_grid: The grid of discovered cells
+        :param GameLogic.Regions regions: The labelled regions of the grid (optional)
+        :return Board: The board
+        '''
+        cells = (np.asarray(neighbours_grid) & NEIGHBOURS_MASK).astype(np.uint8)
+        cells |= (np.asarray(discovered_grid) << DISCOVERED_SHIFT).astype(np.uint8)
+        return cls(cells, int(np.count_nonzero(grid)), regions)
+
+    @classmethod
+    def from_coords(cls, x: int, y: int, grid_size: tuple[int, int], mine_count: int, rng: np.random.Generator | None = None, topology: Topology | None = None) -> 'Board':
+        '''Creates a board from the position of the first discovered cell, like game_logic.create_from_coords
+
+        :param int x: The x-coordinate of the cell
+        :param int y: The y-coordinate of the cell
+        :param tuple[int, int] grid_size: The size of the grid, using format (width, height)
+        :param int mine_count: The number of mines to place in the grid
+        :param np.random.Generator rng: The random generator to use (optional)
+        :param Topology topology: The neighbours of the cells, a square board by default (optional)
+        :return Board: The board, with the first cell discovered
+        '''
+        mines = GameLogic.create_mine_mask(grid_size, mine_count, GameLogic.safe_zone(x, y, grid_size, mine_count, topology), rng)
+        return cls.from_mines(mines, x, y, topology)
+
+    @classmethod
+    def from_mines(cls, mines: np.ndarray, x: int, y: int, topology: Topology | None = None) -> 'Board':
+        '''Creates a board from a mask of mines and discovers its first cell
+        The board is built without going through the int arrays: it keeps one byte per cell plus the runs of its regions,
+        and on a square board none of the temporaries takes more than a byte per cell
+
+        :param np.ndarray mines: The boolean mask of the cells containing a mine
+        :param int x: The x-coordinate of the first discovered cell
+        :param int y: The y-coordinate of the first discovered cell
+        :param Topology topology: The neighbours of the cells, a square board by default (optional)
+        :return Board: The board, with the first cell discovered
+        '''
+        mine_count = int(np.count_nonzero(mines))
+        cells = GameLogic.create_neighbours_grid(mines, np.int8, topology).view(np.uint8)
+        cells &= NEIGHBOURS_MASK # Mines have a count of -1, which becomes MINE
+        del mines
+
+        board = cls(cells, mine_count, topology=topology)
+        board.regions = GameLogic.Regions(board.neighbours_grid, topology)
+        board.discover(x, y)
+        return board
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.cells.shape
+
+    @property
+    def mines(self) -> np.ndarray:
+        '''The boolean mask of the cells containing a mine'''
+        return (self.cells & NEIGHBOURS_MASK) == MINE
+
+    @property
+    def flagged(self) -> np.ndarray:
+        '''The boolean mask of the flagged cells'''
+        return (self.cells & DISCOVERED_MASK) == 1 << DISCOVERED_SHIFT
+
+    @property
+    def discovered(self) -> np.ndarray:
+        '''The boolean mask of the discovered cells'''
+        return (self.cells & DISCOVERED_MASK) == 2 << DISCOVERED_SHIFT
+
+    def window(self, x0: int, y0: int, x1: int, y1: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        '''Returns the grids of a rectangle of cells, which must be inside the board
+        The grids are views of the same packed cells, without copying them, so that renderer.tile_indices looks their
+        tiles up in one pass
+
+        :param int x0: The x-coordinate of the first column
+        :param int y0: The y-coordinate of the first row
+        :param int x1: The x-coordinate after the last column
+        :param int y1: The y-coordinate after the last row
+        :return tuple[np.ndarray, np.ndarray, np.ndarray]: The grid, the grid of neighbours and the grid of discovered cells
+        '''
+        cells = self.cells[x0:x1, y0:y1]
+        return MineField(cells), NeighboursField(cells), DiscoveredField(cells)
+
+    def discover(self, x: int, y: int, state: GameLogic.GameState | None = None) -> tuple[bool, np.ndarray]:
+        '''Discovers a cell, see game_logic.discover_cell
+
+        :param int x: The x-coordinate of the cell
+        :param int y: The y-coordinate of the cell
+        :param GameLogic.GameState state: The game state whose counters to update (optional)
+        :return tuple[bool, np.ndarray]: Whether the cell is a mine, and the coordinates of the discovered cells
+        '''
+        return GameLogic.discover_cell(self.grid, self.neighbours_grid, self.discovered_grid, x, y, state, self.regions, self.topology)
+
+    def flag(self, x: int, y: int, state: GameLogic.GameState | None = None) -> np.ndarray:
+        '''Flags or unflags a cell, see game_logic.flag_cell
+
+        :param int x: The x-coordinate of the cell
+        :param int y: The y-coordinate of the cell
+        :param GameLogic.GameState state: The game state whose counters to update (optional)
+        :return np.ndarray: The coordinates of the changed cells
+        '''
+        return GameLogic.flag_cell(self.discovered_grid, x, y, state)
@@ -0,0 +1,76 @@
+import numpy as np
+
+from scripts.engine import DISCOVER, FLAG
+from scripts.solver import Solver
+
+
+# A bot is a callable taking the visible state of a game and returning its next move as a tuple (action, x, y), where
+# action is one of engine.DISCOVER and engine.FLAG. It receives:
+#   - the grid of neighbours, in which the cells that have not been discovered have a value of -2
+#   - the grid of discovered cells
+#   - the number of mines in the grid
+#   - a random generator seeded for the game
+# Bots keeping a state between moves are written as classes, of which the tournament creates one instance per game
+
+
+
+def random_bot(neighbours_grid: np.ndarray, discovered_grid: np.ndarray, mine_count: int, rng: np.random.Generator) -> tuple[int, int, int]:
+    '''Discovers a random hidden cell, or unflags a random cell when every hidden cell is flagged
+
+    :param np.ndarray neighbours_grid: The visible grid of neighbours
+    :param np.ndarray discovered_grid: The grid of discovered cells
+    :param int mine_count: The number of mines in the grid
+    :param np.random.Generator rng: The random generator of the game
+    :return tuple[int, int, int]: The action and the coordinates of the cell
+    '''
+    xs, ys = np.nonzero(discovered_grid == 0)
+    if len(xs) == 0: # Flagging a flagged cell unflags it, so that it can be discovered by the next move
+        xs, ys = np.nonzero(discovered_grid == 1)
+        i = rng.integers(len(xs))
+        return FLAG, int(xs[i]), int(ys[i])
+    i = rng.integers(len(xs))
+    return DISCOVER, int(xs[i]), int(ys[i])
+
+
+
+class SolverBot:
+    '''Discovers the cells the solver proves safe, and the hidden cell least likely to be a mine when there are none
+    The safe cells found by a solve are played one by one before solving again
+    '''
+
+    def __init__(self) -> None:
+        '''Initializes the bot for a new game'''
+        self.solver = Solver()
+        self.moves = []
+
+    def __call__(self, neighbours_grid: np.ndarray, discovered_grid: np.ndarray, mine_count: int, rng: np.random.Generator) -> tuple[int, int, int]:
+        '''Returns the next move
+
+        :param np.ndarray neighbours_grid: The visible grid of neighbours
+        :param np.ndarray discovered_grid: The grid of discovered cells
+        :param int mine_count: The number of mines in the grid
+        :param np.random.Generator rng: The random generator of the game
+        :return tuple[int, int, int]: The action and the coordinates of the cell
+        '''
+        if not (discovered_grid == 2).any(): # The first click is always safe, and the center is the most likely to open a region
+            w, h = discovered_grid.shape
+            return DISCOVER, w // 2, h // 2
+
+        # The cells proven safe stay safe, but they may have been discovered along with a region since
+        while self.moves:
+            action, x, y = self.moves.pop()
+            if discovered_grid[x, y] == 0:
+                return action, x, y
+
+        result = self.solver.solve(neighbours_grid, discovered_grid, mine_count)
+        hidden = discovered_grid == 0
+        self.moves = [(FLAG, x, y) for x, y in np.argwhere(result.mines & hidden).tolist()]
+        self.moves += [(DISCOVER, x, y) for x, y in np.argwhere(result.safe & hidden).tolist()]
+        if self.moves:
+            return self.moves.pop()
+
+        probabilities = np.where(hidden, result.probabilities, np.inf)
+        probabilities[np.isnan(probabilities)] = np.inf
+        candidates = np.argwhere(probabilities == probabilities.min())
+        x, y = candidates[rng.integers(len(candidates))]
+        return DISCOVER, int(x), int(y)
@@ -0,0 +1,124 @@
+from math import ceil, floor
+
+
+
+class Camera:
+    '''The part of the board shown on the screen, which can be panned and zoomed
+    The position of the camera is the position of the top-left corner of the screen on the board, in pixels
+    On a staggered board, the odd columns are drawn half a cell lower than the even ones
+    '''
+    ZOOM_FACTOR = 1.25
+
+    def __init__(self, screen_size: tuple[int, int], cell_size: int, bounds: tuple[int, int] | None = None, min_cell_size: int = 8, max_cell_size: int = 128, stagger: bool = False) -> None:
+        '''Initializes the camera, showing the top-left corner of the board
+
+        :param tuple[int, int] screen_size: The size of the screen in pixels
+        :param int cell_size: The size of each cell in pixels
+        :param tuple[int, int] bounds: The size of the board in cells, None if it is unbounded (optional)
+        :param int min_cell_size: The size of the cells when zoomed out the most
+        :param int max_cell_size: The size of the cells when zoomed in the most
+        :param bool stagger: Whether the odd columns are drawn half a cell lower (optional)
+        '''
+        self.screen_size = screen_size
+        self.cell_size = cell_size
+        self.bounds = bounds
+        self.stagger = stagger
+        self.min_cell_size = min_cell_size
+        self.max_cell_size = max_cell_size
+        self.x, self.y = 0, 0
+        self.clamp()
+
+    @property
+    def offset(self) -> tuple[int, int]:
+        '''The position of the camera, to subtract from the position of the cells on the board'''
+        return self.x, self.y
+
+    def clamp(self) -> None:
+        '''Keeps a bounded board on the screen, centering it when it is smaller than the screen'''
+        if self.bounds is None:
+            return
+
+        def clamp_axis(position: int, board: int, screen: int) -> int:
+            return (board - screen) // 2 if board <= screen else min(max(position, 0), board - screen)
+
+        self.x = clamp_axis(self.x, self.bounds[0] * self.cell_size, self.screen_size[0])
+        height = self.bounds[1] * self.cell_size + (self.cell_size // 2 if self.stagger and self.bounds[0] > 1 else 0)
+        self.y = clamp_axis(self.y, height, self.screen_size[1])
+
+    def pan(self, dx: int, dy: int) -> None:
+        '''Moves the camera
+
+        :param int dx: The horizontal movement in pixels
+        :param int dy: The vertical movement in pixels
+        '''
+        self.x += dx
+        self.y += dy
+        self.clamp()
+
+    def zoom(self, steps: int, anchor: tuple[int, int]) -> bool:
+        '''Zooms in or out, keeping the point of the board under the anchor at the same place on the screen
+
+        :param int steps: The number of zoom steps, positive to zoom in and negative to zoom out
+        :param tuple[int, int] anchor: The position of the anchor on the screen, usually the mouse
+        :return bool: True if the size of the cells changed, False otherwise
+        '''
+        if steps == 0: # Horizontal scrolling
+            return False
+        cell_size = round(self.cell_size * self.ZOOM_FACTOR ** steps)
+        if cell_size == self.cell_size: # Makes sure that small cells can still be zoomed
+            cell_size += 1 if steps > 0 else -1
+        cell_size = min(max(cell_size, self.min_cell_size), self.max_cell_size)
+        if cell_size == self.cell_size:
+            return False
+
+        ax, ay = anchor
+        self.x = round((self.x + ax) * cell_size / self.cell_size) - ax
+        self.y = round((self.y + ay) * cell_size / self.cell_size) - ay
+        self.cell_size = cell_size
+        self.clamp()
+        return True
+
+    def center_on(self, x: int, y: int) -> None:
+        '''Moves the camera so that a cell is at the center of the screen
+
+        :param int x: The x-coordinate of the cell
+        :param int y: The y-coordinate of the cell
+        '''
+        self.x = x * self.cell_size + (self.cell_size - self.screen_size[0]) // 2
+        self.y = y * self.cell_size + (self.cell_size - self.screen_size[1]) // 2
+        self.clamp()
+
+    def screen_to_cell(self, position: tuple[int, int]) -> tuple[int, int]:
+        '''Returns the cell under a position of the screen
+
+        :param tuple[int, int] position: The position on the screen in pixels
+        :return tuple[int, int]: The coordinates of the cell, which may be outside of a bounded board
+        '''
+        x = (self.x + position[0]) // self.cell_size
+        shift = self.cell_size // 2 if self.stagger and x % 2 else 0
+        return x, (self.y + position[1] - shift) // self.cell_size
+
+    def contains(self, x: int, y: int) -> bool:
+        '''Checks whether a cell belongs to the board
+
+        :param int x: The x-coordinate of the cell
+        :param int y: The y-coordinate of the cell
+        :return bool: True if the board is unbounded or contains the cell, False otherwise
+        '''
+        return self.bounds is None or (0 <= x < self.bounds[0] and 0 <= y < self.bounds[1])
+
+    def visible_cells(self) -> tuple[int, int, int, int]:
+        '''Returns the cells that are at least partly on the screen, which are the only ones to render
+
+        :return tuple[int, int, int, int]: The range of the cells, using format (x0, y0, x1, y1) with x1 and y1 excluded
+            - on a staggered board x0 is even, so that the first column of the range is not shifted
+        '''
+        x0, y0 = floor(self.x / self.cell_size), floor(self.y / self.cell_size)
+        x1 = ceil((self.x + self.screen_size[0]) / self.cell_size)
+        y1 = ceil((self.y + self.screen_size[1]) / self.cell_size)
+        if self.stagger: # The shifted columns show part of the cell above the first row
+            x0, y0 = x0 - x0 % 2, y0 - 1
+        if self.bounds is not None:
+            x0, y0 = max(x0, 0), max(y0, 0)
+            x1, y1 = min(x1, self.bounds[0]), min(y1, self.bounds[1])
+        return x0, y0, x1, y1
@@ -0,0 +1,296 @@
+from collections import OrderedDict
+
+import numpy as np
+
+import scripts.game_logic as GameLogic
+
+
+
+def zigzag(n: int) -> int:
+    '''Maps an integer to a natural number, so that negative chunk coordinates can be used in a seed'''
+    return 2 * n if n >= 0 else -2 * n - 1
+
+
+def pack_discovered(discovered: np.ndarray) -> int | tuple[np.ndarray, np.ndarray]:
+    '''Compresses the discovered grid of a chunk, see unpack_discovered
+
+    :param np.ndarray discovered: The discovered grid of the chunk
+    :return int | tuple[np.ndarray, np.ndarray]: The value of every cell when they all have the same, which is the case
+        of the chunks inside a discovered region, or the flagged and the discovered cells packed to 1 bit per cell each
+    '''
+    first = discovered.flat[0]
+    if (discovered == first).all():
+        return int(first)
+    return np.packbits(discovered == 1), np.packbits(discovered == 2)
+
+
+def unpack_discovered(packed: int | tuple[np.ndarray, np.ndarray], chunk_size: int) -> np.ndarray:
+    '''Restores the discovered grid of a chunk compressed by pack_discovered
+
+    :param int | tuple[np.ndarray, np.ndarray] packed: The compressed grid
+    :param int chunk_size: The side length of the chunk
+    :return np.ndarray: The discovered grid of the chunk
+    '''
+    if isinstance(packed, int):
+        return np.full((chunk_size, chunk_size), packed, dtype=np.int8)
+    shape = (chunk_size, chunk_size)
+    flagged, discovered = (np.unpackbits(bits, count=chunk_size * chunk_size).reshape(shape) for bits in packed)
+    return (flagged + 2 * discovered).astype(np.int8)
+
+
+
+class ChunkedField:
+    '''A view of one of the grids of a chunked board, giving access to cells by coordinates like the array it replaces
+    It can be passed to the functions that do not slice the grids, like renderer.render_cells
+    '''
+    __slots__ = ('board', 'name')
+
+    def __init__(self, board: 'ChunkedBoard', name: str) -> None:
+        '''Initializes the view
+
+        :param ChunkedBoard board: The board
+        :param str name: The name of the grid, one of 'grid', 'neighbours_grid' and 'discovered_grid'
+        '''
+        self.board = board
+        self.name = name
+
+    def __getitem__(self, key: tuple[int, int]) -> int | np.ndarray:
+        x, y = key
+        if isinstance(x, np.ndarray): # Looks the cells up one by one
+            return np.array([self[cell] for cell in zip(x.tolist(), y.tolist())], dtype=np.int8)
+        if self.name == 'discovered_grid':
+            return self.board.discovered_at(x, y)
+        neighbours = self.board.neighbours_at(x, y)
+        return int(neighbours == -1) if self.name == 'grid' else neighbours
+
+    def __setitem__(self, key: tuple[int, int], value: int) -> None:
+        if self.name != 'discovered_grid':
+            raise TypeError(f'The {self.name} of a chunked board is generated from its seed and cannot be assigned')
+        self.board.set_discovered(*key, value)
+
+
+
+class ChunkedBoard:
+    '''An unbounded board split in square chunks, generated from a seed when they are first needed
+    The mines of a chunk only depend on the seed and the position of the chunk, so the neighbour counts of the chunks are
+    kept in an LRU cache and generated again after their eviction. Only the discovered cells of the chunks touched by the
+    player are stored: the chunks used recently take one byte per cell, and the others are compressed, a chunk whose
+    cells are all discovered taking a single value
+    Regions larger than max_reveal cells are discovered over several calls to reveal, which can be limited to the part of
+    the board the player looks at
+    The cells around (0, 0) never contain a mine, so that the game can start by discovering this cell
+    '''
+    chunks: OrderedDict
+    discovered_chunks: OrderedDict
+    packed_chunks: dict
+    frontier: dict[tuple[int, int], set[tuple[int, int]]]
+
+    def __init__(self, seed: int, density: float, chunk_size: int = 32, cache_size: int = 256, max_reveal: int = 1 << 16) -> None:
+        '''Initializes the board
+
+        :param int seed: The seed the chunks are generated from
+        :param float density: The probability of each cell to contain a mine
+        :param int chunk_size: The side length of the chunks
+        :param int cache_size: The number of chunks whose neighbour counts are kept in memory, and whose discovered
+            cells are kept uncompressed
+        :param int max_reveal: The number of cells discovered at once, since regions can be unbounded at low densities.
+            The rest of a larger region is queued, and discovered by the next calls to reveal
+        '''
+        self.seed = seed
+        self.density = density
+        self.chunk_size = chunk_size
+        self.cache_size = cache_size
+        self.max_reveal = max_reveal
+        self.chunks = OrderedDict()             # The neighbour counts of the chunks, by position of the chunk
+        self.discovered_chunks = OrderedDict()  # The discovered grids of the chunks touched recently by the player
+        self.packed_chunks = {}                 # The compressed discovered grids of the other chunks touched
+        self.frontier = {}                      # The cells waiting to be discovered, by position of their chunk
+        self.grid = ChunkedField(self, 'grid')
+        self.neighbours_grid = ChunkedField(self, 'neighbours_grid')
+        self.discovered_grid = ChunkedField(self, 'discovered_grid')
+
+    def chunk_mines(self, cx: int, cy: int) -> np.ndarray:
+        '''Generates the mines of a chunk from the seed
+
+        :param int cx: The x-coordinate of the chunk
+        :param int cy: The y-coordinate of the chunk
+        :return np.ndarray: The boolean mask of the cells containing a mine
+        '''
+        size = self.chunk_size
+        rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(zigzag(cx), zigzag(cy))))
+        mines = rng.random((size, size)) < self.density
+
+        if -1 <= cx <= 0 and -1 <= cy <= 0: # Keeps the cells around the starting cell free of mines
+            xs, ys = np.arange(size) + cx * size, np.arange(size) + cy * size
+            mines &= ~((np.abs(xs)[:, None] <= 1) & (np.abs(ys)[None, :] <= 1))
+        return mines
+
+    def chunk(self, cx: int, cy: int) -> np.ndarray:
+        '''Returns the neighbour counts of a chunk, generating them if they are not in the cache
+
+        :param int cx: The x-coordinate of the chunk
+        :param int cy: The y-coordinate of the chunk
+        :return np.ndarray: The grid of neighbours of the chunk, in which mines have a value of -1
+        '''
+        key = (cx, cy)
+        if key in self.chunks:
+            self.chunks.move_to_end(key)
+            return self.chunks[key]
+
+        # The counts on the border of the chunk depend on the mines of the surrounding chunks
+        size = self.chunk_size
+        mines = np.block([[self.chunk_mines(cx+i, cy+j) for j in range(-1, 2)] for i in range(-1, 2)])
+        neighbours = GameLogic.create_neighbours_grid(mines, np.int8)[size:2*size, size:2*size].copy()
+
+        self.chunks[key] = neighbours
+        if len(self.chunks) > self.cache_size:
+            self.chunks.popitem(last=False)
+        return neighbours
+
+    def neighbours_at(self, x: int, y: int) -> int:
+        '''Returns the number of mines around a cell, -1 if the cell is a mine'''
+        (cx, lx), (cy, ly) = divmod(x, self.chunk_size), divmod(y, self.chunk_size)
+        return int(self.chunk(cx, cy)[lx, ly])
+
+    def discovered_chunk(self, cx: int, cy: int, create: bool = False) -> np.ndarray | None:
+        '''Returns the discovered grid of a chunk, decompressing it if it is not in the cache
+        The least recently used grid is compressed when the cache is full
+
+        :param int cx: The x-coordinate of the chunk
+        :param int cy: The y-coordinate of the chunk
+        :param bool create: Whether to create the grid of a chunk the player never touched (optional)
+        :return np.ndarray | None: The discovered grid of the chunk, None if the player never touched it and it is not
+            created
+        '''
+        key = (cx, cy)
+        if key in self.discovered_chunks:
+            self.discovered_chunks.move_to_end(key)
+            return self.discovered_chunks[key]
+        if key not in self.packed_chunks and not create:
+            return None
+
+        packed = self.packed_chunks.pop(key, 0)
+        discovered = self.discovered_chunks[key] = unpack_discovered(packed, self.chunk_size)
+        if len(self.discovered_chunks) > self.cache_size:
+            evicted, grid = self.discovered_chunks.popitem(last=False)
+            self.packed_chunks[evicted] = pack_discovered(grid)
+        return discovered
+
+    def discovered_at(self, x: int, y: int) -> int:
+        '''Returns the discovered state of a cell, 0 if hidden, 1 if flagged and 2 if discovered'''
+        (cx, lx), (cy, ly) = divmod(x, self.chunk_size), divmod(y, self.chunk_size)
+        discovered = self.discovered_chunk(cx, cy)
+        return 0 if discovered is None else int(discovered[lx, ly])
+
+    def set_discovered(self, x: int, y: int, value: int) -> None:
+        '''Sets the discovered state of a cell, storing the discovered grid of its chunk from then on'''
+        (cx, lx), (cy, ly) = divmod(x, self.chunk_size), divmod(y, self.chunk_size)
+        self.discovered_chunk(cx, cy, create=True)[lx, ly] = value
+
+    def window(self, x0: int, y0: int, x1: int, y1: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        '''Returns the grids of a rectangle of cells, copied chunk by chunk
+
+        :param int x0: The x-coordinate of the first column
+        :param int y0: The y-coordinate of the first row
+        :param int x1: The x-coordinate after the last column
+        :param int y1: The y-coordinate after the last row
+        :return tuple[np.ndarray, np.ndarray, np.ndarray]: The grid, the grid of neighbours and the grid of discovered cells
+        '''
+        size = self.chunk_size
+        neighbours_grid = np.empty((x1 - x0, y1 - y0), dtype=np.int8)
+        discovered_grid = np.zeros((x1 - x0, y1 - y0), dtype=np.int8)
+
+        for cx in range(x0 // size, (x1 - 1) // size + 1):
+            ax0, ax1 = max(x0, cx * size), min(x1, (cx + 1) * size)
+            for cy in range(y0 // size, (y1 - 1) // size + 1):
+                ay0, ay1 = max(y0, cy * size), min(y1, (cy + 1) * size)
+                target = (slice(ax0 - x0, ax1 - x0), slice(ay0 - y0, ay1 - y0))
+                source = (slice(ax0 - cx * size, ax1 - cx * size), slice(ay0 - cy * size, ay1 - cy * size))
+                neighbours_grid[target] = self.chunk(cx, cy)[source]
+                discovered = self.discovered_chunk(cx, cy)
+                if discovered is not None:
+                    discovered_grid[target] = discovered[source]
+
+        return (neighbours_grid == -1).view(np.int8), neighbours_grid, discovered_grid
+
+    def near(self, key: tuple[int, int], area: tuple[int, int, int, int] | None) -> bool:
+        '''Returns whether a chunk is in a rectangle of cells or next to it, any chunk being near when there is no rectangle'''
+        if area is None:
+            return True
+        x0, y0, x1, y1 = area
+        size = self.chunk_size
+        return x0 // size - 1 <= key[0] <= (x1 - 1) // size + 1 and y0 // size - 1 <= key[1] <= (y1 - 1) // size + 1
+
+    def revealing(self, area: tuple[int, int, int, int] | None = None) -> bool:
+        '''Returns whether cells are waiting to be discovered, see reveal
+
+        :param tuple[int, int, int, int] | None area: The rectangle of cells around which to look, using format
+            (x0, y0, x1, y1) with x1 and y1 excluded, None to look everywhere (optional)
+        :return bool: Whether cells are waiting in the chunks of the rectangle or next to it
+        '''
+        return any(cells and self.near(key, area) for key, cells in self.frontier.items())
+
+    def reveal(self, area: tuple[int, int, int, int] | None = None) -> np.ndarray:
+        '''Goes on discovering the regions that stopped at max_reveal cells, discovering at most max_reveal cells again
+        The cells waiting in chunks away from the rectangle stay queued, so that an unbounded region only grows where the
+        player looks
+
+        :param tuple[int, int, int, int] | None area: The rectangle of cells around which to discover, using format
+            (x0, y0, x1, y1) with x1 and y1 excluded, None to discover everywhere (optional)
+        :return np.ndarray: The coordinates of the discovered cells
+        '''
+        size = self.chunk_size
+        pending = [key for key in self.frontier if self.near(key, area)] # The last chunk queued is the first emptied
+        changed = []
+        while pending and len(changed) < self.max_reveal:
+            cells = self.frontier[pending[-1]]
+            if not cells:
+                del self.frontier[pending.pop()]
+                continue
+            x, y = cells.pop()
+            if self.discovered_at(x, y) == 2:
+                continue
+            self.set_discovered(x, y, 2)
+            changed.append((x, y))
+
+            if self.neighbours_at(x, y) == 0:
+                for i in range(-1, 2):
+                    for j in range(-1, 2):
+                        if self.discovered_at(x+i, y+j) != 2:
+                            key = ((x+i) // size, (y+j) // size)
+                            if key not in self.frontier:
+                                self.frontier[key] = set()
+                                if self.near(key, area):
+                                    pending.append(key)
+                            self.frontier[key].add((x+i, y+j))
+
+        return np.array(changed, dtype=int).reshape(-1, 2)
+
+    def discover(self, x: int, y: int, state: None = None) -> tuple[bool, np.ndarray]:
+        '''Discovers a cell, and the region around it if it has no neighbouring mines, see game_logic.discover_cell
+        At most max_reveal cells are discovered, the rest of the region being queued for reveal
+
+        :param int x: The x-coordinate of the cell
+        :param int y: The y-coordinate of the cell
+        :param None state: Not supported, since an unbounded board cannot be won
+        :return tuple[bool, np.ndarray]: Whether the cell is a mine, and the coordinates of the discovered cells
+        '''
+        if state is not None:
+            raise ValueError('A chunked board does not keep the counters of a game state')
+
+        # The chunk of the cell is queued last, so that its region is discovered before the regions queued earlier
+        key = (x // self.chunk_size, y // self.chunk_size)
+        self.frontier[key] = self.frontier.pop(key, set()) | {(x, y)}
+        return self.neighbours_at(x, y) == -1, self.reveal()
+
+    def flag(self, x: int, y: int, state: None = None) -> np.ndarray:
+        '''Flags or unflags a cell, see game_logic.flag_cell
+
+        :param int x: The x-coordinate of the cell
+        :param int y: The y-coordinate of the cell
+        :param None state: Not supported, since an unbounded board cannot be won
+        :return np.ndarray: The coordinates of the changed cells
+        '''
+        if state is not None:
+            raise ValueError('A chunked board does not keep the counters of a game state')
+        return GameLogic.flag_cell(self.discovered_grid, x, y)
@@ -0,0 +1,154 @@
+from typing import NamedTuple
+
+import numpy as np
+
+import scripts.game_logic as GameLogic
+from scripts.topology import SQUARE, Topology, get_topology
+
+
+# The actions that can be applied to a board
+NO_ACTION = 0
+DISCOVER = 1
+FLAG = 2
+
+
+
+class StepResult(NamedTuple):
+    '''The outcome of a step, with one value per board'''
+    hit_mine: np.ndarray
+    revealed: np.ndarray
+    won: np.ndarray
+
+
+
+class BatchEngine:
+    '''A headless engine playing many games of the same size at once
+    The boards are stored as stacked (n, width, height) arrays and each step applies one move per board with
+    vectorized operations, following the rules of game_logic
+    '''
+    topology: Topology
+    grid: np.ndarray
+    neighbours_grid: np.ndarray
+    discovered_grid: np.ndarray
+    labels: np.ndarray
+    region_count: int
+    flagged_mines: np.ndarray
+    discovered_cells: np.ndarray
+    finished: np.ndarray
+
+    def __init__(self, board_count: int, grid_size: tuple[int, int], mine_count: int, seed: int | None = None, topology: str = SQUARE) -> None:
+        '''Initializes the engine, the boards being generated by reset
+
+        :param int board_count: The number of boards
+        :param tuple[int, int] grid_size: The size of each grid, using format (width, height)
+        :param int mine_count: The number of mines in each grid
+        :param int seed: The root seed of the boards, each board getting an independent generator (optional)
+        :param str topology: The kind of board, one of the kinds of scripts.topology (optional)
+        '''
+        self.board_count = board_count
+        self.grid_size = grid_size
+        self.topology = get_topology(topology, grid_size)
+        self.mine_count = mine_count
+        self.safe_cell_count = grid_size[0] * grid_size[1] - mine_count
+        self.seed_sequence = np.random.SeedSequence(seed)
+
+    def reset(self, xs: np.ndarray, ys: np.ndarray) -> StepResult:
+        '''Generates new boards from the position of their first discovered cell, like game_logic.create_from_coords
+
+        :param np.ndarray xs: The x-coordinate of the first cell of each board
+        :param np.ndarray ys: The y-coordinate of the first cell of each board
+        :return StepResult: The outcome of discovering the first cells
+        '''
+        n = self.board_count
+        mines = np.empty((n, *self.grid_size), dtype=bool)
+        for i, seed in enumerate(self.seed_sequence.spawn(n)):
+            safe_cells = GameLogic.safe_zone(int(xs[i]), int(ys[i]), self.grid_size, self.mine_count, self.topology)
+            mines[i] = GameLogic.create_mine_mask(self.grid_size, self.mine_count, safe_cells, np.random.default_rng(seed))
+        return self.load(mines, xs, ys)
+
+    def load(self, mines: np.ndarray, xs: np.ndarray, ys: np.ndarray) -> StepResult:
+        '''Starts new games on given boards, used to replay games whose mines are known
+
+        :param np.ndarray mines: The boolean masks of the cells containing a mine, as a (n, width, height) array
+        :param np.ndarray xs: The x-coordinate of the first cell of each board
+        :param np.ndarray ys: The y-coordinate of the first cell of each board
+        :return StepResult: The outcome of discovering the first cells
+        '''
+        n = self.board_count
+        self.grid = mines.view(np.int8)
+        self.neighbours_grid = GameLogic.create_neighbours_grid(mines, np.int8, self.topology)
+        self.discovered_grid = np.zeros(mines.shape, dtype=np.int8)
+        self.labels, bounds = GameLogic.label_regions(self.neighbours_grid, self.topology)
+        self.region_count = len(bounds) - 1
+        self.flagged_mines = np.zeros(n, dtype=np.int64)
+        self.discovered_cells = np.zeros(n, dtype=np.int64)
+        self.finished = np.zeros(n, dtype=bool)
+        return self.step(np.full(n, DISCOVER), xs, ys)
+
+    def step(self, actions: np.ndarray, xs: np.ndarray, ys: np.ndarray) -> StepResult:
+        '''Applies one move to each board
+        The moves on boards whose game has ended are ignored
+
+        :param np.ndarray actions: The action of each board, one of NO_ACTION, DISCOVER and FLAG
+        :param np.ndarray xs: The x-coordinate of the cell of each move
+        :param np.ndarray ys: The y-coordinate of the cell of each move
+        :return StepResult: The outcome of the moves
+        '''
+        actions = np.where(self.finished, NO_ACTION, actions)
+        xs, ys = np.asarray(xs), np.asarray(ys)
+        hit_mine = np.zeros(self.board_count, dtype=bool)
+        revealed = np.zeros(self.board_count, dtype=np.int64)
+
+        # Flags or unflags the cells that have not been discovered
+        b = np.flatnonzero(actions == FLAG)
+        current = self.discovered_grid[b, xs[b], ys[b]]
+        b, current = b[current < 2], current[current < 2]
+        self.discovered_grid[b, xs[b], ys[b]] = 1 - current
+        self.flagged_mines[b] += np.where(self.grid[b, xs[b], ys[b]] == 1, 1 - 2 * current, 0)
+
+        # Discovers the cells, with their whole region when they have no neighbouring mines
+        b = np.flatnonzero(actions == DISCOVER)
+        bx, by = xs[b], ys[b]
+        hit_mine[b] = self.grid[b, bx, by] == 1
+        single = self.discovered_grid[b, bx, by] != 2
+        labels = self.labels[b, bx, by]
+        single &= labels == 0
+        self._reveal(b[single], bx[single], by[single], revealed)
+
+        in_region = b[labels > 0]
+        if len(in_region):
+            selected = np.zeros(self.region_count + 1, dtype=bool)
+            selected[labels[labels > 0]] = True
+            cells = GameLogic.dilate(selected[self.labels[in_region]], self.topology)
+            cells &= self.discovered_grid[in_region] != 2
+            board, cx, cy = np.nonzero(cells)
+            self._reveal(in_region[board], cx, cy, revealed)
+
+        won = (self.flagged_mines == self.mine_count) | (self.discovered_cells == self.safe_cell_count)
+        won &= ~(self.finished | hit_mine)
+        self.finished |= hit_mine | won
+        return StepResult(hit_mine, revealed, won)
+
+    def _reveal(self, boards: np.ndarray, xs: np.ndarray, ys: np.ndarray, revealed: np.ndarray) -> None:
+        '''Discovers hidden or flagged cells and updates the counters of their boards
+
+        :param np.ndarray boards: The board of each cell
+        :param np.ndarray xs: The x-coordinate of each cell
+        :param np.ndarray ys: The y-coordinate of each cell
+        :param np.ndarray revealed: The number of cells revealed on each board, updated in place
+        '''
+        mines = self.grid[boards, xs, ys] == 1
+        flagged = self.discovered_grid[boards, xs, ys] == 1
+        self.discovered_grid[boards, xs, ys] = 2
+
+        n = self.board_count
+        revealed += np.bincount(boards, minlength=n)
+        self.discovered_cells += np.bincount(boards[~mines], minlength=n)
+        self.flagged_mines -= np.bincount(boards[mines & flagged], minlength=n)
+
+    def visible_neighbours(self) -> np.ndarray:
+        '''Returns what the players can see of the boards
+
+        :return np.ndarray: The neighbour counts of the discovered cells, the other cells having a value of -2
+        '''
+        return np.where(self.discovered_grid == 2, self.neighbours_grid, -2).astype(np.int8)
@@ -1,69 +1,196 @@
-import random
+from typing import TYPE_CHECKING
+
 import numpy as np
 
+from scripts.topology import Topology
+
+if TYPE_CHECKING:
+    from scripts.history import History
+
+
+
+SAMPLING_CHUNK_SIZE = 1 << 20 # The number of cells sampled at once when placing mines
 
 
-def create_grid(grid_size: tuple[int, int], mine_count: int) -> np.ndarray:
+def create_mine_mask(grid_size: tuple[int, int], mine_count: int, safe_cells: np.ndarray | None = None, rng: np.random.Generator | None = None) -> np.ndarray:
+    '''Creates a boolean mask of the mines of a grid
+    The mines are sampled without replacement, so the cost does not depend on the mine density. The cells are split
+    in chunks whose mine counts are drawn from a multivariate hypergeometric distribution, which keeps the memory used
+    by the sampling bounded on very large grids
+
+    :param tuple[int, int] grid_size: The size of the grid, using format (width, height)
+    :param int mine_count: The number of mines to place in the grid
+    :param np.ndarray safe_cells: The flat indices of the cells that must not contain a mine (optional)
+    :param np.random.Generator rng: The random generator to use (optional)
+    :return np.ndarray: A 2D boolean array whose True cells contain a mine
+    '''
+    if rng is None:
+        rng = np.random.default_rng()
+    cell_count = grid_size[0] * grid_size[1]
+    safe_cells = np.unique(safe_cells) if safe_cells is not None else np.empty(0, dtype=np.intp)
+    free_count = cell_count - len(safe_cells)
+    if not 0 <= mine_count <= free_count:
+        raise ValueError(f'Cannot place {mine_count} mines in a grid of {cell_count} cells with {len(safe_cells)} safe cells')
+
+    mask = np.zeros(cell_count, dtype=bool)
+    if mine_count == 0:
+        return mask.reshape(grid_size)
+
+    chunk_starts = np.arange(0, free_count, SAMPLING_CHUNK_SIZE)
+    chunk_sizes = np.diff(np.append(chunk_starts, free_count))
+    chunk_counts = rng.multivariate_hypergeometric(chunk_sizes, mine_count)
+    shifts = safe_cells - np.arange(len(safe_cells))
+
+    # Sample among the cells that are not safe, then shift the samples past the safe cells
+    for start, size, count in zip(chunk_starts, chunk_sizes, chunk_counts):
+        samples = start + rng.choice(size, count, replace=False)
+        mask[samples + np.searchsorted(shifts, samples, side='right')] = True
+    return mask.reshape(grid_size)
+
+
+def create_grid(grid_size: tuple[int, int], mine_count: int, safe_cells: np.ndarray | None = None, rng: np.random.Generator | None = None) -> np.ndarray:
     '''Creates a grid with bombs
     
     :param tuple[int, int] grid_size: The size of the grid, using format (width, height)
     :param int mine_count: The number of mines to place in the grid
+    :param np.ndarray safe_cells: The flat indices of the cells that must not contain a mine (optional)
+    :param np.random.Generator rng: The random generator to use (optional)
     :return np.ndarray: A 2D list representing the grid, in which:
         - 0 represents an empty cell
         - 1 represents a cell with a mine
     '''
-    grid = np.zeros(grid_size, dtype=int)
-    
-    i = 0
-    while i < mine_count:
-        x = random.randint(0, grid_size[0] - 1)
-        y = random.randint(0, grid_size[1] - 1)
-        
-        if grid[x, y] == 0:
-            grid[x, y] = 1
-            i += 1
-    
-    return grid
+    return create_mine_mask(grid_size, mine_count, safe_cells, rng).astype(int)
 
 
-def count_neighbours(grid: np.ndarray, x: int, y: int) -> int:
+def count_neighbours(grid: np.ndarray, x: int, y: int, topology: Topology | None = None) -> int:
     '''Counts the number of mines in the neighbouring cells
     
     :param np.ndarray grid: The grid to check
     :param int x: The x-coordinate of the cell
     :param int y: The y-coordinate of the cell
+    :param Topology topology: The neighbours of the cells, a square board by default (optional)
     :return int: The number of mines in the neighbouring cells
     '''
+    if topology is None:
+        topology = Topology(grid.shape)
     count = 0
     
-    for i in range(-1, 2):
-        for j in range(-1, 2):
-            if not (i == 0 and j == 0) \
-                and x+i >= 0 and x+i < grid.shape[0] \
-                and y+j >= 0 and y+j < grid.shape[1]:
-
-                count += grid[x+i, y+j]
+    for nx, ny in topology.iter_neighbours(x, y):
+        count += grid[nx, ny]
     
     return count
 
 
-def create_neighbours_grid(grid: np.ndarray) -> np.ndarray:
+def create_neighbours_grid(grid: np.ndarray, dtype: type = int, topology: Topology | None = None) -> np.ndarray:
     '''Creates a grid in which each cell represents the number of mines in the neighbouring cells
+    A stack of grids can be passed, the neighbours being counted along the last two axes
     
     :param np.ndarray grid: The grid to check
+    :param type dtype: The type of the returned grid, which must be signed (optional)
+    :param Topology topology: The neighbours of the cells, a square board by default (optional)
     :return np.ndarray: A 2D list representing the grid, in which each cell contains the number of mines in the neighbouring cells
         - cells with mines have a value of -1
     '''
-    neighbours_grid = np.zeros(grid.shape, dtype=int)
-    for x in range(grid.shape[0]):
-        for y in range(grid.shape[1]):
-            if grid[x, y] == 0:
-                neighbours_grid[x, y] = count_neighbours(grid, x, y)
-            else:
-                neighbours_grid[x, y] = -1
+    if topology is None:
+        topology = Topology(grid.shape[-2:])
+    neighbours_grid = topology.count(grid, dtype)
+    neighbours_grid[np.asarray(grid) == 1] = -1
     return neighbours_grid
 
 
+def dilate(mask: np.ndarray, topology: Topology | None = None) -> np.ndarray:
+    '''Extends a mask to the neighbouring cells of its cells, along the last two axes
+    
+    :param np.ndarray mask: The boolean mask to extend
+    :param Topology topology: The neighbours of the cells, a square board by default (optional)
+    :return np.ndarray: The extended mask
+    '''
+    if topology is None:
+        topology = Topology(mask.shape[-2:])
+    return topology.dilate(mask)
+
+
+def label_regions(neighbours_grid: np.ndarray, topology: Topology | None = None) -> tuple[np.ndarray, np.ndarray]:
+    '''Labels the connected regions of cells that have no neighbouring mines, see Topology.label
+    A stack of grids can be passed, in which case the labels are unique across the whole stack
+    
+    :param np.ndarray neighbours_grid: The grid of neighbours
+    :param Topology topology: The neighbours of the cells, a square board by default (optional)
+    :return tuple[np.ndarray, np.ndarray]: A tuple containing:
+        - an array in which each cell contains the label of its region, starting from 1, or 0 if the cell has neighbouring mines
+        - an array of shape (k+1, 4) containing the bounds (x0, y0, x1, y1) of each of the k regions, the upper bounds being exclusive
+    '''
+    if topology is None:
+        topology = Topology(neighbours_grid.shape[-2:])
+    return topology.label(np.asarray(neighbours_grid) == 0)
+
+
+class Regions:
+    '''The connected regions of cells without neighbouring mines, labelled once per grid
+    Discovering any cell of a region discovers the whole region along with its border of numbered cells
+    The regions are stored as runs of consecutive cells rather than as a grid of labels, so that they take memory in
+    proportion to the number of runs, which is a small fraction of the number of cells
+    '''
+    topology: Topology
+    starts: np.ndarray      # The flat index of the first cell of each run, in increasing order
+    ends: np.ndarray        # The flat index after the last cell of each run
+    run_labels: np.ndarray  # The label of the region of each run, starting from 1
+    order: np.ndarray       # The runs sorted by label, the runs of the region l being order[offsets[l]:offsets[l+1]]
+    offsets: np.ndarray
+
+    def __init__(self, neighbours_grid: np.ndarray, topology: Topology | None = None) -> None:
+        '''Labels the regions of the grid
+        
+        :param np.ndarray neighbours_grid: The grid of neighbours
+        :param Topology topology: The neighbours of the cells, a square board by default (optional)
+        '''
+        self.topology = topology if topology is not None else Topology(neighbours_grid.shape)
+        self.starts, self.ends, self.run_labels = self.topology.runs(np.asarray(neighbours_grid) == 0)
+        self.order = np.argsort(self.run_labels, kind='stable').astype(self.starts.dtype)
+        self.offsets = np.searchsorted(self.run_labels[self.order], np.arange(self.region_count + 2))
+
+    @property
+    def region_count(self) -> int:
+        return int(self.run_labels.max(initial=0))
+
+    @property
+    def sizes(self) -> np.ndarray:
+        '''The number of cells of each region, at the index of its label, index 0 being unused'''
+        return np.bincount(self.run_labels, self.ends - self.starts, minlength=self.region_count + 1).astype(np.intp)
+
+    def label(self, x: int, y: int) -> int:
+        '''Returns the label of the region of a cell
+
+        :param int x: The x-coordinate of the cell
+        :param int y: The y-coordinate of the cell
+        :return int: The label of the region, 0 if the cell has neighbouring mines
+        '''
+        cell = x * self.topology.grid_size[1] + y
+        run = np.searchsorted(self.starts, cell, side='right') - 1
+        return int(self.run_labels[run]) if run >= 0 and cell < self.ends[run] else 0
+
+    def members(self, label: int) -> np.ndarray:
+        '''Returns the cells of a region, without its border
+
+        :param int label: The label of the region
+        :return np.ndarray: The coordinates of the cells, with shape (n, 2)
+        '''
+        runs = self.order[self.offsets[label]:self.offsets[label+1]]
+        starts, lengths = self.starts[runs], self.ends[runs] - self.starts[runs]
+        # The index of each cell is the start of its run plus its position in the run
+        cells = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return np.stack(np.divmod(cells, self.topology.grid_size[1]), axis=1)
+
+    def region_cells(self, label: int) -> np.ndarray:
+        '''Returns the cells of a region and of its border
+        
+        :param int label: The label of the region
+        :return np.ndarray: The coordinates of the cells, with shape (n, 2)
+        '''
+        members = self.members(label)
+        return self.topology.with_neighbours(members[:, 0], members[:, 1])
+
+
 def create_discovered_grid(grid: np.ndarray) -> np.ndarray:
     '''Creates a grid in which each cell represents whether it has been discovered
     
@@ -77,20 +204,30 @@ def create_discovered_grid(grid: np.ndarray) -> np.ndarray:
 
 
 
-def flag_cell(discovered_grid: np.ndarray, x: int, y: int) -> None:
+def flag_cell(discovered_grid: np.ndarray, x: int, y: int, state: 'GameState | None' = None) -> np.ndarray:
     '''Flags a cell (or unflags it if it is already flagged)
     
     :param np.ndarray discovered_grid: The grid of discovered cells
     :param int x: The x-coordinate of the cell
     :param int y: The y-coordinate of the cell
+    :param GameState state: The game state whose counters to update (optional)
+    :return np.ndarray: The coordinates of the changed cells, with shape (n, 2)
     '''
-    if discovered_grid[x, y] == 0:
+    previous = discovered_grid[x, y]
+    if previous == 0:
         discovered_grid[x, y] = 1
-    elif discovered_grid[x, y] == 1:
+    elif previous == 1:
         discovered_grid[x, y] = 0
+    else:
+        return np.empty((0, 2), dtype=int)
 
+    changed = np.array([[x, y]])
+    if state is not None:
+        state.update(changed, np.array([previous]))
+    return changed
 
-def discover_cell(grid: np.ndarray, neighbours_grid: np.ndarray, discovered_grid: np.ndarray, x: int, y: int) -> tuple[bool, int]:
+
+def discover_cell(grid: np.ndarray, neighbours_grid: np.ndarray, discovered_grid: np.ndarray, x: int, y: int, state: 'GameState | None' = None, regions: Regions | None = None, topology: Topology | None = None) -> tuple[bool, np.ndarray]:
     '''Discovers a cell and returns if the discovered cell is a mine
     If the chosen cell has no neighbouring mines, the function will discover all the neighbouring cells
     
@@ -98,72 +235,183 @@ def discover_cell(grid: np.ndarray, neighbours_grid: np.ndarray, discovered_grid
     :param np.ndarray discovered_grid: The grid of discovered cells
     :param int x: The x-coordinate of the cell
     :param int y: The y-coordinate of the cell
-    :return tuple[bool, int]: A tuple containing:
+    :param GameState state: The game state whose counters to update (optional)
+    :param Regions regions: The labelled regions of the grid, which replace the flood fill with a single assignment (optional)
+    :param Topology topology: The neighbours of the cells used by the flood fill, a square board by default (optional)
+    :return tuple[bool, np.ndarray]: A tuple containing:
         - a boolean whose value is True if the discovered cell is a mine, False otherwise
-        - an integer representing the number of mines that were discovered
+        - the coordinates of the cells that were discovered, with shape (n, 2)
     '''
+    if regions is not None:
+        label = regions.label(x, y)
+        cells = regions.region_cells(label) if label != 0 else np.array([[x, y]])
+        previous = discovered_grid[cells[:, 0], cells[:, 1]]
+        hidden = previous != 2
+        changed, previous = cells[hidden], previous[hidden]
+        discovered_grid[changed[:, 0], changed[:, 1]] = 2
+
+        if state is not None:
+            state.update(changed, previous)
+        return grid[x, y] == 1, changed
+
+    if topology is None:
+        topology = Topology(grid.shape)
     stack = [(x, y)]
-    discovered_cells = set()
+    discovered_cells = {} # Maps each discovered cell to its previous state
     while stack:
         cx, cy = stack.pop()
         if discovered_grid[cx, cy] != 2:
+            discovered_cells[cx, cy] = discovered_grid[cx, cy]
             discovered_grid[cx, cy] = 2
-            discovered_cells.add((cx, cy))
             
             if neighbours_grid[cx, cy] == 0:
-                for i in range(-1, 2):
-                    for j in range(-1, 2):
-                        if not (i == 0 and j == 0) \
-                            and cx+i >= 0 and cx+i < grid.shape[0] \
-                            and cy+j >= 0 and cy+j < grid.shape[1]:
-
-                            if (cx+i, cy+j) not in discovered_cells:
-                                stack.append((cx+i, cy+j))
+                for neighbour in topology.iter_neighbours(cx, cy):
+                    if neighbour not in discovered_cells:
+                        stack.append(neighbour)
     
-    return grid[x, y] == 1, len(discovered_cells)
+    changed = np.array(list(discovered_cells), dtype=int).reshape(-1, 2)
+    if state is not None:
+        state.update(changed, np.array(list(discovered_cells.values()), dtype=int))
+    return grid[x, y] == 1, changed
+
+
+def count_progress(grid: np.ndarray, discovered_grid: np.ndarray) -> tuple[int, int]:
+    '''Counts the flagged mines and the discovered safe cells by scanning the whole grid
+    
+    :param np.ndarray grid: The grid of the game
+    :param np.ndarray discovered_grid: The grid of discovered cells
+    :return tuple[int, int]: A tuple containing:
+        - the number of flagged mines
+        - the number of discovered cells that are not mines
+    '''
+    mines = grid == 1
+    flagged_mines = np.count_nonzero(mines & (discovered_grid == 1))
+    discovered_cells = np.count_nonzero(~mines & (discovered_grid == 2))
+    return int(flagged_mines), int(discovered_cells)
 
 
 def check_win(grid: np.ndarray, discovered_grid: np.ndarray, mine_count: int) -> bool:
     '''Checks if the game has been won, either by flagging all the mines or discovering all the cells
+    This scans the whole grid, use GameState.has_won to check a running game
     
     :param np.ndarray grid: The grid of the game
     :param np.ndarray discovered_grid: The grid of discovered cells
     :param int mine_count: The number of mines in the grid
     :return bool: True if the game has been won, False otherwise
     '''
-    flagged_bombs = 0
-    discovered_cells = 0
+    flagged_mines, discovered_cells = count_progress(grid, discovered_grid)
+    return flagged_mines == mine_count or discovered_cells == grid.shape[0] * grid.shape[1] - mine_count
 
-    for x in range(grid.shape[0]):
-        for y in range(grid.shape[1]):
 
-            if grid[x, y] == 1 and discovered_grid[x, y] == 1:
-                flagged_bombs += 1
-            
-            elif grid[x, y] == 0 and discovered_grid[x, y] == 2:
-                discovered_cells += 1
 
-    return flagged_bombs == mine_count or discovered_cells == grid.shape[0] * grid.shape[1] - mine_count
+class GameState:
+    '''Keeps running counters of the progress of a game, so that checking for a win does not scan the grid
+    The counters are updated by discover_cell and flag_cell when the state is passed to them, which also records the
+    changes in the history of the game if it has one
+    '''
+    grid: np.ndarray
+    discovered_grid: np.ndarray
+    mine_count: int
+    safe_cell_count: int
+    flagged_mines: int
+    discovered_cells: int
+    debug: bool
+    history: 'History | None'
+
+    def __init__(self, grid: np.ndarray, discovered_grid: np.ndarray, mine_count: int, debug: bool = False, history: 'History | None' = None) -> None:
+        '''Initializes the counters from the current grids
         
+        :param np.ndarray grid: The grid of the game
+        :param np.ndarray discovered_grid: The grid of discovered cells
+        :param int mine_count: The number of mines in the grid
+        :param bool debug: Whether to check the counters against a full recount on every win check
+        :param History history: The history recording the changes to undo them, see scripts.history (optional)
+        '''
+        self.grid = grid
+        self.discovered_grid = discovered_grid
+        self.mine_count = mine_count
+        self.safe_cell_count = grid.shape[0] * grid.shape[1] - mine_count
+        self.flagged_mines, self.discovered_cells = count_progress(grid, discovered_grid)
+        self.debug = debug
+        self.history = history
+
+    def update(self, cells: np.ndarray, previous: np.ndarray, record: bool = True) -> None:
+        '''Updates the counters after some cells of the discovered grid changed
+        
+        :param np.ndarray cells: The coordinates of the changed cells, with shape (n, 2)
+        :param np.ndarray previous: The values of the changed cells in the discovered grid before the change
+        :param bool record: Whether to record the change in the history, which does not record its own undos (optional)
+        '''
+        xs, ys = cells[:, 0], cells[:, 1]
+        mines = self.grid[xs, ys] == 1
+        current = self.discovered_grid[xs, ys]
+        self.flagged_mines += int(np.count_nonzero(mines & (current == 1)) - np.count_nonzero(mines & (previous == 1)))
+        self.discovered_cells += int(np.count_nonzero(~mines & (current == 2)) - np.count_nonzero(~mines & (previous == 2)))
+        if record and self.history is not None:
+            self.history.record(cells, previous, current, mines)
+
+    def verify(self) -> None:
+        '''Checks the counters against a full recount of the grids
+        
+        :raises RuntimeError: If the counters do not match the grids
+        '''
+        counted = count_progress(self.grid, self.discovered_grid)
+        if counted != (self.flagged_mines, self.discovered_cells):
+            raise RuntimeError(f'Game state counters {(self.flagged_mines, self.discovered_cells)} do not match the grid {counted}')
+
+    def has_won(self) -> bool:
+        '''Checks if the game has been won, either by flagging all the mines or discovering all the cells
+        
+        :return bool: True if the game has been won, False otherwise
+        '''
+        if self.debug:
+            self.verify()
+        return self.flagged_mines == self.mine_count or self.discovered_cells == self.safe_cell_count
+
+
+
+def safe_zone(x: int, y: int, grid_size: tuple[int, int], mine_count: int, topology: Topology | None = None) -> np.ndarray:
+    '''Returns the cells that must be kept free of mines for the first click to be safe
+    The zone covers the cell and its neighbours when the mine count allows it, so that the first click opens a region,
+    and falls back to the cell alone otherwise
+
+    :param int x: The x-coordinate of the cell
+    :param int y: The y-coordinate of the cell
+    :param tuple[int, int] grid_size: The size of the grid, using format (width, height)
+    :param int mine_count: The number of mines to place in the grid
+    :param Topology topology: The neighbours of the cells, a square board by default (optional)
+    :return np.ndarray: The flat indices of the cells in the zone
+    '''
+    if topology is None:
+        topology = Topology(grid_size)
+    cell = x * grid_size[1] + y
+    zone = topology.neighbour_indices(np.array([cell]))[0]
+    zone = np.append(zone[zone < topology.cell_count], cell)
+
+    if mine_count > grid_size[0] * grid_size[1] - len(zone):
+        return np.array([x * grid_size[1] + y])
+    return zone
 
 
-def create_from_coords(x: int, y: int, grid_size: tuple[int, int], mine_count: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+def create_from_coords(x: int, y: int, grid_size: tuple[int, int], mine_count: int, rng: np.random.Generator | None = None, topology: Topology | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray, Regions]:
     '''Creates a grid from the position of a cell
-    Making sure that the designed cell does not contain a mine
+    Making sure that the designed cell does not contain a mine, and opens a region whenever the mine count allows it
 
     :param int x: The x-coordinate of the cell
     :param int y: The y-coordinate of the cell
     :param tuple[int, int] grid_size: The size of the grid, using format (width, height)
     :param int mine_count: The number of mines to place in the grid
-    :return tuple[np.ndarray, np.ndarray, np.ndarray]: A tuple containing:
+    :param np.random.Generator rng: The random generator to use (optional)
+    :param Topology topology: The neighbours of the cells, a square board by default (optional)
+    :return tuple[np.ndarray, np.ndarray, np.ndarray, Regions]: A tuple containing:
         - the grid of the game
         - the grid of neighbours
         - the grid of discovered cells
+        - the labelled regions of the grid
     '''
-    b, n = False, 0
-    while b or n <= 1:
-        grid = create_grid(grid_size, mine_count)
-        neighbours_grid = create_neighbours_grid(grid)
-        discovered_grid = create_discovered_grid(grid)
-        b, n = discover_cell(grid, neighbours_grid, discovered_grid, x, y)
-    return grid, neighbours_grid, discovered_grid
\ No newline at end of file
+    grid = create_grid(grid_size, mine_count, safe_zone(x, y, grid_size, mine_count, topology), rng)
+    neighbours_grid = create_neighbours_grid(grid, topology=topology)
+    discovered_grid = create_discovered_grid(grid)
+    regions = Regions(neighbours_grid, topology)
+    discover_cell(grid, neighbours_grid, discovered_grid, x, y, regions=regions)
+    return grid, neighbours_grid, discovered_grid, regions
\ No newline at end of file
@@ -0,0 +1,189 @@
+import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+import numpy as np
+
+import scripts.game_logic as GameLogic
+from scripts.board import Board
+from scripts.solver import Solver
+from scripts.topology import SQUARE, get_topology
+
+
+stop_event = None # Set by the generator while the player waits for a board, so that the background tasks give way
+
+
+def init_worker(event) -> None:
+    '''Keeps the event stopping the background tasks, run when a worker process starts'''
+    global stop_event
+    stop_event = event
+
+
+def is_solvable(mines: np.ndarray, x: int, y: int, solver: Solver | None = None, topology: str = SQUARE) -> bool:
+    '''Checks that a grid can be cleared from its first cell without guessing
+    The game is played by discovering every cell the solver proves safe and flagging every cell it proves to be a mine,
+    until the grid is cleared or nothing more can be deduced
+
+    :param np.ndarray mines: The boolean mask of the cells containing a mine
+    :param int x: The x-coordinate of the first discovered cell
+    :param int y: The y-coordinate of the first discovered cell
+    :param Solver solver: The solver to use (optional)
+    :param str topology: The kind of board, one of the kinds of scripts.topology (optional)
+    :return bool: True if the grid can be cleared by logic alone, False otherwise
+    '''
+    solver = solver or Solver()
+    topology = get_topology(topology, mines.shape)
+    grid = mines.view(np.int8)
+    neighbours_grid = GameLogic.create_neighbours_grid(mines, np.int8, topology)
+    discovered_grid = np.zeros(mines.shape, dtype=np.int8)
+    regions = GameLogic.Regions(neighbours_grid, topology)
+    mine_count = int(np.count_nonzero(mines))
+    safe_cell_count = mines.size - mine_count
+
+    GameLogic.discover_cell(grid, neighbours_grid, discovered_grid, x, y, regions=regions)
+    while np.count_nonzero(discovered_grid == 2) < safe_cell_count:
+        result = solver.solve(neighbours_grid, discovered_grid, mine_count, topology)
+        if not result.safe.any():
+            return False
+
+        discovered_grid[result.mines] = 1
+        for cx, cy in np.argwhere(result.safe).tolist():
+            if discovered_grid[cx, cy] == 0: # The cell may have been discovered with a region
+                GameLogic.discover_cell(grid, neighbours_grid, discovered_grid, cx, cy, regions=regions)
+    return True
+
+
+def find_solvable(x: int, y: int, grid_size: tuple[int, int], mine_count: int, seed: np.random.SeedSequence, attempts: int, topology: str = SQUARE, background: bool = False) -> np.ndarray | None:
+    '''Generates grids until one can be solved from its first cell, run in the worker processes
+
+    :param int x: The x-coordinate of the first discovered cell
+    :param int y: The y-coordinate of the first discovered cell
+    :param tuple[int, int] grid_size: The size of the grid, using format (width, height)
+    :param int mine_count: The number of mines to place in the grid
+    :param np.random.SeedSequence seed: The seed of the random generator of the worker
+    :param int attempts: The number of grids to try
+    :param str topology: The kind of board, one of the kinds of scripts.topology (optional)
+    :param bool background: Whether the task prepares a board in the background, which stops early while the player
+        waits for a board (optional)
+    :return np.ndarray | None: The boolean mask of the mines of the first solvable grid, None if none was found
+    '''
+    rng = np.random.default_rng(seed)
+    safe_cells = GameLogic.safe_zone(x, y, grid_size, mine_count, get_topology(topology, grid_size))
+    solver = Solver()
+    for _ in range(attempts):
+        if background and stop_event is not None and stop_event.is_set():
+            return None
+        mines = GameLogic.create_mine_mask(grid_size, mine_count, safe_cells, rng)
+        if is_solvable(mines, x, y, solver, topology):
+            return mines
+    return None
+
+
+
+class Generator:
+    '''Generates boards that can be solved without guessing, using a pool of processes
+    Each task of the pool tries a few grids with its own seed and the first solvable grid wins. Boards starting from a
+    random cell are also prepared in the background, so that a new game can start without waiting
+    '''
+    ready: deque
+    pending: dict[Future, tuple[int, int]]
+
+    def __init__(self, grid_size: tuple[int, int], mine_count: int, workers: int = 0, queue_size: int = 4, attempts: int = 8, max_attempts: int = 10000, seed: int | None = None, topology: str = SQUARE) -> None:
+        '''Initializes the generator and starts its processes
+
+        :param tuple[int, int] grid_size: The size of the grids, using format (width, height)
+        :param int mine_count: The number of mines in each grid
+        :param int workers: The number of processes, 0 to use all the cores but one
+        :param int queue_size: The number of ready boards to keep
+        :param int attempts: The number of grids tried by each task
+        :param int max_attempts: The number of grids tried by generate before giving up
+        :param int seed: The root seed of the tasks, each task getting an independent generator (optional)
+        :param str topology: The kind of board, one of the kinds of scripts.topology (optional)
+        '''
+        self.grid_size = grid_size
+        self.mine_count = mine_count
+        self.topology = topology
+        self.workers = workers or max((os.cpu_count() or 1) - 1, 1)
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self.seed_sequence.spawn(1)[0])
+        self.ready = deque(maxlen=queue_size)
+        self.pending = {} # Maps each background task to its first cell
+
+        # The processes are spawned rather than forked, so that they do not inherit the state of pygame
+        context = multiprocessing.get_context('spawn')
+        self.stop_event = context.Event()
+        self.executor = ProcessPoolExecutor(self.workers, mp_context=context, initializer=init_worker, initargs=(self.stop_event,))
+
+    def submit(self, x: int, y: int, background: bool = False) -> Future:
+        '''Submits a task looking for a grid solvable from the given cell
+
+        :param int x: The x-coordinate of the first discovered cell
+        :param int y: The y-coordinate of the first discovered cell
+        :param bool background: Whether the task prepares a board in the background (optional)
+        :return Future: The future of the task
+        '''
+        seed = self.seed_sequence.spawn(1)[0]
+        return self.executor.submit(find_solvable, x, y, self.grid_size, self.mine_count, seed, self.attempts, self.topology, background)
+
+    def generate(self, x: int, y: int) -> Board | None:
+        '''Generates a board solvable from the given cell, waiting for the first task to find one
+
+        :param int x: The x-coordinate of the first discovered cell
+        :param int y: The y-coordinate of the first discovered cell
+        :return Board | None: The board with the first cell discovered, None if no solvable grid was found
+        '''
+        # The background tasks are queued before those of the player, so the ones not started yet are cancelled and the
+        # others stop at their next grid
+        self.stop_event.set()
+        for future in self.pending:
+            future.cancel()
+
+        futures = {self.submit(x, y) for _ in range(self.workers)}
+        submitted = len(futures)
+        try:
+            while futures:
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    mines = future.result()
+                    if mines is not None:
+                        return Board.from_mines(mines, x, y, get_topology(self.topology, self.grid_size))
+
+                    if submitted * self.attempts < self.max_attempts:
+                        futures.add(self.submit(x, y))
+                        submitted += 1
+            return None
+        finally:
+            for future in futures:
+                future.cancel()
+            self.stop_event.clear()
+
+    def poll(self) -> None:
+        '''Collects the boards prepared in the background and keeps the processes busy while the queue is not full
+        It never blocks, so that it can be called on every frame
+        '''
+        for future in [f for f in self.pending if f.done()]:
+            x, y = self.pending.pop(future)
+            if not future.cancelled() and future.exception() is None and future.result() is not None:
+                self.ready.append((future.result(), x, y))
+
+        while len(self.ready) + len(self.pending) < self.ready.maxlen and len(self.pending) < self.workers:
+            x, y = self.rng.integers(self.grid_size[0]), self.rng.integers(self.grid_size[1])
+            self.pending[self.submit(int(x), int(y), background=True)] = (int(x), int(y))
+
+    def pop(self) -> tuple[Board, int, int] | None:
+        '''Returns a ready board, with its first cell discovered
+
+        :return tuple[Board, int, int] | None: The board and the coordinates of its first cell, None if no board is ready
+        '''
+        self.poll()
+        if not self.ready:
+            return None
+        mines, x, y = self.ready.popleft()
+        return Board.from_mines(mines, x, y, get_topology(self.topology, self.grid_size)), x, y
+
+    def close(self) -> None:
+        '''Stops the processes, abandoning the boards being prepared'''
+        self.executor.shutdown(wait=False, cancel_futures=True)
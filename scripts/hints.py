@@ -0,0 +1,167 @@
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from scripts.board import DiscoveredField, NeighboursField
+from scripts.topology import SQUARE
+
+
+# The values of the cells the player can see, the discovered cells having their number of neighbouring mines
+HIDDEN = -2
+FLAGGED = -3
+# The value of every packed cell of a board as seen by the player, the value of a cell depending only on its byte
+VISIBLE_VALUES = np.select(
+    [np.asarray(DiscoveredField(np.arange(256, dtype=np.uint8))) == d for d in (2, 1)],
+    [np.asarray(NeighboursField(np.arange(256, dtype=np.uint8))), FLAGGED],
+    HIDDEN,
+).astype(np.int8)
+
+# Layout of the shared memory, each block starting with a header of 8-byte counters
+# - the input: the generation of the board and the stop flag, then the visible value of each cell as int8
+# - the output: the generation of the probabilities, then the probability of each cell as float32
+HEADER_SIZE = 16
+GENERATION = 0
+STOP = 1
+# The generation of the output while the worker writes it, which never matches the generation of the board
+WRITING = 0
+
+
+
+def run_worker(input_name: str, output_name: str, grid_size: tuple[int, int], mine_count: int, topology: str, changed: multiprocessing.Event) -> None:
+    '''Solves the board of the input every time it changes and publishes the probabilities to the output, run in the
+    worker process
+    The board is read from the shared memory while the game keeps changing it, so a result is only published when the
+    generation of the board did not change while it was solved
+
+    :param str input_name: The name of the shared memory of the input
+    :param str output_name: The name of the shared memory of the output
+    :param tuple[int, int] grid_size: The size of the grid, using format (width, height)
+    :param int mine_count: The number of mines in the grid
+    :param str topology: The kind of board, one of the kinds of scripts.topology
+    :param multiprocessing.Event changed: The event set by the game after each change of the input
+    '''
+    from scripts.solver import Solver # Only the worker needs the solver
+    from scripts.topology import get_topology
+
+    # The spawned process shares the resource tracker of the game, so attaching the blocks does not make them leak
+    shared = [SharedMemory(input_name), SharedMemory(output_name)]
+    input_header = np.ndarray(2, dtype=np.uint64, buffer=shared[0].buf)
+    visible = np.ndarray(grid_size, dtype=np.int8, buffer=shared[0].buf, offset=HEADER_SIZE)
+    output_header = np.ndarray(1, dtype=np.uint64, buffer=shared[1].buf)
+    probabilities = np.ndarray(grid_size, dtype=np.float32, buffer=shared[1].buf, offset=HEADER_SIZE)
+
+    solver = Solver()
+    topology = get_topology(topology, grid_size)
+    try:
+        while True:
+            changed.wait()
+            changed.clear()
+            if input_header[STOP]:
+                break
+            generation = input_header[GENERATION]
+            if generation == output_header[GENERATION]:
+                continue
+
+            discovered_grid = np.where(visible >= 0, 2, np.where(visible == FLAGGED, 1, 0)).astype(np.int8)
+            result = solver.solve(visible, discovered_grid, mine_count, topology)
+            if input_header[GENERATION] != generation: # The board changed while it was solved, the event is set again
+                continue
+
+            output_header[GENERATION] = WRITING
+            probabilities[...] = result.probabilities
+            output_header[GENERATION] = generation
+    finally:
+        del input_header, visible, output_header, probabilities # The views must be released before closing the blocks
+        for block in shared:
+            block.close()
+
+
+
+class HintWorker:
+    '''Computes the probability of each hidden cell to contain a mine in a separate process, so that solving a large
+    board never delays the frames
+    The worker reads what the player can see of the board from shared memory and publishes the probabilities to shared
+    memory, both tagged with a generation counter so that the results of a board that has changed since are ignored
+    '''
+
+    def __init__(self, grid_size: tuple[int, int], mine_count: int, topology: str = SQUARE) -> None:
+        '''Creates the shared memory and starts the worker
+
+        :param tuple[int, int] grid_size: The size of the grid, using format (width, height)
+        :param int mine_count: The number of mines in the grid
+        :param str topology: The kind of board, one of the kinds of scripts.topology (optional)
+        '''
+        cell_count = grid_size[0] * grid_size[1]
+        self.input = SharedMemory(create=True, size=HEADER_SIZE + cell_count)
+        self.output = SharedMemory(create=True, size=HEADER_SIZE + 4 * cell_count)
+        self.input_header = np.ndarray(2, dtype=np.uint64, buffer=self.input.buf)
+        self.visible = np.ndarray(grid_size, dtype=np.int8, buffer=self.input.buf, offset=HEADER_SIZE)
+        self.output_header = np.ndarray(1, dtype=np.uint64, buffer=self.output.buf)
+        self.probabilities = np.ndarray(grid_size, dtype=np.float32, buffer=self.output.buf, offset=HEADER_SIZE)
+        self.input_header[:] = 0
+        self.output_header[:] = WRITING
+        self.polled = WRITING # The generation of the last result returned by poll
+
+        # The process is spawned rather than forked, so that it does not inherit the state of pygame
+        context = multiprocessing.get_context('spawn')
+        self.changed = context.Event()
+        self.process = context.Process(
+            target=run_worker,
+            args=(self.input.name, self.output.name, grid_size, mine_count, topology, self.changed),
+            daemon=True,
+        )
+        self.process.start()
+
+    @property
+    def generation(self) -> int:
+        '''The generation of the board, increased by every update'''
+        return int(self.input_header[GENERATION])
+
+    @property
+    def pending(self) -> bool:
+        '''Whether the probabilities of the current board have not been published yet'''
+        return int(self.output_header[GENERATION]) != self.generation
+
+    def update(self, cells: np.ndarray, changed: np.ndarray | None = None) -> None:
+        '''Copies what the player can see of the board to the worker, which then solves it again
+
+        :param np.ndarray cells: The packed cells of the board
+        :param np.ndarray changed: The coordinates of the cells that changed since the last update, with shape (n, 2),
+            None to copy the whole board (optional)
+        '''
+        if changed is None:
+            np.take(VISIBLE_VALUES, cells, out=self.visible)
+        else:
+            xs, ys = changed[:, 0], changed[:, 1]
+            self.visible[xs, ys] = VISIBLE_VALUES[cells[xs, ys]]
+        self.input_header[GENERATION] += np.uint64(1)
+        self.changed.set()
+
+    def poll(self) -> np.ndarray | None:
+        '''Returns the probabilities of the current board once they are published
+        The array is a view of the shared memory, which stays valid until the next update since the worker only writes
+        the probabilities of a board that was updated after them
+
+        :return np.ndarray | None: The probability of each cell, nan for the cells that are not hidden, None if the
+            probabilities are not ready or were already returned
+        '''
+        generation = self.generation
+        if int(self.output_header[GENERATION]) != generation or generation == self.polled:
+            return None
+        self.polled = generation
+        return self.probabilities
+
+    def close(self) -> None:
+        '''Stops the worker and frees the shared memory'''
+        self.input_header[STOP] = 1
+        self.changed.set()
+        self.process.join(1)
+        if self.process.is_alive(): # The worker is solving a large board, which is abandoned
+            self.process.terminate()
+            self.process.join()
+
+        del self.input_header, self.visible, self.output_header, self.probabilities
+        for block in (self.input, self.output):
+            block.close()
+            block.unlink()
@@ -0,0 +1,210 @@
+from collections import deque
+from typing import NamedTuple
+
+import numpy as np
+
+import scripts.game_logic as GameLogic
+
+
+# Each changed cell is stored as its flat index and a byte packing its value in the discovered grid before and after
+# the move, so that a move costs 5 bytes per changed cell whatever the size of the board
+OLD_MASK = 0x03
+NEW_SHIFT = 2
+NO_MINE = -1 # The exploded mine of the moves that did not discover a mine
+
+
+
+class Delta(NamedTuple):
+    '''The cells changed by a move'''
+    cells: np.ndarray   # The flat indices of the cells, as int32
+    values: np.ndarray  # The values of the cells before and after the move, as uint8
+    exploded: int       # The flat index of the mine discovered by the move, or NO_MINE
+
+    @property
+    def nbytes(self) -> int:
+        return self.cells.nbytes + self.values.nbytes
+
+
+class Checkpoint(NamedTuple):
+    '''The whole discovered grid after a move, packed to 2 bits per cell'''
+    flagged: np.ndarray
+    discovered: np.ndarray
+
+    @property
+    def nbytes(self) -> int:
+        return self.flagged.nbytes + self.discovered.nbytes
+
+
+
+class History:
+    '''Records the moves of a game so that they can be undone and redone
+    Each move only stores the cells it changed, and a checkpoint of the whole discovered grid is taken every
+    checkpoint_interval moves so that jumping to any move never replays more than that many moves. The oldest moves are
+    forgotten once the memory used by the moves and the checkpoints exceeds the budget
+    '''
+    deltas: deque[Delta]
+    checkpoints: dict[int, Checkpoint]
+
+    def __init__(self, budget: int = 64 << 20, checkpoint_interval: int = 64) -> None:
+        '''Initializes an empty history, which starts recording after reset
+
+        :param int budget: The memory the history may use, in bytes (optional)
+        :param int checkpoint_interval: The number of moves between two checkpoints (optional)
+        '''
+        if checkpoint_interval < 1:
+            raise ValueError('The checkpoint interval must be at least 1')
+        self.budget = budget
+        self.checkpoint_interval = checkpoint_interval
+        self.discovered_grid = None
+        self.deltas = deque()
+        self.checkpoints = {}
+        self.first = 0      # The move before the oldest delta, the first one that can be reached
+        self.position = 0   # The current move, the moves after it being the ones that can be redone
+        self.nbytes = 0
+
+    @property
+    def last(self) -> int:
+        '''The last move that can be redone'''
+        return self.first + len(self.deltas)
+
+    @property
+    def can_undo(self) -> bool:
+        return self.position > self.first
+
+    @property
+    def can_redo(self) -> bool:
+        return self.position < self.last
+
+    @property
+    def exploded(self) -> tuple[int, int] | None:
+        '''The mine discovered by the current move, which ended the game, or None'''
+        if self.position == self.first:
+            return None
+        cell = self.deltas[self.position - self.first - 1].exploded
+        return None if cell == NO_MINE else divmod(cell, self.discovered_grid.shape[1])
+
+    def reset(self, discovered_grid: np.ndarray) -> None:
+        '''Forgets every move and starts recording the moves of a new board
+
+        :param np.ndarray discovered_grid: The grid of discovered cells of the board, in its initial state
+        '''
+        self.discovered_grid = discovered_grid
+        self.deltas.clear()
+        self.checkpoints.clear()
+        self.first = self.position = self.nbytes = 0
+        self.add_checkpoint()
+
+    def add_checkpoint(self) -> None:
+        '''Stores the discovered grid of the current move'''
+        discovered_grid = np.asarray(self.discovered_grid)
+        checkpoint = Checkpoint(np.packbits(discovered_grid == 1), np.packbits(discovered_grid == 2))
+        self.checkpoints[self.position] = checkpoint
+        self.nbytes += checkpoint.nbytes
+
+    def record(self, cells: np.ndarray, previous: np.ndarray, current: np.ndarray, mines: np.ndarray) -> None:
+        '''Records a move, forgetting the moves that could be redone. Called by GameState.update
+
+        :param np.ndarray cells: The coordinates of the changed cells, with shape (n, 2)
+        :param np.ndarray previous: The values of the changed cells in the discovered grid before the move
+        :param np.ndarray current: The values of the changed cells in the discovered grid after the move
+        :param np.ndarray mines: The boolean mask of the changed cells containing a mine
+        '''
+        if len(cells) == 0:
+            return
+        while self.position < self.last:
+            self.nbytes -= self.deltas.pop().nbytes
+        for position in [p for p in self.checkpoints if p > self.position]:
+            self.nbytes -= self.checkpoints.pop(position).nbytes
+
+        flat = (cells[:, 0] * self.discovered_grid.shape[1] + cells[:, 1]).astype(np.int32)
+        values = (np.asarray(previous) | np.asarray(current) << NEW_SHIFT).astype(np.uint8)
+        exploded = flat[mines & (np.asarray(current) == 2)]
+        delta = Delta(flat, values, int(exploded[0]) if len(exploded) else NO_MINE)
+        self.deltas.append(delta)
+        self.nbytes += delta.nbytes
+        self.position += 1
+        if self.position % self.checkpoint_interval == 0:
+            self.add_checkpoint()
+
+        # The current move is always kept, so a single move larger than the budget is still recorded
+        while self.nbytes > self.budget and self.first < self.position:
+            self.nbytes -= self.deltas.popleft().nbytes
+            self.first += 1
+            if self.first - 1 in self.checkpoints:
+                self.nbytes -= self.checkpoints.pop(self.first - 1).nbytes
+
+    def apply(self, delta: Delta, state: GameLogic.GameState, undo: bool) -> np.ndarray:
+        '''Writes the values of the cells of a move to the discovered grid
+
+        :param Delta delta: The move
+        :param GameLogic.GameState state: The game state whose counters to update
+        :param bool undo: Whether to write the values from before the move rather than after it
+        :return np.ndarray: The coordinates of the changed cells, with shape (n, 2)
+        '''
+        old, new = delta.values & OLD_MASK, delta.values >> NEW_SHIFT
+        if undo:
+            old, new = new, old
+        cells = np.stack(np.divmod(delta.cells, self.discovered_grid.shape[1]), axis=1)
+        self.discovered_grid[cells[:, 0], cells[:, 1]] = new
+        state.update(cells, old, record=False)
+        return cells
+
+    def undo(self, state: GameLogic.GameState) -> np.ndarray:
+        '''Undoes the current move
+
+        :param GameLogic.GameState state: The game state whose counters to update
+        :return np.ndarray: The coordinates of the changed cells, with shape (n, 2)
+        '''
+        if not self.can_undo:
+            return np.empty((0, 2), dtype=int)
+        self.position -= 1
+        return self.apply(self.deltas[self.position - self.first], state, True)
+
+    def redo(self, state: GameLogic.GameState) -> np.ndarray:
+        '''Redoes the move after the current one
+
+        :param GameLogic.GameState state: The game state whose counters to update
+        :return np.ndarray: The coordinates of the changed cells, with shape (n, 2)
+        '''
+        if not self.can_redo:
+            return np.empty((0, 2), dtype=int)
+        self.position += 1
+        return self.apply(self.deltas[self.position - self.first - 1], state, False)
+
+    def restore(self, position: int, state: GameLogic.GameState) -> np.ndarray:
+        '''Replaces the discovered grid with a checkpoint
+
+        :param int position: The move of the checkpoint
+        :param GameLogic.GameState state: The game state whose counters to update
+        :return np.ndarray: The coordinates of the changed cells, with shape (n, 2)
+        '''
+        checkpoint = self.checkpoints[position]
+        shape = self.discovered_grid.shape
+        size = shape[0] * shape[1]
+        restored = np.unpackbits(checkpoint.flagged, count=size).reshape(shape).astype(np.int8)
+        restored += 2 * np.unpackbits(checkpoint.discovered, count=size).reshape(shape).astype(np.int8)
+
+        previous = np.array(self.discovered_grid) # A copy, the grid being written to before the counters are updated
+        cells = np.argwhere(restored != previous)
+        self.discovered_grid[cells[:, 0], cells[:, 1]] = restored[cells[:, 0], cells[:, 1]]
+        state.update(cells, previous[cells[:, 0], cells[:, 1]], record=False)
+        self.position = position
+        return cells
+
+    def jump(self, position: int, state: GameLogic.GameState) -> np.ndarray:
+        '''Goes to any move between the first and the last one, starting from the closest checkpoint when the move is
+        further than checkpoint_interval moves, so that at most that many moves are replayed
+
+        :param int position: The move to go to, clamped to the moves that can be reached
+        :param GameLogic.GameState state: The game state whose counters to update
+        :return np.ndarray: The coordinates of the changed cells, with shape (n, 2)
+        '''
+        position = min(max(position, self.first), self.last)
+        changed = []
+        if abs(self.position - position) > self.checkpoint_interval: # Restoring a checkpoint scans the whole grid
+            changed.append(self.restore(min(self.checkpoints, key=lambda p: abs(p - position)), state))
+        while self.position > position:
+            changed.append(self.undo(state))
+        while self.position < position:
+            changed.append(self.redo(state))
+        return np.concatenate(changed) if changed else np.empty((0, 2), dtype=int)
@@ -0,0 +1,191 @@
+import cProfile
+import csv
+import io
+import json
+import os
+import pstats
+import time
+
+import numpy as np
+
+
+# The phases of a frame of the game loop, in the order they happen
+PHASES = ('events', 'moves', 'win_check', 'generator', 'hints', 'animations', 'render', 'display')
+# The edges of the bins of the histograms, in seconds, from 1µs to 1s with 10 bins per decade
+HISTOGRAM_EDGES = np.logspace(-6, 0, 61)
+OUTPUT_FORMATS = ('.csv', '.json') # The extensions of the files the data of the profiler can be written to
+
+
+
+class NullProfiler:
+    '''A profiler that does nothing, used when profiling is disabled so that the game loop does not check for it'''
+    enabled = False
+
+    def begin_frame(self) -> None:
+        pass
+
+    def lap(self, phase: str) -> None:
+        pass
+
+    def end_frame(self) -> None:
+        pass
+
+    def note(self, name: str, text: str) -> None:
+        pass
+
+
+
+class FrameProfiler:
+    '''Times the phases of the frames of the game loop
+    The durations of the last frames are kept in a ring buffer for the percentiles, and the durations of all the frames
+    are counted in histograms with logarithmic bins
+    '''
+    enabled = True
+    samples: np.ndarray
+    histograms: np.ndarray
+
+    def __init__(self, history: int = 1024, phases: tuple[str, ...] = PHASES) -> None:
+        '''Initializes the profiler
+
+        :param int history: The number of frames whose durations are kept
+        :param tuple[str, ...] phases: The names of the phases of a frame
+        '''
+        self.phases = phases
+        self.columns = {phase: i for i, phase in enumerate(phases)}
+        self.history = history
+        self.samples = np.zeros((history, len(phases) + 1)) # The last column is the duration of the whole frame
+        self.histograms = np.zeros((len(phases) + 1, len(HISTOGRAM_EDGES) + 1), dtype=np.int64)
+        self.frame_count = 0
+        self.notes = {} # The messages shown under the statistics, by name
+        self.current = [0.] * len(phases)
+        self.start = self.last = 0.
+
+    def begin_frame(self) -> None:
+        '''Starts timing a frame'''
+        self.current = [0.] * len(self.phases)
+        self.start = self.last = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        '''Adds the time since the previous lap to a phase, a phase being possibly timed several times per frame
+
+        :param str phase: The name of the phase that just ended
+        '''
+        now = time.perf_counter()
+        self.current[self.columns[phase]] += now - self.last
+        self.last = now
+
+    def end_frame(self) -> None:
+        '''Stops timing the frame and records its durations'''
+        row = self.current + [time.perf_counter() - self.start]
+        self.samples[self.frame_count % self.history] = row
+        self.histograms[np.arange(len(row)), np.searchsorted(HISTOGRAM_EDGES, row)] += 1
+        self.frame_count += 1
+
+    def note(self, name: str, text: str) -> None:
+        '''Shows a message under the statistics, replacing the previous message of the same name
+
+        :param str name: The name of the message
+        :param str text: The message
+        '''
+        self.notes[name] = text
+
+    def window(self) -> np.ndarray:
+        '''Returns the durations of the last frames, from the oldest to the newest
+
+        :return np.ndarray: The durations in seconds, with one row per frame and one column per phase, then the total
+        '''
+        if self.frame_count <= self.history:
+            return self.samples[:self.frame_count]
+        return np.roll(self.samples, -(self.frame_count % self.history), axis=0)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        '''Returns the statistics of each phase over the last frames
+
+        :return dict[str, dict[str, float]]: The median, the 99th percentile and the maximum of each phase and of the
+            total, in seconds
+        '''
+        window = self.window()
+        if len(window) == 0:
+            window = np.zeros((1, len(self.phases) + 1))
+        p50, p99 = np.percentile(window, [50, 99], axis=0)
+        maximum = window.max(axis=0)
+        return {
+            name: {'p50': float(p50[i]), 'p99': float(p99[i]), 'max': float(maximum[i])}
+            for i, name in enumerate(self.phases + ('total',))
+        }
+
+    def hud_lines(self) -> list[str]:
+        '''Returns the lines of text of the statistics shown on the screen'''
+        lines = [f'{"ms":<10}{"p50":>8}{"p99":>8}{"max":>8}']
+        for name, stats in self.summary().items():
+            lines.append(f'{name:<10}' + ''.join(f'{stats[s] * 1000:>8.2f}' for s in ('p50', 'p99', 'max')))
+        lines.append(f'{min(self.frame_count, self.history)} of {self.frame_count} frames')
+        return lines + list(self.notes.values())
+
+    def dump(self, path: str) -> None:
+        '''Writes the data of the profiler to a file, in a format chosen from its extension
+        A .csv file holds the durations of the last frames, and a .json file holds the statistics, the histograms and the
+        messages of the HUD, such as the time to the first frame
+
+        :param str path: The path of the file
+        '''
+        if path.endswith('.csv'):
+            with open(path, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(['frame'] + [f'{name}_ms' for name in self.phases + ('total',)])
+                first = self.frame_count - len(self.window())
+                for i, row in enumerate(self.window()):
+                    writer.writerow([first + i] + [f'{d * 1000:.4f}' for d in row])
+
+        elif path.endswith('.json'):
+            report = {
+                'frames': self.frame_count,
+                'summary': self.summary(),
+                'histogram_edges': HISTOGRAM_EDGES.tolist(),
+                'histograms': {name: self.histograms[i].tolist() for i, name in enumerate(self.phases + ('total',))},
+                'notes': self.notes,
+            }
+            with open(path, 'w') as file:
+                json.dump(report, file, indent=2)
+
+        else:
+            raise ValueError(f'Unsupported profiler output {path}, the file must be a {" or a ".join(OUTPUT_FORMATS)} file')
+
+
+
+class ProfileCapture:
+    '''A capture of cProfile, started and stopped on demand to look into the frames that stutter'''
+    profile: cProfile.Profile | None
+
+    def __init__(self, directory: str) -> None:
+        '''Initializes the capture
+
+        :param str directory: The directory the captures are saved to
+        '''
+        self.directory = directory
+        self.profile = None
+
+    @property
+    def active(self) -> bool:
+        return self.profile is not None
+
+    def toggle(self) -> str | None:
+        '''Starts a capture, or stops the current one, saves it and prints the functions taking the most time
+
+        :return str | None: The path of the saved capture, None if a capture was started
+        '''
+        if self.profile is None:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+            return None
+
+        self.profile.disable()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'profile-{time.strftime("%Y%m%d-%H%M%S")}.prof')
+        self.profile.dump_stats(path)
+
+        output = io.StringIO()
+        pstats.Stats(self.profile, stream=output).sort_stats('cumulative').print_stats(20)
+        print(output.getvalue())
+        self.profile = None
+        return path
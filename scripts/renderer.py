@@ -1,7 +1,196 @@
+from math import ceil
+
 import pygame
 import numpy as np
 
 import scripts.assets as Assets
+from scripts.board import DiscoveredField, Field, MineField, NeighboursField
+from scripts.camera import Camera
+
+
+BACKGROUND_COLOR = '#202020' # The color of the screen around the board
+
+# Below this size, the cells are drawn as plain colors instead of textures
+LOD_CELL_SIZE = 8
+# The color of each tile when the cells are drawn as plain colors, the numbers being tinted with the color of their text
+LOD_COLORS = [
+    '#808080', '#D02020', '#C0C0C0',
+    '#6486DD', '#91C571', '#9EB46E', '#ABA36B', '#B89269', '#C58166', '#D27163', '#DF6060',
+    '#000000', '#FF0000',
+]
+LOD_BACKGROUND = Assets.TILE_COUNT # The index of BACKGROUND_COLOR in the palette, for the pixels outside of the board
+LOD_PALETTE = [pygame.Color(c)[:3] for c in LOD_COLORS + [BACKGROUND_COLOR]]
+MINIMAP_BORDER = 2
+MINIMAP_MARGIN = 8
+HINT_LEVELS = 11 # The number of shades of the hints, from the safe cells in green to the mines in red
+HINT_ALPHA = 112
+REVEAL_STEP = .03           # The time between two rings of cells revealed by a cascade, in seconds
+REVEAL_MAX_DURATION = .4    # The longest time a cascade takes, the rings of the larger ones being revealed closer together
+EXPLOSION_DURATION = .6
+EXPLOSION_FRAMES = 12
+EXPLOSION_SIZE = 3          # The side length of the explosions, in cells
+
+
+def packed_cells(grid: np.ndarray, neighbours_grid: np.ndarray, discovered_grid: np.ndarray) -> np.ndarray | None:
+    '''Returns the packed cells the grids are views of, so that their tiles are looked up in PACKED_TILES without
+    decoding the grids
+
+    :param np.ndarray grid: The grid to render
+    :param np.ndarray neighbours_grid: The grid of neighbouring mines
+    :param np.ndarray discovered_grid: The grid of rendered cells
+    :return np.ndarray | None: The packed cells, None if the grids are not the views of the same cells
+    '''
+    if isinstance(discovered_grid, Field) and all(isinstance(g, Field) and g.cells is discovered_grid.cells for g in (grid, neighbours_grid)):
+        return discovered_grid.cells
+    return None
+
+
+def tile_indices(grid: np.ndarray, neighbours_grid: np.ndarray, discovered_grid: np.ndarray) -> np.ndarray:
+    '''Maps the state of each cell to the tile of the atlas that renders it
+    
+    :param np.ndarray grid: The grid to render
+    :param np.ndarray neighbours_grid: The grid of neighbouring mines
+    :param np.ndarray discovered_grid: The grid of rendered cells
+    :return np.ndarray: The index of the tile of each cell
+    '''
+    cells = packed_cells(grid, neighbours_grid, discovered_grid)
+    if cells is not None:
+        return PACKED_TILES[cells] # The views of a board are decoded with a single lookup
+
+    grid, neighbours_grid, discovered_grid = np.asarray(grid), np.asarray(neighbours_grid), np.asarray(discovered_grid)
+    discovered = np.where(grid == 1, Assets.TILE_MINE, Assets.TILE_NUMBER + neighbours_grid)
+    hidden = np.where(discovered_grid == 1, Assets.TILE_FLAG, Assets.TILE_HIDDEN)
+    return np.where(discovered_grid == 2, discovered, hidden)
+
+
+# The tile of every packed cell of a board, the tile of a cell depending only on its byte
+PACKED_TILES = tile_indices(*(np.asarray(F(np.arange(256, dtype=np.uint8))) for F in (MineField, NeighboursField, DiscoveredField))).astype(np.uint8)
+
+
+def blit_tiles(screen: pygame.Surface, tiles: np.ndarray, xs: np.ndarray, ys: np.ndarray, textures: Assets.Textures) -> None:
+    '''Renders tiles of the atlas with a single call to Surface.blits
+    
+    :param pygame.Surface screen: The screen to render the tiles on
+    :param np.ndarray tiles: The index of each tile
+    :param np.ndarray xs: The x-coordinate of each tile on the screen, in pixels
+    :param np.ndarray ys: The y-coordinate of each tile on the screen, in pixels
+    :param Assets.Textures textures: The textures to use
+    '''
+    atlas, areas = textures.atlas, textures.tiles
+    screen.blits((
+        (atlas, (x, y), areas[t])
+        for x, y, t in zip(xs.ravel().tolist(), ys.ravel().tolist(), tiles.ravel().tolist())
+    ), doreturn=False)
+
+
+def cell_positions(xs: np.ndarray, ys: np.ndarray, cell_size: int, offset: tuple[int, int] = (0, 0), stagger: bool = False) -> tuple[np.ndarray, np.ndarray]:
+    '''Returns the position of cells on the screen
+
+    :param np.ndarray xs: The x-coordinate of each cell
+    :param np.ndarray ys: The y-coordinate of each cell
+    :param int cell_size: The size of each cell
+    :param tuple[int, int] offset: The position of the camera, subtracted from the position of the cells (optional)
+    :param bool stagger: Whether the odd columns are drawn half a cell lower (optional)
+    :return tuple[np.ndarray, np.ndarray]: The x and y-coordinates of the top-left corner of each cell, in pixels
+    '''
+    px, py = xs * cell_size - offset[0], ys * cell_size - offset[1]
+    if stagger:
+        py = py + (xs & 1) * (cell_size // 2)
+    return px, py
+
+
+def render_tiles(screen: pygame.Surface, tiles: np.ndarray, cell_size: int, textures: Assets.Textures, offset: tuple[int, int] = (0, 0), stagger: bool = False) -> None:
+    '''Renders a grid of tiles, the first tile being at the top-left corner of the grid
+    
+    :param pygame.Surface screen: The screen to render the tiles on
+    :param np.ndarray tiles: The index of the tile of each cell
+    :param int cell_size: The size of each cell
+    :param Assets.Textures textures: The textures to use
+    :param tuple[int, int] offset: The position of the camera, subtracted from the position of the cells (optional)
+    :param bool stagger: Whether the odd columns of the grid are drawn half a cell lower (optional)
+    '''
+    xs, ys = np.indices(tiles.shape)
+    blit_tiles(screen, tiles, *cell_positions(xs, ys, cell_size, offset, stagger), textures)
+
+
+def render_cell(screen: pygame.Surface, grid: np.ndarray, neighbours_grid: np.ndarray, discovered_grid: np.ndarray, x: int, y: int, cell_size: int, textures: Assets.Textures, offset: tuple[int, int] = (0, 0), stagger: bool = False) -> pygame.Rect:
+    '''Renders a single cell on the screen
+    
+    :param pygame.Surface screen: The screen to render the cell on
+    :param np.ndarray grid: The grid to render
+    :param np.ndarray neighbours_grid: The grid of neighbouring mines
+    :param np.ndarray discovered_grid: The grid of rendered cells
+    :param int x: The x-coordinate of the cell
+    :param int y: The y-coordinate of the cell
+    :param int cell_size: The size of each cell
+    :param Assets.Textures textures: The textures to use
+    :param tuple[int, int] offset: The position of the camera, subtracted from the position of the cell (optional)
+    :param bool stagger: Whether the odd columns are drawn half a cell lower (optional)
+    :return pygame.Rect: The area of the screen that was drawn on
+    '''
+    position = (x*cell_size - offset[0], y*cell_size - offset[1] + (cell_size // 2 if stagger and x % 2 else 0))
+    cells = packed_cells(grid, neighbours_grid, discovered_grid)
+    tile = PACKED_TILES[cells[x, y]] if cells is not None else tile_indices(grid[x, y], neighbours_grid[x, y], discovered_grid[x, y])
+    return screen.blit(textures.atlas, position, textures.tiles[tile])
+
+
+def render_cells(screen: pygame.Surface, grid: np.ndarray, neighbours_grid: np.ndarray, discovered_grid: np.ndarray, cells: np.ndarray, cell_size: int, textures: Assets.Textures, offset: tuple[int, int] = (0, 0), stagger: bool = False) -> list[pygame.Rect]:
+    '''Renders the given cells on the screen
+    
+    :param pygame.Surface screen: The screen to render the cells on
+    :param np.ndarray grid: The grid to render
+    :param np.ndarray neighbours_grid: The grid of neighbouring mines
+    :param np.ndarray discovered_grid: The grid of rendered cells
+    :param np.ndarray cells: The coordinates of the cells to render, with shape (n, 2)
+    :param int cell_size: The size of each cell
+    :param Assets.Textures textures: The textures to use
+    :param tuple[int, int] offset: The position of the camera, subtracted from the position of the cells (optional)
+    :param bool stagger: Whether the odd columns are drawn half a cell lower (optional)
+    :return list[pygame.Rect]: The areas of the screen that were drawn on, to pass to pygame.display.update
+    '''
+    xs, ys, px, py = visible_positions(screen, cells, cell_size, offset, stagger)
+    packed = packed_cells(grid, neighbours_grid, discovered_grid)
+    if packed is not None: # Only the given cells of the board are decoded
+        tiles = PACKED_TILES[packed[xs, ys]]
+    else:
+        tiles = tile_indices(grid[xs, ys], neighbours_grid[xs, ys], discovered_grid[xs, ys])
+    blit_tiles(screen, tiles, px, py, textures)
+    screen_rect = screen.get_rect()
+    return [pygame.Rect(x, y, cell_size, cell_size).clip(screen_rect) for x, y in zip(px.tolist(), py.tolist())]
+
+
+def render_hidden(screen: pygame.Surface, cells: np.ndarray, cell_size: int, textures: Assets.Textures, offset: tuple[int, int] = (0, 0), stagger: bool = False) -> list[pygame.Rect]:
+    '''Renders cells as hidden whatever their state, for the cells that a cascade has not revealed yet
+
+    :param pygame.Surface screen: The screen to render the cells on
+    :param np.ndarray cells: The coordinates of the cells to render, with shape (n, 2)
+    :param int cell_size: The size of each cell
+    :param Assets.Textures textures: The textures to use
+    :param tuple[int, int] offset: The position of the camera, subtracted from the position of the cells (optional)
+    :param bool stagger: Whether the odd columns are drawn half a cell lower (optional)
+    :return list[pygame.Rect]: The areas of the screen that were drawn on, to pass to pygame.display.update
+    '''
+    _, _, px, py = visible_positions(screen, cells, cell_size, offset, stagger)
+    atlas, area = textures.atlas, textures.tiles[Assets.TILE_HIDDEN]
+    return screen.blits(((atlas, (x, y), area) for x, y in zip(px.tolist(), py.tolist())))
+
+
+def visible_positions(screen: pygame.Surface, cells: np.ndarray, cell_size: int, offset: tuple[int, int] = (0, 0), stagger: bool = False) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    '''Returns the cells that are at least partly on the screen, with their position on the screen
+
+    :param pygame.Surface screen: The screen
+    :param np.ndarray cells: The coordinates of the cells, with shape (n, 2)
+    :param int cell_size: The size of each cell
+    :param tuple[int, int] offset: The position of the camera, subtracted from the position of the cells (optional)
+    :param bool stagger: Whether the odd columns are drawn half a cell lower (optional)
+    :return tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: The x and y-coordinates of the visible cells, and
+        of their top-left corner on the screen in pixels
+    '''
+    xs, ys = cells[:, 0], cells[:, 1]
+    px, py = cell_positions(xs, ys, cell_size, offset, stagger)
+    width, height = screen.get_size()
+    visible = (px > -cell_size) & (px < width) & (py > -cell_size) & (py < height)
+    return xs[visible], ys[visible], px[visible], py[visible]
 
 
 def render_grid(screen: pygame.Surface, grid: np.ndarray, neighbours_grid: np.ndarray, discovered_grid: np.ndarray, cell_size: int, textures: Assets.Textures) -> None:
@@ -14,34 +203,119 @@ def render_grid(screen: pygame.Surface, grid: np.ndarray, neighbours_grid: np.nd
     :param int cell_size: The size of each cell
     :param Assets.Textures textures: The textures to use
     '''
-    for x in range(grid.shape[0]):
-        for y in range(grid.shape[1]):
-            
-            if discovered_grid[x, y] == 2: # If the cell has already been discovered
-                
-                screen.blit(
-                    textures.cell_background,
-                    (x*cell_size, y*cell_size)
-                )
+    render_tiles(screen, tile_indices(grid, neighbours_grid, discovered_grid), cell_size, textures)
+
+
+def lod_surface(tiles: np.ndarray, stagger: bool = False) -> pygame.Surface:
+    '''Maps tiles to a surface with one pixel per cell, through a palette so that a single byte is written per cell
+    On a staggered grid, each cell covers two pixels of its column, the odd columns starting one pixel lower
+
+    :param np.ndarray tiles: The index of the tile of each cell
+    :param bool stagger: Whether the odd columns are drawn half a cell lower (optional)
+    :return pygame.Surface: The 8-bit surface, using LOD_PALETTE
+    '''
+    tiles = np.asarray(tiles, dtype=np.uint8)
+    if stagger:
+        w, h = tiles.shape
+        pixels = np.full((w, 2*h + 1), LOD_BACKGROUND, dtype=np.uint8)
+        pixels[0::2, :2*h] = np.repeat(tiles[0::2], 2, axis=1)
+        pixels[1::2, 1:] = np.repeat(tiles[1::2], 2, axis=1)
+        tiles = pixels
+
+    surface = pygame.Surface(tiles.shape, depth=8)
+    surface.set_palette(LOD_PALETTE)
+    pygame.surfarray.blit_array(surface, tiles)
+    return surface
+
+
+def render_lod(screen: pygame.Surface, tiles: np.ndarray, cell_size: int, offset: tuple[int, int] = (0, 0), stagger: bool = False) -> None:
+    '''Renders a grid of tiles as plain colors, for the cells too small for their textures to be seen
+    The grid is written to a surface with one pixel per cell, which is scaled to the size of the cells
+
+    :param pygame.Surface screen: The screen to render the tiles on
+    :param np.ndarray tiles: The index of the tile of each cell
+    :param int cell_size: The size of each cell
+    :param tuple[int, int] offset: The position of the camera, subtracted from the position of the cells (optional)
+    :param bool stagger: Whether the odd columns of the grid are drawn half a cell lower (optional)
+    '''
+    w, h = tiles.shape
+    if w == 0 or h == 0:
+        return
+    size = (w * cell_size, h * cell_size + (cell_size // 2 if stagger else 0))
+    screen.blit(pygame.transform.scale(lod_surface(tiles, stagger), size), (-offset[0], -offset[1]))
+
+
+def sample_tiles(grid: np.ndarray, neighbours_grid: np.ndarray, discovered_grid: np.ndarray, size: int) -> np.ndarray:
+    '''Returns the tiles of a grid sampled at regular intervals, so that they fit in a square of a given size
+
+    :param np.ndarray grid: The grid, which may be a view of a board
+    :param np.ndarray neighbours_grid: The grid of neighbouring mines
+    :param np.ndarray discovered_grid: The grid of rendered cells
+    :param int size: The number of samples on the longest side
+    :return np.ndarray: The index of the tile of each sampled cell
+    '''
+    step = max(ceil(max(grid.shape) / size), 1)
+    cells = packed_cells(grid, neighbours_grid, discovered_grid)
+    if cells is not None:
+        return PACKED_TILES[cells[::step, ::step]]
+    return tile_indices(grid[::step, ::step], neighbours_grid[::step, ::step], discovered_grid[::step, ::step])
 
-                neighbours = neighbours_grid[x, y]
-                if neighbours > 0: # If the cell has neighbouring mines
-                    screen.blit(
-                        textures.__dict__[f'number_{neighbours_grid[x, y]}'],
-                        (x*cell_size, y*cell_size)
-                    )
 
-                if grid[x, y] == 1: # If the cell is a mine
-                    screen.blit(
-                        textures.mine,
-                        (x*cell_size, y*cell_size)
-                    )
+def render_minimap(screen: pygame.Surface, tiles: np.ndarray, view: tuple[float, float, float, float], size: int) -> pygame.Rect:
+    '''Displays an overview of the board in the bottom-right corner of the screen, with the outline of the view of the
+    camera
 
-            else: # If the cell has not been discovered
-                screen.blit(textures.hidden_cell_background, (x*cell_size, y*cell_size))
+    :param pygame.Surface screen: The screen to render the minimap on
+    :param np.ndarray tiles: The tiles of the whole board, as given by sample_tiles
+    :param tuple[float, float, float, float] view: The part of the board seen by the camera, as fractions of the size of
+        the board, using format (x, y, width, height)
+    :param int size: The size of the longest side of the minimap in pixels
+    :return pygame.Rect: The area of the screen that was drawn on
+    '''
+    w, h = tiles.shape
+    scale = size / max(w, h)
+    map_size = (max(round(w * scale), 1), max(round(h * scale), 1))
+    rect = pygame.Rect(0, 0, map_size[0] + 2*MINIMAP_BORDER, map_size[1] + 2*MINIMAP_BORDER)
+    rect.bottomright = (screen.get_width() - MINIMAP_MARGIN, screen.get_height() - MINIMAP_MARGIN)
 
-                if discovered_grid[x, y] == 1: # If the cell has been flagged
-                    screen.blit(textures.flag, (x*cell_size, y*cell_size))
+    screen.fill(BACKGROUND_COLOR, rect)
+    area = rect.inflate(-2*MINIMAP_BORDER, -2*MINIMAP_BORDER)
+    screen.blit(pygame.transform.scale(lod_surface(tiles), map_size), area)
+    outline = pygame.Rect(
+        area.x + round(view[0] * map_size[0]), area.y + round(view[1] * map_size[1]),
+        max(round(view[2] * map_size[0]), 1), max(round(view[3] * map_size[1]), 1),
+    ).clip(area)
+    pygame.draw.rect(screen, '#FFFFFF', outline, 1)
+    return rect.clip(screen.get_rect())
+
+
+def render_view(screen: pygame.Surface, grid: np.ndarray, neighbours_grid: np.ndarray, discovered_grid: np.ndarray, origin: tuple[int, int], camera: Camera, textures: Assets.Textures | None, exploded: tuple[int, int] | None = None) -> None:
+    '''Renders the cells seen by the camera, the cost of which does not depend on the size of the board
+    Below LOD_CELL_SIZE, the cells are drawn as plain colors and the textures are not used
+
+    :param pygame.Surface screen: The screen to render the cells on
+    :param np.ndarray grid: The grid of the visible cells
+    :param np.ndarray neighbours_grid: The grid of neighbouring mines of the visible cells
+    :param np.ndarray discovered_grid: The grid of rendered cells of the visible cells
+    :param tuple[int, int] origin: The coordinates on the board of the first cell of the grids
+    :param Camera camera: The camera
+    :param Assets.Textures textures: The textures to use, made for the cell size of the camera, None below LOD_CELL_SIZE
+    :param tuple[int, int] exploded: The coordinates on the board of the mine that ended the game (optional)
+        - on a staggered camera, the x-coordinate of the origin must be even, as given by Camera.visible_cells
+    '''
+    screen.fill(BACKGROUND_COLOR) # The board may not cover the screen
+    tiles = tile_indices(grid, neighbours_grid, discovered_grid)
+    if exploded is not None:
+        x, y = exploded[0] - origin[0], exploded[1] - origin[1]
+        if 0 <= x < tiles.shape[0] and 0 <= y < tiles.shape[1]:
+            tiles[x, y] = Assets.TILE_EXPLODED
+
+    cell_size = camera.cell_size
+    offset = (camera.x - origin[0] * cell_size, camera.y - origin[1] * cell_size)
+    if cell_size < LOD_CELL_SIZE:
+        render_lod(screen, tiles, cell_size, offset, camera.stagger)
+    else:
+        render_tiles(screen, tiles, cell_size, textures, offset, camera.stagger)
 
 
 
@@ -54,89 +328,374 @@ def render_entire_grid(screen: pygame.Surface, grid: np.ndarray, neighbours_grid
     :param int cell_size: The size of each cell
     :param Assets.Textures textures: The textures to use
     '''
-    for x in range(grid.shape[0]):
-        for y in range(grid.shape[1]):
-            
-            screen.blit(
-                textures.cell_background,
-                (x*cell_size, y*cell_size)
-            )
-
-            neighbours = neighbours_grid[x, y]
-            if neighbours > 0: # If the cell has neighbouring mines
-                screen.blit(
-                    textures.__dict__[f'number_{neighbours_grid[x, y]}'],
-                    (x*cell_size, y*cell_size)
-                )
-
-            if grid[x, y] == 1: # If the cell is a mine
-                screen.blit(
-                    textures.mine,
-                    (x*cell_size, y*cell_size)
-                )
-
-
-def render_end_text(screen: pygame.Surface, win: bool, font: pygame.font.Font) -> None:
-    '''Displays the end of the game message
+    discovered_grid = np.full(np.shape(grid), 2)
+    render_tiles(screen, tile_indices(grid, neighbours_grid, discovered_grid), cell_size, textures)
+
+
+hint_overlays = {} # The shades of the hints already composed, by cell size
+
+
+def create_hint_overlays(cell_size: int) -> list[pygame.Surface]:
+    '''Composes the translucent squares drawn over the hidden cells, one per level of probability
+
+    :param int cell_size: The size of each cell
+    :return list[pygame.Surface]: The squares, from the safe cells to the mines
+    '''
+    overlays = []
+    for level in range(HINT_LEVELS):
+        p = level / (HINT_LEVELS - 1)
+        overlay = pygame.Surface((cell_size, cell_size), pygame.SRCALPHA)
+        overlay.fill((round(255 * p), round(255 * (1 - p)), 0, HINT_ALPHA))
+        overlays.append(overlay)
+    return overlays
+
+
+def render_hints(screen: pygame.Surface, probabilities: np.ndarray, origin: tuple[int, int], camera: Camera) -> None:
+    '''Displays the probability of the hidden cells seen by the camera to contain a mine, as shades from green to red
+
+    :param pygame.Surface screen: The screen to render the hints on
+    :param np.ndarray probabilities: The probabilities of the visible cells, nan for the cells without a hint
+    :param tuple[int, int] origin: The coordinates on the board of the first cell of the probabilities
+    :param Camera camera: The camera
+    '''
+    cell_size = camera.cell_size
+    if cell_size not in hint_overlays:
+        hint_overlays[cell_size] = create_hint_overlays(cell_size)
+    overlays = hint_overlays[cell_size]
+
+    xs, ys = np.nonzero(~np.isnan(probabilities))
+    levels = np.rint(probabilities[xs, ys] * (HINT_LEVELS - 1)).astype(int)
+    px, py = cell_positions(xs + origin[0], ys + origin[1], cell_size, camera.offset, camera.stagger)
+    screen.blits((
+        (overlays[level], (x, y)) for x, y, level in zip(px.tolist(), py.tolist(), levels.tolist())
+    ), doreturn=False)
+
+
+end_overlays = {} # The end of the game messages already composed, by result and font
+
+
+def create_end_overlay(win: bool, font: pygame.font.Font) -> pygame.Surface:
+    '''Composes the end of the game message, with its background
     
     :param bool win: Whether the player won or lost
+    :param pygame.font.Font font: The font of the message
+    :return pygame.Surface: The message, only as large as its background
     '''
-    rect = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
     text = font.render(
         'You won!' if win else 'You lost!',
         1,
         '#00a000' if win else '#a00000',
     )
 
-    s_w, s_h = screen.get_size()
     t_w, t_h = text.get_size()
-    pygame.draw.rect(rect, '#ffffffa0', (
-        (s_w - t_w) // 2 - 10,
-        (s_h - t_h) // 2 - 10,
-        t_w + 20,
-        t_h + 20
-    ), border_radius=10)
-    screen.blit(rect, (0, 0))
-    screen.blit(text, (
-        (s_w - t_w) // 2,
-        (s_h - t_h) // 2
-    ))
+    overlay = pygame.Surface((t_w + 20, t_h + 20), pygame.SRCALPHA)
+    pygame.draw.rect(overlay, '#ffffffa0', overlay.get_rect(), border_radius=10)
+    overlay.blit(text, (10, 10))
+    return overlay
+
+
+def render_end_text(screen: pygame.Surface, win: bool, font: pygame.font.Font) -> pygame.Rect:
+    '''Displays the end of the game message, which is composed once per result and font
+    
+    :param bool win: Whether the player won or lost
+    :return pygame.Rect: The area of the screen that was drawn on
+    '''
+    key = (win, font)
+    if key not in end_overlays:
+        end_overlays[key] = create_end_overlay(win, font)
+    overlay = end_overlays[key]
+    return screen.blit(overlay, overlay.get_rect(center=screen.get_rect().center))
+
+
+def render_hud(screen: pygame.Surface, lines: list[str], font: pygame.font.Font, min_size: tuple[int, int] = (0, 0)) -> pygame.Rect:
+    '''Displays lines of text on an opaque panel in the top-left corner of the screen
+
+    :param list[str] lines: The lines of text
+    :param pygame.font.Font font: The font of the text
+    :param tuple[int, int] min_size: The smallest size of the panel, so that a shorter text covers the previous one
+    :return pygame.Rect: The area of the screen that was drawn on
+    '''
+    surfaces = [font.render(line, True, '#FFFFFF') for line in lines]
+    padding = font.get_linesize() // 4
+    width = max([s.get_width() for s in surfaces] + [0]) + 2 * padding
+    height = font.get_linesize() * len(surfaces) + 2 * padding
+    rect = pygame.Rect(0, 0, max(width, min_size[0]), max(height, min_size[1]))
+
+    screen.fill(BACKGROUND_COLOR, rect)
+    screen.blits([(s, (padding, padding + i * font.get_linesize())) for i, s in enumerate(surfaces)], doreturn=False)
+    return rect.clip(screen.get_rect())
+
+
+
+explosion_frames = {} # The frames of the explosions already drawn, by cell size
+
+
+def create_explosion_frames(cell_size: int) -> list[pygame.Surface]:
+    '''Draws the frames of an explosion, a blast growing and fading out over EXPLOSION_SIZE cells
+
+    :param int cell_size: The size of each cell
+    :return list[pygame.Surface]: The frames, the last one being fully transparent
+    '''
+    size = EXPLOSION_SIZE * cell_size
+    center = (size / 2, size / 2)
+    frames = []
+    for i in range(EXPLOSION_FRAMES):
+        p = (i + 1) / EXPLOSION_FRAMES
+        alpha = round(255 * (1 - p))
+        frame = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.circle(frame, (255, 120, 0, alpha), center, size / 2 * p ** .5)
+        pygame.draw.circle(frame, (255, 230, 120, alpha), center, size / 4 * p ** .5)
+        frames.append(frame)
+    return frames
+
+
+def get_explosion_frames(cell_size: int) -> list[pygame.Surface]:
+    '''Returns the frames of an explosion, which are drawn once per cell size'''
+    if cell_size not in explosion_frames:
+        explosion_frames[cell_size] = create_explosion_frames(cell_size)
+    return explosion_frames[cell_size]
 
 
 
 class Animation:
+    '''An effect lasting some time, advanced with the time passed since the previous frame
+    The animations are restarted with new parameters rather than created again, so that the scheduler can reuse them
+    '''
 
     def __init__(self, duration: float, delay: float = .0) -> None:
+        self.restart(duration, delay)
+
+    def restart(self, duration: float, delay: float = .0) -> None:
+        '''Starts the animation again
+
+        :param float duration: The duration of the animation, in seconds
+        :param float delay: The delay before the animation starts, in seconds
+        '''
         self.duration = duration
         self.t = -delay
 
     def is_done(self) -> bool:
         return self.t >= self.duration
-    
+
     def update(self, dt: float):
         raise NotImplementedError('The update method must be implemented in a subclass')
-    
+
 
 
 class ExplosionAnimation(Animation):
 
     def __init__(self, textures: list[pygame.Surface], position: tuple[int, int], duration: float, delay: float = .0) -> None:
         '''Initializes the explosion animation
-        
+
         :param list[pygame.Surface] textures: The textures of the animation
-        :param tuple[int, int] position: The position of the animation
+        :param tuple[int, int] position: The coordinates of the cell the explosion is centered on
         :param float duration: The duration of the animation
         :param float delay: The delay before the animation starts
         '''
-        super().__init__(duration, delay)
+        self.restart(textures, position, duration, delay)
+
+    def restart(self, textures: list[pygame.Surface], position: tuple[int, int], duration: float, delay: float = .0) -> None:
+        '''Starts the animation again, see __init__'''
+        super().restart(duration, delay)
         self.textures = textures
+        self.position = position
 
     def update(self, dt: float) -> tuple[pygame.Surface, tuple[int, int]]:
         '''Updates the animation
-        
+
         :param float dt: The time passed since the last frame
-        :return tuple[pygame.Surface, tuple[int, int]]: The texture to render and the position of its center
+        :return tuple[pygame.Surface, tuple[int, int]]: The texture to render and the coordinates of the cell it is
+            centered on
         '''
         self.t += dt
         i = int(self.t / self.duration * len(self.textures))
-        return self.textures[min(i, len(self.textures)-1)], (0, 0)
\ No newline at end of file
+        return self.textures[min(max(i, 0), len(self.textures)-1)], self.position
+
+
+
+class RevealAnimation(Animation):
+    '''Reveals the cells discovered by a move ring by ring, from the discovered cell outwards
+    The cells are sorted once by the time they are revealed, so that an update only slices the cells whose time has come
+    and a cascade of thousands of cells costs a few array operations per frame
+    '''
+
+    def __init__(self, cells: np.ndarray, origin: tuple[int, int], step: float = REVEAL_STEP, delay: float = .0) -> None:
+        '''Initializes the reveal animation
+
+        :param np.ndarray cells: The coordinates of the discovered cells, with shape (n, 2)
+        :param tuple[int, int] origin: The coordinates of the cell the cascade starts from
+        :param float step: The time between two rings of cells, shortened for the cascades that would last longer than
+            REVEAL_MAX_DURATION (optional)
+        :param float delay: The delay before the animation starts (optional)
+        '''
+        self.cell_buffer = np.empty((0, 2), dtype=np.int64)
+        self.time_buffer = np.empty(0)
+        self.restart(cells, origin, step, delay)
+
+    def restart(self, cells: np.ndarray, origin: tuple[int, int], step: float = REVEAL_STEP, delay: float = .0) -> None:
+        '''Starts the animation again with other cells, see __init__'''
+        n = len(cells)
+        if n > len(self.cell_buffer): # The buffers only grow, so that a reused animation rarely allocates them
+            size = max(n, 2 * len(self.cell_buffer))
+            self.cell_buffer = np.empty((size, 2), dtype=np.int64)
+            self.time_buffer = np.empty(size)
+
+        rings = np.subtract(cells, origin)
+        rings = np.abs(rings, out=rings).max(axis=1, initial=0) # The Chebyshev distance of each cell to the origin
+        order = np.argsort(rings, kind='stable')
+        self.cells = self.cell_buffer[:n]
+        self.times = self.time_buffer[:n]
+        np.take(cells, order, axis=0, out=self.cells)
+        np.multiply(rings[order], min(step, REVEAL_MAX_DURATION / max(int(rings.max(initial=0)), 1)), out=self.times)
+        self.cursor = 0 # The cells before the cursor are revealed
+        super().restart(float(self.times[-1]) if n else 0., delay)
+
+    @property
+    def pending(self) -> np.ndarray:
+        '''The coordinates of the cells that are not revealed yet'''
+        return self.cells[self.cursor:]
+
+    def is_done(self) -> bool:
+        return self.cursor == len(self.cells)
+
+    def update(self, dt: float) -> np.ndarray:
+        '''Updates the animation
+
+        :param float dt: The time passed since the last frame
+        :return np.ndarray: The coordinates of the cells revealed since the last update, a view that is valid until the
+            animation is restarted
+        '''
+        self.t += dt
+        end = int(np.searchsorted(self.times, self.t, side='right'))
+        revealed = self.cells[self.cursor:end]
+        self.cursor = end
+        return revealed
+
+
+
+class AnimationScheduler:
+    '''Runs the animations of the game, advanced by the game loop with the time passed since the previous frame
+    The animations that end are kept in a pool and restarted for the next effects, so that playing does not create new
+    ones. The scheduler reports the cells and the areas of the screen that the animations change, so that only those
+    are drawn again
+    '''
+    reveals: list[RevealAnimation]
+    explosions: list[ExplosionAnimation]
+
+    def __init__(self) -> None:
+        self.reveals = []
+        self.explosions = []
+        self.started = []       # The cascades not drawn yet, whose cells must be hidden again after being drawn
+        self.ended = []         # The explosions that ended, whose background must be drawn again
+        self.backgrounds = {}   # The screen under each explosion, as (surface, area), captured on full redraws
+        self.pool = {RevealAnimation: [], ExplosionAnimation: []}
+
+    @property
+    def active(self) -> bool:
+        '''Whether some animations still have to be drawn'''
+        return bool(self.reveals or self.explosions or self.ended)
+
+    def acquire(self, cls: type, *args) -> Animation:
+        '''Restarts an animation of the pool, or creates one if the pool is empty
+
+        :param type cls: The class of the animation
+        :param args: The parameters of the animation
+        :return Animation: The animation
+        '''
+        pool = self.pool[cls]
+        if not pool:
+            return cls(*args)
+        animation = pool.pop()
+        animation.restart(*args)
+        return animation
+
+    def reveal(self, cells: np.ndarray, origin: tuple[int, int]) -> None:
+        '''Starts a cascade revealing the cells discovered by a move, which must be drawn discovered in the same frame
+
+        :param np.ndarray cells: The coordinates of the discovered cells, with shape (n, 2)
+        :param tuple[int, int] origin: The coordinates of the discovered cell
+        '''
+        if len(cells):
+            animation = self.acquire(RevealAnimation, cells, origin)
+            self.reveals.append(animation)
+            self.started.append(animation)
+
+    def explode(self, x: int, y: int, cell_size: int) -> None:
+        '''Starts an explosion on a cell
+
+        :param int x: The x-coordinate of the cell
+        :param int y: The y-coordinate of the cell
+        :param int cell_size: The size of each cell
+        '''
+        self.explosions.append(self.acquire(ExplosionAnimation, get_explosion_frames(cell_size), (x, y), EXPLOSION_DURATION))
+
+    def update(self, dt: float) -> np.ndarray:
+        '''Advances the animations, the animations that end returning to the pool
+
+        :param float dt: The time passed since the last update, in seconds
+        :return np.ndarray: The coordinates of the cells revealed by the cascades, which must be drawn again
+        '''
+        revealed = [animation.update(dt) for animation in self.reveals]
+        for animation in [a for a in self.reveals if a.is_done()]:
+            self.reveals.remove(animation)
+            self.pool[RevealAnimation].append(animation)
+
+        for animation in self.explosions:
+            animation.update(dt)
+        self.ended += [a for a in self.explosions if a.is_done()]
+        self.explosions = [a for a in self.explosions if not a.is_done()]
+        return np.concatenate(revealed) if revealed else np.empty((0, 2), dtype=int)
+
+    def render(self, screen: pygame.Surface, camera: Camera, textures: Assets.Textures | None, full: bool = False) -> list[pygame.Rect]:
+        '''Draws the animations over the cells, which must have been drawn in the same frame
+        Nothing is drawn with plain colors, the view being drawn entirely on every change at that size
+
+        :param pygame.Surface screen: The screen to render the animations on
+        :param Camera camera: The camera
+        :param Assets.Textures textures: The textures to use, None below LOD_CELL_SIZE
+        :param bool full: Whether the whole view was drawn, in which case every animation is drawn entirely (optional)
+        :return list[pygame.Rect]: The areas of the screen that were drawn on, to pass to pygame.display.update
+        '''
+        rects = []
+        for animation in self.ended: # The explosions are erased by drawing the screen they covered again
+            background, area = self.backgrounds.pop(animation, (None, None))
+            if background is not None and not full:
+                rects.append(screen.blit(background, area))
+            self.pool[ExplosionAnimation].append(animation)
+        self.ended.clear()
+        if textures is None:
+            self.started.clear()
+            return rects
+
+        cell_size = camera.cell_size
+        for animation in self.reveals if full else self.started:
+            rects += render_hidden(screen, animation.pending, cell_size, textures, camera.offset, camera.stagger)
+        self.started.clear()
+
+        screen_rect = screen.get_rect()
+        for animation in self.explosions:
+            if full: # The camera may have zoomed since the explosion started
+                animation.textures = get_explosion_frames(cell_size)
+            texture, (x, y) = animation.update(0.)
+            px, py = cell_positions(np.array(x), np.array(y), cell_size, camera.offset, camera.stagger)
+            rect = texture.get_rect(center=(int(px) + cell_size // 2, int(py) + cell_size // 2))
+            area = rect.clip(screen_rect)
+            if not area.width or not area.height: # The explosion is outside of the screen
+                continue
+            if full or animation not in self.backgrounds:
+                self.backgrounds[animation] = (screen.subsurface(area).copy(), area)
+            else:
+                screen.blit(self.backgrounds[animation][0], area)
+            screen.blit(texture, rect)
+            rects.append(area)
+        return rects
+
+    def stop(self) -> None:
+        '''Ends every animation at once, after which the whole view must be drawn again'''
+        self.pool[RevealAnimation] += self.reveals
+        self.pool[ExplosionAnimation] += self.explosions + self.ended
+        self.reveals.clear()
+        self.explosions.clear()
+        self.started.clear()
+        self.ended.clear()
+        self.backgrounds.clear()
\ No newline at end of file
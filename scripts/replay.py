@@ -0,0 +1,352 @@
+import argparse
+import os
+import struct
+import sys
+import time
+from typing import BinaryIO, Iterator, NamedTuple
+
+import numpy as np
+
+import scripts.engine as Engine
+import scripts.game_logic as GameLogic
+from scripts.topology import KINDS, SQUARE, get_topology
+
+
+# Layout of a replay, all values being little-endian
+# - a header: the magic, the version, the flags, the topology, the size of the grid, the number of mines and the seed of
+#   the grid, the topology being the index of its kind in topology.KINDS
+# - the packed mask of the mines when the HAS_MINES flag is set, for the grids that cannot be generated from the seed
+# - fixed-width records of (tick, action, x, y), the tick being in milliseconds since the start of the game
+# - an END record, whose x-coordinate is the result of the game
+# A replay is delimited by its END record, so that archives are made by concatenating replays
+MAGIC = b'MSRP'
+VERSION = 1
+HEADER = struct.Struct('<4sBBBxIIIQ')
+HAS_MINES = 0x01
+RECORD = np.dtype([('tick', '<u4'), ('action', 'u1'), ('x', '<u2'), ('y', '<u2')])
+RECORD_STRUCT = struct.Struct('<IBHH') # The same layout as RECORD, to write records one by one
+
+# The actions of the records, DISCOVER and FLAG being those of the engine
+END = 0xFF
+
+# The results of the games
+RESULT_NONE = 0 # The game was abandoned
+RESULT_WON = 1
+RESULT_LOST = 2
+
+
+
+class Replay(NamedTuple):
+    '''A recorded game'''
+    grid_size: tuple[int, int]
+    mine_count: int
+    seed: int
+    mines: np.ndarray | None # The mask of the mines, None if the grid is generated from the seed
+    records: np.ndarray      # The records of the moves, using the RECORD dtype and without the END record
+    result: int
+    topology: str = SQUARE
+
+    def create_mines(self) -> np.ndarray:
+        '''Returns the mask of the mines, generating it from the seed and the first move like board.Board.from_coords
+
+        :return np.ndarray: The boolean mask of the cells containing a mine
+        '''
+        if self.mines is not None:
+            return self.mines
+        x, y = int(self.records['x'][0]), int(self.records['y'][0])
+        safe_cells = GameLogic.safe_zone(x, y, self.grid_size, self.mine_count, get_topology(self.topology, self.grid_size))
+        return GameLogic.create_mine_mask(self.grid_size, self.mine_count, safe_cells, np.random.default_rng(self.seed))
+
+
+
+class ReplayWriter:
+    '''Writes a game to a file as it is played, so that the moves are kept if the game is interrupted
+    The writer is created once the grid exists, the first record being the discovery of the first cell
+    '''
+
+    def __init__(self, file: BinaryIO, grid_size: tuple[int, int], mine_count: int, seed: int, mines: np.ndarray | None = None, owns_file: bool = False, topology: str = SQUARE) -> None:
+        '''Initializes the writer and writes the header
+
+        :param BinaryIO file: The file to write to, an archive of several replays being written by using one writer after the other
+        :param tuple[int, int] grid_size: The size of the grid, using format (width, height)
+        :param int mine_count: The number of mines in the grid
+        :param int seed: The seed the grid was generated from
+        :param np.ndarray mines: The mask of the mines, for the grids that were not generated from the seed (optional)
+        :param bool owns_file: Whether to close the file along with the writer
+        :param str topology: The kind of board, one of the kinds of scripts.topology (optional)
+        '''
+        self.file = file
+        self.owns_file = owns_file
+        file.write(HEADER.pack(MAGIC, VERSION, 0 if mines is None else HAS_MINES, KINDS.index(topology), *grid_size, mine_count, seed))
+        if mines is not None:
+            file.write(np.packbits(mines, axis=None).tobytes())
+
+    @classmethod
+    def create(cls, directory: str, grid_size: tuple[int, int], mine_count: int, seed: int, mines: np.ndarray | None = None, topology: str = SQUARE) -> 'ReplayWriter':
+        '''Creates a writer to a new file of a directory, named after the time and the seed
+
+        :param str directory: The directory of the replays
+        :param tuple[int, int] grid_size: The size of the grid, using format (width, height)
+        :param int mine_count: The number of mines in the grid
+        :param int seed: The seed the grid was generated from
+        :param np.ndarray mines: The mask of the mines, for the grids that were not generated from the seed (optional)
+        :param str topology: The kind of board, one of the kinds of scripts.topology (optional)
+        :return ReplayWriter: The writer
+        '''
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{time.strftime("%Y%m%d-%H%M%S")}-{seed:016x}.msr')
+        return cls(open(path, 'wb'), grid_size, mine_count, seed, mines, owns_file=True, topology=topology)
+
+    def record(self, tick: int, action: int, x: int, y: int) -> None:
+        '''Writes a move
+
+        :param int tick: The time of the move in milliseconds since the start of the game
+        :param int action: The action, one of engine.DISCOVER and engine.FLAG
+        :param int x: The x-coordinate of the cell
+        :param int y: The y-coordinate of the cell
+        '''
+        self.file.write(RECORD_STRUCT.pack(tick, action, x, y))
+
+    def close(self, tick: int, result: int) -> None:
+        '''Writes the END record, and closes the file if the writer owns it
+
+        :param int tick: The time of the end of the game in milliseconds since its start
+        :param int result: The result of the game, one of RESULT_NONE, RESULT_WON and RESULT_LOST
+        '''
+        self.file.write(RECORD_STRUCT.pack(tick, END, result, 0))
+        if self.owns_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+
+def parse_header(data: bytes) -> tuple[tuple[int, int], int, int, int, str]:
+    '''Parses the header of a replay
+
+    :param bytes data: The bytes of the header
+    :return tuple[tuple[int, int], int, int, int, str]: The size of the grid, the number of mines, the seed, the flags and
+        the topology
+    '''
+    magic, version, flags, topology, width, height, mine_count, seed = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ValueError('Not a replay file')
+    if version != VERSION:
+        raise ValueError(f'Unsupported replay version {version}')
+    if topology >= len(KINDS):
+        raise ValueError(f'Unsupported replay topology {topology}')
+    return (width, height), mine_count, seed, flags, KINDS[topology]
+
+
+def unpack_mines(data: bytes | np.ndarray, grid_size: tuple[int, int]) -> np.ndarray:
+    '''Unpacks the mask of the mines written after a header'''
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=grid_size[0] * grid_size[1]).reshape(grid_size).astype(bool)
+
+
+def read_replays(file: BinaryIO, chunk_size: int = 4096) -> Iterator[Replay]:
+    '''Reads the replays of a file one after the other, without loading the whole file
+
+    :param BinaryIO file: The file to read from
+    :param int chunk_size: The number of records read at once
+    :return Iterator[Replay]: The replays
+    '''
+    buffer, position = b'', 0 # The bytes read from the file, and the position of the first byte not parsed yet
+
+    def fill(size: int) -> bool:
+        '''Reads the file until size bytes are available after the position, returning False at the end of the file'''
+        nonlocal buffer, position
+        while len(buffer) - position < size:
+            data = file.read(max(size - len(buffer) + position, chunk_size * RECORD.itemsize))
+            if not data:
+                return False
+            buffer, position = buffer[position:] + data, 0
+        return True
+
+    while fill(1):
+        if not fill(HEADER.size):
+            raise ValueError('Truncated replay header')
+        grid_size, mine_count, seed, flags, topology = parse_header(buffer[position:position + HEADER.size])
+        position += HEADER.size
+
+        mines = None
+        if flags & HAS_MINES:
+            size = (grid_size[0] * grid_size[1] + 7) // 8
+            if not fill(size):
+                raise ValueError('Truncated replay mines')
+            mines = unpack_mines(buffer[position:position + size], grid_size)
+            position += size
+
+        searched = 0 # The number of records already searched for the END record
+        while True:
+            count = (len(buffer) - position) // RECORD.itemsize
+            records = np.frombuffer(buffer, dtype=RECORD, count=count, offset=position)
+            found = np.flatnonzero(records['action'][searched:] == END)
+            if len(found):
+                end = searched + int(found[0])
+                break
+            searched = count
+            if not fill((count + 1) * RECORD.itemsize):
+                raise ValueError('Replay without an END record')
+
+        position += (end + 1) * RECORD.itemsize
+        yield Replay(grid_size, mine_count, seed, mines, records[:end].copy(), int(records['x'][end]), topology)
+
+
+def map_replays(path: str, chunk_size: int = 4096) -> Iterator[Replay]:
+    '''Reads the replays of a file by mapping it in memory, the records of the replays being views of the mapping
+    The pages of the file are only read when they are accessed, which suits large archives
+
+    :param str path: The path of the file
+    :param int chunk_size: The number of records searched at once for the END record of a replay
+    :return Iterator[Replay]: The replays
+    :raises ValueError: If the file is not an archive of replays or is truncated, naming the file and the offset of the
+        replay, after the replays before it were returned
+    '''
+    if os.path.getsize(path) == 0:
+        return
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    offset = 0
+    while offset < len(data):
+        start = offset # The offset of the replay, to locate the errors
+        if len(data) - offset < HEADER.size:
+            raise ValueError(f'Truncated replay header in {path} at byte {start}')
+        try:
+            grid_size, mine_count, seed, flags, topology = parse_header(data[offset:offset + HEADER.size].tobytes())
+        except ValueError as error:
+            raise ValueError(f'{error} in {path} at byte {start}') from None
+        offset += HEADER.size
+
+        mines = None
+        if flags & HAS_MINES:
+            size = (grid_size[0] * grid_size[1] + 7) // 8
+            if len(data) - offset < size:
+                raise ValueError(f'Truncated replay mines in {path} at byte {start}')
+            mines = unpack_mines(data[offset:offset + size], grid_size)
+            offset += size
+
+        # The records are not aligned, so they are viewed through a structured array starting at the offset
+        count = (len(data) - offset) // RECORD.itemsize
+        records = np.ndarray((count,), dtype=RECORD, buffer=data, offset=offset)
+        end = None
+        for first in range(0, count, chunk_size):
+            found = np.flatnonzero(records['action'][first:first + chunk_size] == END)
+            if len(found):
+                end = first + int(found[0])
+                break
+        if end is None:
+            raise ValueError(f'Replay without an END record in {path} at byte {start}')
+
+        yield Replay(grid_size, mine_count, seed, mines, records[:end], int(records['x'][end]), topology)
+        offset += (end + 1) * RECORD.itemsize
+
+
+
+def simulate(replay: Replay) -> int:
+    '''Plays a replay again with game_logic
+
+    :param Replay replay: The replay
+    :return int: The result of the game, one of RESULT_NONE, RESULT_WON and RESULT_LOST
+    '''
+    if len(replay.records) == 0:
+        return RESULT_NONE
+    records = replay.records
+    topology = get_topology(replay.topology, replay.grid_size)
+    mines = replay.create_mines()
+    grid = mines.view(np.int8)
+    neighbours_grid = GameLogic.create_neighbours_grid(grid, topology=topology)
+    discovered_grid = GameLogic.create_discovered_grid(grid)
+    regions = GameLogic.Regions(neighbours_grid, topology)
+    state = GameLogic.GameState(grid, discovered_grid, replay.mine_count)
+
+    for action, x, y in zip(records['action'].tolist(), records['x'].tolist(), records['y'].tolist()):
+        if action == Engine.DISCOVER:
+            is_mine, _ = GameLogic.discover_cell(grid, neighbours_grid, discovered_grid, x, y, state, regions)
+            if is_mine:
+                return RESULT_LOST
+        elif action == Engine.FLAG:
+            GameLogic.flag_cell(discovered_grid, x, y, state)
+        if state.has_won():
+            return RESULT_WON
+    return RESULT_NONE
+
+
+def simulate_batch(replays: list[Replay]) -> np.ndarray:
+    '''Plays replays of the same grid size, mine count and topology again at once with the batch engine
+    The moves are applied in lockstep, the n-th move of every replay being applied by the n-th step
+
+    :param list[Replay] replays: The replays
+    :return np.ndarray: The result of each game
+    '''
+    grid_size, mine_count, topology = replays[0].grid_size, replays[0].mine_count, replays[0].topology
+    lengths = np.array([len(r.records) for r in replays])
+    played = [r for r in replays if len(r.records)]
+    results = np.full(len(replays), RESULT_NONE, dtype=np.uint8)
+    if not played:
+        return results
+
+    # The moves are padded with NO_ACTION, which is 0, into (moves, replays) arrays
+    moves = np.zeros((int(lengths.max()), len(played)), dtype=RECORD)
+    for i, r in enumerate(played):
+        moves[:len(r.records), i] = r.records
+
+    engine = Engine.BatchEngine(len(played), grid_size, mine_count, topology=topology)
+    xs, ys = moves['x'].astype(np.intp), moves['y'].astype(np.intp)
+    outcome = engine.load(np.stack([r.create_mines() for r in played]), xs[0], ys[0])
+    lost, won = outcome.hit_mine.copy(), outcome.won.copy()
+    for step in range(1, len(moves)):
+        outcome = engine.step(moves['action'][step], xs[step], ys[step])
+        lost |= outcome.hit_mine
+        won |= outcome.won
+
+    results[lengths > 0] = np.where(lost, RESULT_LOST, np.where(won, RESULT_WON, RESULT_NONE))
+    return results
+
+
+def verify(replays: Iterator[Replay], batch_size: int = 1024) -> tuple[int, list[int]]:
+    '''Checks that replays end with the result they recorded, grouping them in batches of the same grid size
+
+    :param Iterator[Replay] replays: The replays
+    :param int batch_size: The number of replays played at once
+    :return tuple[int, list[int]]: The number of replays, and the indices of the replays whose result differs
+    '''
+    batches = {} # The replays waiting to be played, with their indices, by grid size, mine count and topology
+    mismatches = []
+    count = 0
+
+    def flush(key: tuple) -> None:
+        indices, batch = zip(*batches.pop(key))
+        results = simulate_batch(list(batch))
+        mismatches.extend(i for i, r, result in zip(indices, batch, results.tolist()) if r.result != result)
+
+    for count, replay in enumerate(replays, 1):
+        key = (replay.grid_size, replay.mine_count, replay.topology)
+        batches.setdefault(key, []).append((count - 1, replay))
+        if len(batches[key]) == batch_size:
+            flush(key)
+    for key in list(batches):
+        flush(key)
+    return count, sorted(mismatches)
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Verifies that replays end with the result they recorded')
+    parser.add_argument('paths', nargs='+', help='the replay files or archives to verify')
+    parser.add_argument('--batch-size', type=int, default=1024, help='the number of replays played at once')
+    args = parser.parse_args()
+
+    failed = False
+    for path in args.paths:
+        start = time.perf_counter()
+        try:
+            count, mismatches = verify(map_replays(path), args.batch_size)
+        except ValueError as error: # The other files are still verified
+            print(error, file=sys.stderr)
+            failed = True
+            continue
+        duration = time.perf_counter() - start
+        print(f'{path}: {count} replay(s) in {duration:.2f}s ({count / max(duration, 1e-9):.0f}/s), {len(mismatches)} mismatch(es)')
+        for i in mismatches:
+            print(f'  replay {i} does not end with its recorded result')
+        failed |= bool(mismatches)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,293 @@
+import argparse
+import asyncio
+import struct
+
+import numpy as np
+
+import scripts.engine as Engine
+import scripts.game_logic as GameLogic
+from scripts.board import Board
+
+
+# Layout of the messages, all values being little-endian
+# A request is a fixed-width (type, action, game, x, y) tuple. To create a game, x and y are the width and the height of
+# the grid and game is the number of mines
+REQUEST = struct.Struct('<BBIHH')
+# A response is a (type, status, game, count) header followed by count cells, which are the cells that changed
+RESPONSE = struct.Struct('<BBII')
+CELL = np.dtype([('x', '<u2'), ('y', '<u2'), ('value', 'i1')])
+
+# The types of the messages
+NEW = 0     # Creates a game, the response giving its identifier
+ACTION = 1  # Applies an action to a game, one of engine.DISCOVER and engine.FLAG
+CLOSE = 2   # Deletes a game
+ERROR = 3   # The type of the responses to the requests that failed, whose status is the error
+
+# The statuses of the games
+PLAYING = 0
+WON = 1
+LOST = 2
+
+# The errors
+UNKNOWN_GAME = 1
+BAD_REQUEST = 2
+OUT_OF_BOUNDS = 3
+GAME_OVER = 4
+NOT_STARTED = 5 # A cell was flagged before the grid was generated by the first discovered cell
+TOO_MANY_GAMES = 6
+
+# The values of the cells sent to the clients, the discovered cells being sent with their number of neighbouring mines
+HIDDEN = -2
+FLAGGED = -3
+MINE = -1 # Only sent for the mine that ended the game
+
+
+
+class ServerError(Exception):
+    '''An error caused by a request, sent back to the client'''
+
+    def __init__(self, code: int) -> None:
+        super().__init__(code)
+        self.code = code
+
+
+
+class Game:
+    '''A game hosted by the server, whose grid is generated when its first cell is discovered'''
+    __slots__ = ('grid_size', 'mine_count', 'rng', 'board', 'state', 'status')
+
+    def __init__(self, grid_size: tuple[int, int], mine_count: int, rng: np.random.Generator) -> None:
+        self.grid_size = grid_size
+        self.mine_count = mine_count
+        self.rng = rng
+        self.board = None
+        self.state = None
+        self.status = PLAYING
+
+
+
+class GameServer:
+    '''Hosts many independent games, the server being the only one to know where the mines are
+    The clients only receive the cells changed by their actions, with the values they are allowed to see
+    '''
+    games: dict[int, Game]
+
+    def __init__(self, max_games: int = 100000, max_cells: int = 1 << 20, seed: int | None = None) -> None:
+        '''Initializes the server
+
+        :param int max_games: The number of games that can be hosted at once
+        :param int max_cells: The number of cells above which a grid is refused
+        :param int seed: The root seed of the games, each game getting an independent generator (optional)
+        '''
+        self.max_games = max_games
+        self.max_cells = max_cells
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.games = {}
+        self.next_id = 1
+        self.action_count = 0
+
+    def new_game(self, grid_size: tuple[int, int], mine_count: int) -> int:
+        '''Creates a game
+
+        :param tuple[int, int] grid_size: The size of the grid, using format (width, height)
+        :param int mine_count: The number of mines in the grid
+        :return int: The identifier of the game
+        '''
+        cells = grid_size[0] * grid_size[1]
+        if not 0 < cells <= self.max_cells or not 0 < mine_count < cells:
+            raise ServerError(BAD_REQUEST)
+        if len(self.games) >= self.max_games:
+            raise ServerError(TOO_MANY_GAMES)
+
+        game_id = self.next_id
+        self.next_id += 1
+        rng = np.random.default_rng(np.random.SeedSequence(self.seed_sequence.entropy, spawn_key=(game_id,)))
+        self.games[game_id] = Game(grid_size, mine_count, rng)
+        return game_id
+
+    def close_game(self, game_id: int) -> None:
+        '''Deletes a game'''
+        if self.games.pop(game_id, None) is None:
+            raise ServerError(UNKNOWN_GAME)
+
+    def apply(self, game_id: int, action: int, x: int, y: int) -> tuple[int, np.ndarray]:
+        '''Applies an action to a game
+
+        :param int game_id: The identifier of the game
+        :param int action: The action, one of engine.DISCOVER and engine.FLAG
+        :param int x: The x-coordinate of the cell
+        :param int y: The y-coordinate of the cell
+        :return tuple[int, np.ndarray]: The status of the game, and the changed cells using the CELL dtype
+        '''
+        game = self.games.get(game_id)
+        if game is None:
+            raise ServerError(UNKNOWN_GAME)
+        if action not in (Engine.DISCOVER, Engine.FLAG):
+            raise ServerError(BAD_REQUEST)
+        if not (0 <= x < game.grid_size[0] and 0 <= y < game.grid_size[1]):
+            raise ServerError(OUT_OF_BOUNDS)
+        if game.status != PLAYING:
+            raise ServerError(GAME_OVER)
+        self.action_count += 1
+
+        if action == Engine.DISCOVER:
+            if game.board is None:
+                game.board = Board.from_coords(x, y, game.grid_size, game.mine_count, game.rng)
+                game.state = GameLogic.GameState(game.board.grid, game.board.discovered_grid, game.mine_count)
+                changed = np.argwhere(game.board.discovered)
+            else:
+                is_mine, changed = game.board.discover(x, y, game.state)
+                if is_mine:
+                    game.status = LOST
+        else:
+            if game.board is None:
+                raise ServerError(NOT_STARTED)
+            changed = game.board.flag(x, y, game.state)
+
+        # Winning by flags needs exactly the mines to be flagged, otherwise flagging every cell would win the game and
+        # the status would tell whether a set of flagged cells contains all the mines
+        state = game.state
+        if game.status == PLAYING and state.has_won():
+            if state.discovered_cells == state.safe_cell_count or np.count_nonzero(game.board.flagged) == game.mine_count:
+                game.status = WON
+        return game.status, self.visible_cells(game.board, changed)
+
+    @staticmethod
+    def visible_cells(board: Board, cells: np.ndarray) -> np.ndarray:
+        '''Returns what a client can see of some cells: their neighbour counts if they are discovered, whether they are
+        flagged otherwise, so that the mines are never sent before they are discovered
+
+        :param Board board: The board
+        :param np.ndarray cells: The coordinates of the cells, with shape (n, 2)
+        :return np.ndarray: The cells, using the CELL dtype
+        '''
+        cells = np.asarray(cells).reshape(-1, 2)
+        xs, ys = cells[:, 0], cells[:, 1]
+        discovered = board.discovered_grid[xs, ys]
+        visible = np.empty(len(cells), dtype=CELL)
+        visible['x'], visible['y'] = xs, ys
+        visible['value'] = np.where(discovered == 2, board.neighbours_grid[xs, ys], np.where(discovered == 1, FLAGGED, HIDDEN))
+        return visible
+
+    def handle_request(self, data: bytes, owned: set[int]) -> bytes:
+        '''Applies a request and returns its response
+
+        :param bytes data: The request
+        :param set[int] owned: The games created by the connection, the only ones it can access
+        :return bytes: The response
+        '''
+        kind, action, game_id, x, y = REQUEST.unpack(data)
+        try:
+            if kind == NEW:
+                game_id = self.new_game((x, y), game_id)
+                owned.add(game_id)
+                return RESPONSE.pack(NEW, PLAYING, game_id, 0)
+
+            if game_id not in owned:
+                raise ServerError(UNKNOWN_GAME)
+            if kind == ACTION:
+                status, cells = self.apply(game_id, action, x, y)
+                return RESPONSE.pack(ACTION, status, game_id, len(cells)) + cells.tobytes()
+            if kind == CLOSE:
+                self.close_game(game_id)
+                owned.discard(game_id)
+                return RESPONSE.pack(CLOSE, PLAYING, game_id, 0)
+            raise ServerError(BAD_REQUEST)
+
+        except ServerError as e:
+            return RESPONSE.pack(ERROR, e.code, game_id, 0)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        '''Answers the requests of a client until it disconnects, then deletes its games
+        The requests are answered in order, so a client can send several requests without waiting for the responses
+        '''
+        owned = set()
+        try:
+            while True:
+                data = await reader.readexactly(REQUEST.size)
+                writer.write(self.handle_request(data, owned))
+                if writer.transport.get_write_buffer_size() > 1 << 16: # Waits for slow clients to read their responses
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for game_id in owned:
+                self.games.pop(game_id, None)
+            writer.close()
+
+    async def serve(self, host: str, port: int) -> asyncio.Server:
+        '''Starts listening for clients
+
+        :param str host: The address to listen on
+        :param int port: The port to listen on, 0 choosing a free port
+        :return asyncio.Server: The server, whose sockets give the port that was chosen
+        '''
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+
+class Client:
+    '''A connection to a game server, keeping what the client can see of its games'''
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host: str, port: int) -> 'Client':
+        '''Connects to a server'''
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def request(self, kind: int, action: int = 0, game_id: int = 0, x: int = 0, y: int = 0) -> tuple[int, int, int, np.ndarray]:
+        '''Sends a request and waits for its response
+
+        :return tuple[int, int, int, np.ndarray]: The type, the status and the game of the response, and its cells
+        '''
+        self.writer.write(REQUEST.pack(kind, action, game_id, x, y))
+        kind, status, game_id, count = RESPONSE.unpack(await self.reader.readexactly(RESPONSE.size))
+        cells = np.frombuffer(await self.reader.readexactly(count * CELL.itemsize), dtype=CELL) if count else np.empty(0, dtype=CELL)
+        if kind == ERROR:
+            raise ServerError(status)
+        return kind, status, game_id, cells
+
+    async def new_game(self, grid_size: tuple[int, int], mine_count: int) -> int:
+        '''Creates a game and returns its identifier'''
+        return (await self.request(NEW, 0, mine_count, *grid_size))[2]
+
+    async def act(self, game_id: int, action: int, x: int, y: int) -> tuple[int, np.ndarray]:
+        '''Applies an action to a game and returns its status and the changed cells'''
+        _, status, _, cells = await self.request(ACTION, action, game_id, x, y)
+        return status, cells
+
+    async def close_game(self, game_id: int) -> None:
+        '''Deletes a game'''
+        await self.request(CLOSE, 0, game_id)
+
+    async def close(self) -> None:
+        '''Disconnects from the server'''
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+
+async def run(host: str, port: int, max_games: int, seed: int | None) -> None:
+    '''Hosts games until the process is interrupted'''
+    server = GameServer(max_games, seed=seed)
+    listener = await server.serve(host, port)
+    print(f'Listening on {", ".join(str(s.getsockname()) for s in listener.sockets)}')
+    async with listener:
+        await listener.serve_forever()
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Hosts minesweeper games for clients connecting over TCP')
+    parser.add_argument('--host', default='127.0.0.1', help='the address to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='the port to listen on')
+    parser.add_argument('--max-games', type=int, default=100000, help='the number of games that can be hosted at once')
+    parser.add_argument('--seed', type=int, help='the root seed of the games')
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.host, args.port, args.max_games, args.seed))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,422 @@
+from collections import OrderedDict
+from math import lgamma
+from typing import NamedTuple
+
+import numpy as np
+
+from scripts.topology import Topology
+
+
+
+class SolverResult(NamedTuple):
+    '''What can be deduced from the visible state of a grid'''
+    safe: np.ndarray          # The boolean mask of the hidden cells that certainly do not contain a mine
+    mines: np.ndarray         # The boolean mask of the hidden cells that certainly contain a mine
+    probabilities: np.ndarray # The probability of each hidden cell to contain a mine, nan for the other cells
+
+
+class Component(NamedTuple):
+    '''The solutions of a group of constraints sharing cells, counted by number of mines'''
+    cells: tuple[int, ...]   # The flat indices of the cells
+    weights: np.ndarray      # The number of solutions with k mines, at index k
+    mine_counts: np.ndarray  # The number of solutions with k mines in which each cell is a mine, with shape (cells, k)
+    safe_counts: np.ndarray  # The number of solutions with k mines in which each cell is safe, with shape (cells, k)
+    exact: bool              # Whether the counts are exact, or an approximation of a component too large to count
+
+
+
+def extract_constraints(neighbours_grid: np.ndarray, discovered_grid: np.ndarray, topology: Topology | None = None) -> tuple[dict[frozenset[int], int], np.ndarray, np.ndarray]:
+    '''Extracts the constraints given by the discovered numbers on their hidden neighbours
+    Flagged cells are trusted to be mines, and only the discovered cells of the neighbours grid are read
+
+    :param np.ndarray neighbours_grid: The grid of neighbours
+    :param np.ndarray discovered_grid: The grid of discovered cells
+    :param Topology topology: The neighbours of the cells, a square board by default (optional)
+    :return tuple[dict[frozenset[int], int], np.ndarray, np.ndarray]: A tuple containing:
+        - the constraints, mapping a set of hidden cells (as flat indices) to the number of mines among them
+        - the boolean mask of the hidden cells that are not flagged
+        - the boolean mask of the flagged cells
+    '''
+    if topology is None:
+        topology = Topology(discovered_grid.shape)
+    hidden = discovered_grid == 0
+    flagged = discovered_grid == 1
+    numbers = np.where(discovered_grid == 2, neighbours_grid, 0)
+
+    hidden_counts = topology.count(hidden)
+    values = (numbers - topology.count(flagged)).ravel()
+    owners = np.flatnonzero((numbers > 0) & (hidden_counts > 0)) # Only the numbers on the frontier give a constraint
+
+    # Gathers the hidden neighbours of the numbers, the missing neighbours pointing to a cell past the end that is not hidden
+    rows = topology.neighbour_indices(owners)
+    masks = np.append(hidden.ravel(), False)[rows]
+
+    constraints = {}
+    for row, mask, value in zip(rows, masks, values[owners].tolist()):
+        constraints[frozenset(row[mask].tolist())] = value
+    return constraints, hidden, flagged
+
+
+def reduce_constraints(constraints: dict[frozenset[int], int]) -> tuple[dict[frozenset[int], int], set[int], set[int]]:
+    '''Applies the cheap rules to a set of constraints until none applies:
+    - a constraint with no mine left makes its cells safe, one with as many mines as cells makes them mines
+    - when the cells of a constraint are a subset of another's, the other is replaced by the difference
+
+    :param dict[frozenset[int], int] constraints: The constraints, mapping a set of cells to the number of mines among them
+    :return tuple[dict[frozenset[int], int], set[int], set[int]]: The remaining constraints, the safe cells and the mines
+    '''
+    safe, mines = set(), set()
+    constraints = dict(constraints)
+    changed = True
+    while changed:
+        changed = False
+
+        # Removes the known cells and applies the trivial rules
+        reduced = {}
+        for cells, value in constraints.items():
+            value -= len(cells & mines)
+            cells = cells - safe - mines
+            if not cells:
+                continue
+            if value == 0:
+                safe |= cells
+                changed = True
+            elif value == len(cells):
+                mines |= cells
+                changed = True
+            else:
+                reduced[cells] = value
+        constraints = reduced
+        if changed:
+            continue
+
+        # Applies the subset rule between constraints sharing a cell
+        by_cell = {}
+        for cells in constraints:
+            for cell in cells:
+                by_cell.setdefault(cell, []).append(cells)
+        for a in list(constraints):
+            if a not in constraints:
+                continue
+            for b in {b for cell in a for b in by_cell[cell]}:
+                if b in constraints and a < b:
+                    difference = b - a
+                    value = constraints.pop(b) - constraints[a]
+                    constraints[difference] = constraints.get(difference, value)
+                    changed = True
+    return constraints, safe, mines
+
+
+def split_components(constraints: dict[frozenset[int], int]) -> list[dict[frozenset[int], int]]:
+    '''Splits constraints in independent groups that do not share any cell
+
+    :param dict[frozenset[int], int] constraints: The constraints
+    :return list[dict[frozenset[int], int]]: The groups of constraints
+    '''
+    parent = {}
+
+    def find(cell: int) -> int:
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    for cells in constraints:
+        root = None
+        for cell in cells:
+            parent.setdefault(cell, cell)
+            r = find(cell)
+            if root is None:
+                root = r
+            elif r != root:
+                parent[r] = root
+
+    groups = {}
+    for cells, value in constraints.items():
+        groups.setdefault(find(next(iter(cells))), {})[cells] = value
+    return list(groups.values())
+
+
+def order_cells(constraints: dict[frozenset[int], int]) -> list[int]:
+    '''Orders the cells of a component so that few constraints are open at the same time
+    The cells are visited breadth first from a cell of the first constraint, which follows the frontier along its length
+
+    :param dict[frozenset[int], int] constraints: The constraints of the component
+    :return list[int]: The cells, in order
+    '''
+    by_cell = {}
+    for cells in constraints:
+        for cell in cells:
+            by_cell.setdefault(cell, []).append(cells)
+
+    start = min(by_cell)
+    order, seen, queue = [], {start}, [start]
+    while queue:
+        cell = queue.pop(0)
+        order.append(cell)
+        for cells in by_cell[cell]:
+            for other in sorted(cells - seen):
+                seen.add(other)
+                queue.append(other)
+    return order
+
+
+def sweep(order: list[int], constraints: list[tuple[frozenset[int], int]], max_states: int) -> list[tuple[list[int], dict, dict, dict]] | None:
+    '''Counts the assignments of the cells satisfying the constraints, one cell at a time
+    The state after each cell holds how many mines each open constraint already contains, so that assignments reaching
+    the same state are merged and only their number of mines is kept, as a polynomial
+
+    :param list[int] order: The cells, in the order to assign them
+    :param list[tuple[frozenset[int], int]] constraints: The constraints, as pairs of cells and number of mines
+    :param int max_states: The number of states above which the counting is abandoned
+    :return list[tuple[list[int], dict, dict, dict]]: For each cell, a tuple containing:
+        - the indices of the constraints left open after the cell
+        - the states reached with the cell safe, mapping the mines of the open constraints to the number of assignments
+          with k mines at index k
+        - the states reached with the cell being a mine
+        - all the states reached after the cell
+        or None if there were too many states
+    '''
+    position = {cell: p for p, cell in enumerate(order)}
+    last = [max(position[c] for c in cells) for cells, _ in constraints]
+    containing = [[] for _ in order]
+    for i, (cells, _) in enumerate(constraints):
+        for cell in cells:
+            containing[position[cell]].append(i)
+
+    m = len(order)
+    initial = np.zeros(m + 1)
+    initial[0] = 1
+    open_before, states, steps = [], {(): initial}, []
+    for p in range(m):
+        open_after = sorted(i for i in set(open_before) | set(containing[p]) if last[i] > p)
+        index = {i: k for k, i in enumerate(open_before)}
+        in_cell = set(containing[p])
+        # For each constraint, where its count is in the previous state (-1 if it opens here) and its number of mines
+        closing = [(index.get(i, -1), constraints[i][1]) for i in containing[p] if last[i] == p]
+        opened = [
+            (index.get(i, -1), i in in_cell, constraints[i][1], sum(1 for c in constraints[i][0] if position[c] > p))
+            for i in open_after
+        ]
+
+        choices = ({}, {})
+        for state, poly in states.items():
+            for v in (0, 1):
+                if any((state[k] if k >= 0 else 0) + v != value for k, value in closing):
+                    continue
+
+                new_state = []
+                for k, contains, value, remaining in opened:
+                    consumed = (state[k] if k >= 0 else 0) + (v if contains else 0)
+                    if consumed > value or value - consumed > remaining:
+                        break
+                    new_state.append(consumed)
+                else:
+                    new_state = tuple(new_state)
+                    choices[v][new_state] = choices[v][new_state] + poly if new_state in choices[v] else poly
+
+        # The mines are added once per state rather than once per assignment, the last term being still zero
+        choices = (choices[0], {state: np.concatenate(([0.], poly[:-1])) for state, poly in choices[1].items()})
+        states = merge_states(*choices)
+        if len(states) > max_states:
+            return None
+        steps.append((open_after, *choices, states))
+        open_before = open_after
+    return steps
+
+
+def merge_states(a: dict, b: dict) -> dict:
+    '''Merges two dicts of states by summing the polynomials of the states they share'''
+    merged = dict(a)
+    for state, poly in b.items():
+        merged[state] = merged[state] + poly if state in merged else poly
+    return merged
+
+
+def count_component(constraints: dict[frozenset[int], int], max_states: int) -> Component:
+    '''Counts the solutions of a component, and in how many of them each cell is a mine
+    The counts are exact, unless the component has too many states, in which case the probability of each cell is
+    approximated by the average density of its constraints
+
+    :param dict[frozenset[int], int] constraints: The constraints of the component
+    :param int max_states: The number of states above which the counting is abandoned
+    :return Component: The counts of the component
+    '''
+    order = order_cells(constraints)
+    items = list(constraints.items())
+    m = len(order)
+
+    forward = sweep(order, items, max_states)
+    backward = sweep(order[::-1], items, max_states) if forward is not None else None
+    if backward is None:
+        density = {}
+        for cells, value in items:
+            for cell in cells:
+                density.setdefault(cell, []).append(value / len(cells))
+        probabilities = np.array([np.mean(density[cell]) for cell in order])
+        k = min(int(round(probabilities.sum())), m)
+        weights = np.zeros(m + 1)
+        weights[k] = 1
+        mine_counts = np.zeros((m, m + 1))
+        mine_counts[:, k] = probabilities
+        return Component(tuple(order), weights, mine_counts, weights - mine_counts, False)
+
+    # Matches the assignments of the cells up to each cell with the assignments of the cells after it
+    values = [value for _, value in items]
+    counts = np.zeros((2, m, m + 1))
+    for p in range(m):
+        open_after = forward[p][0]
+        after = backward[m - p - 2][3] if p < m - 1 else {(): np.eye(1, m + 1)[0]}
+        for v in (0, 1):
+            for state, poly in forward[p][1 + v].items():
+                complement = tuple(values[i] - s for i, s in zip(open_after, state))
+                if complement in after:
+                    counts[v, p] += np.convolve(poly[:p + 2], after[complement][:m - p])
+
+    weights = counts[0, 0] + counts[1, 0]
+    return Component(tuple(order), weights, counts[1], counts[0], True)
+
+
+
+def log_binomial(n: int, k: np.ndarray) -> np.ndarray:
+    '''Computes the logarithm of the binomial coefficients C(n, k), -inf where k is out of range'''
+    result = np.full(len(k), -np.inf)
+    valid = (k >= 0) & (k <= n)
+    result[valid] = [lgamma(n + 1) - lgamma(i + 1) - lgamma(n - i + 1) for i in k[valid].tolist()]
+    return result
+
+
+
+class Solver:
+    '''Deduces the safe cells, the mines and the probability of each hidden cell from the visible state of a grid
+    The frontier is split in independent components whose counts are cached, so that only the components changed by a
+    move are counted again
+    '''
+    cache: OrderedDict
+
+    def __init__(self, cache_size: int = 4096, max_states: int = 20000) -> None:
+        '''Initializes the solver
+
+        :param int cache_size: The number of components to keep in the cache
+        :param int max_states: The number of states of a component above which its probabilities are approximated
+        '''
+        self.cache_size = cache_size
+        self.max_states = max_states
+        self.cache = OrderedDict()
+
+    def count(self, constraints: dict[frozenset[int], int]) -> Component:
+        '''Counts the solutions of a component, using the cache when it has not changed
+
+        :param dict[frozenset[int], int] constraints: The constraints of the component
+        :return Component: The counts of the component
+        '''
+        key = frozenset(constraints.items())
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        component = count_component(constraints, self.max_states)
+        self.cache[key] = component
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return component
+
+    def solve(self, neighbours_grid: np.ndarray, discovered_grid: np.ndarray, mine_count: int | None = None, topology: Topology | None = None) -> SolverResult:
+        '''Solves the visible state of a grid
+        Without the mine count, the components are solved independently and the cells away from the frontier get no probability
+
+        :param np.ndarray neighbours_grid: The grid of neighbours, of which only the discovered cells are read
+        :param np.ndarray discovered_grid: The grid of discovered cells
+        :param int mine_count: The number of mines in the grid (optional)
+        :param Topology topology: The neighbours of the cells, a square board by default (optional)
+        :return SolverResult: The safe cells, the mines and the probabilities
+        '''
+        constraints, hidden, flagged = extract_constraints(neighbours_grid, discovered_grid, topology)
+        constraints, safe_cells, mine_cells = reduce_constraints(constraints)
+        components = [self.count(group) for group in split_components(constraints)]
+        components = [c for c in components if c.weights.max() > 0] # Wrong flags can leave a component without solution
+
+        h = discovered_grid.shape[1]
+        safe = np.zeros(discovered_grid.shape, dtype=bool)
+        mines = np.zeros(discovered_grid.shape, dtype=bool)
+        probabilities = np.full(discovered_grid.shape, np.nan)
+        for cells, value in ((safe_cells, 0.), (mine_cells, 1.)):
+            xs, ys = np.divmod(np.fromiter(cells, dtype=np.intp, count=len(cells)), h)
+            probabilities[xs, ys] = value
+        safe.flat[list(safe_cells)] = True
+        mines.flat[list(mine_cells)] = True
+
+        outside = hidden & np.isnan(probabilities)
+        for component in components:
+            outside.flat[list(component.cells)] = False
+        outside_count = int(np.count_nonzero(outside))
+
+        if mine_count is None:
+            weights = [np.ones_like(c.weights) for c in components]
+            feasible = [np.ones(len(c.weights), dtype=bool) for c in components]
+        else:
+            remaining = mine_count - int(np.count_nonzero(flagged)) - len(mine_cells)
+            weights, feasible, outside_probability, outside_feasible = combine(components, remaining, outside_count)
+            probabilities[outside] = outside_probability
+            if outside_feasible == 0:
+                safe |= outside
+            elif outside_feasible == outside_count:
+                mines |= outside
+
+        for component, weight, possible in zip(components, weights, feasible):
+            xs, ys = np.divmod(np.array(component.cells), h)
+            total = (component.weights * weight).sum()
+            probabilities[xs, ys] = (component.mine_counts * weight).sum(axis=1) / total if total > 0 else np.nan
+            if component.exact:
+                safe[xs, ys] |= ~(component.mine_counts[:, possible] > 0).any(axis=1)
+                mines[xs, ys] |= ~(component.safe_counts[:, possible] > 0).any(axis=1)
+
+        return SolverResult(safe, mines, probabilities)
+
+
+
+def combine(components: list[Component], remaining: int, outside_count: int) -> tuple[list[np.ndarray], list[np.ndarray], float, int | None]:
+    '''Weights the solutions of each component by the number of ways to place the other mines in the rest of the grid
+
+    :param list[Component] components: The components of the frontier
+    :param int remaining: The number of mines that are neither flagged nor deduced
+    :param int outside_count: The number of hidden cells away from the frontier
+    :return tuple[list[np.ndarray], list[np.ndarray], float, int | None]: A tuple containing:
+        - the weight of each number of mines, for each component
+        - whether each number of mines is possible, for each component
+        - the probability of a cell away from the frontier to contain a mine
+        - the number of mines away from the frontier if it is certain, None otherwise
+    '''
+    normalized = [c.weights / c.weights.max() for c in components]
+    possible = [(c.weights > 0).astype(float) for c in components]
+
+    def convolve_excluding(polys: list[np.ndarray]) -> tuple[np.ndarray, list[np.ndarray]]:
+        '''Returns the product of all the polynomials, and the products of all but one, from prefix and suffix products'''
+        prefixes, suffixes = [np.ones(1)], [np.ones(1)]
+        for poly in polys:
+            prefixes.append(np.convolve(prefixes[-1], poly))
+        for poly in polys[::-1]:
+            suffixes.append(np.convolve(suffixes[-1], poly))
+        return prefixes[-1], [np.convolve(prefixes[i], suffixes[len(polys) - 1 - i]) for i in range(len(polys))]
+
+    total, others = convolve_excluding(normalized)
+    total_possible, others_possible = convolve_excluding(possible)
+    total_possible = total_possible > 0
+    ks = np.arange(len(total))
+    log_outside = log_binomial(outside_count, remaining - ks)
+    valid = np.isfinite(log_outside)
+    outside_weight = np.exp(log_outside - log_outside[valid].max()) if valid.any() else np.zeros(len(ks))
+
+    z = (total * outside_weight).sum()
+    outside_mines = remaining - ks[valid & total_possible]
+    outside_probability = float((total * outside_weight * (remaining - ks)).sum() / z / outside_count) if outside_count and z > 0 else np.nan
+    outside_feasible = int(outside_mines[0]) if len(outside_mines) and (outside_mines == outside_mines[0]).all() else None
+
+    weights, feasible = [], []
+    for i, component in enumerate(components):
+        length = len(component.weights)
+        window = np.lib.stride_tricks.sliding_window_view(outside_weight, len(others[i]))[:length]
+        valid_window = np.lib.stride_tricks.sliding_window_view(valid, len(others[i]))[:length]
+        weights.append(window @ others[i])
+        feasible.append((valid_window & (others_possible[i] > 0)).any(axis=1) & (component.weights > 0))
+    return weights, feasible, outside_probability, outside_feasible
@@ -0,0 +1,390 @@
+from functools import lru_cache
+from typing import Iterator
+
+import numpy as np
+
+
+# The kinds of boards, by the value stored in the replays
+SQUARE = 'square'   # Each cell touches the 8 cells around it, the cells on the border having fewer neighbours
+TORUS = 'torus'     # Like the square board, the opposite borders being joined
+HEX = 'hex'         # The odd columns are shifted down by half a cell, so that each cell touches 6 cells
+KINDS = (SQUARE, TORUS, HEX)
+
+SQUARE_OFFSETS = [(i, j) for i in range(-1, 2) for j in range(-1, 2) if not (i == 0 and j == 0)]
+# The offsets of the neighbours on a hexagonal board, for the cells of the even and of the odd columns
+HEX_OFFSETS = (
+    [(0, -1), (0, 1), (-1, -1), (-1, 0), (1, -1), (1, 0)],
+    [(0, -1), (0, 1), (-1, 0), (-1, 1), (1, 0), (1, 1)],
+)
+
+
+
+def hook(parent: np.ndarray, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    '''Merges the trees of a union-find forest along edges, with vectorized hooking and pointer jumping
+
+    :param np.ndarray parent: The parent of each node, each node being its own parent at first
+    :param np.ndarray u: The first node of each edge
+    :param np.ndarray v: The second node of each edge
+    :return np.ndarray: The parents, in which every node points to the root of its tree, the smallest node of the tree
+    '''
+    while u.size:
+        pu, pv = parent[u], parent[v]
+        active = pu != pv
+        if not active.any():
+            break
+        u, v, pu, pv = u[active], v[active], pu[active], pv[active]
+        parent[np.maximum(pu, pv)] = np.minimum(pu, pv) # Hooks the larger root onto the smaller one
+        while True: # Flattens the trees so that every node points to its root
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+    return parent
+
+
+def pad_grid(grid: np.ndarray) -> np.ndarray:
+    '''Pads the last two axes of a grid, or of a stack of grids, with a border of zeros
+    
+    :param np.ndarray grid: The grid to pad
+    :return np.ndarray: The padded grid
+    '''
+    return np.pad(grid, [(0, 0)] * (grid.ndim - 2) + [(1, 1), (1, 1)])
+
+
+def find_runs(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''Groups the cells of a mask on a square board in runs along the y axis, and labels the connected groups of runs
+    The runs touching each other are merged with vectorized hooking and pointer jumping, so that there is no per-cell
+    Python loop, and the memory used besides a padded copy of the mask grows with the number of runs
+    A stack of masks can be passed, in which case the labels are unique across the whole stack
+    
+    :param np.ndarray mask: The boolean mask of the cells to group
+    :return tuple[np.ndarray, np.ndarray, np.ndarray]: A tuple containing:
+        - the flat index of the first cell of each run, in increasing order
+        - the flat index after the last cell of each run
+        - the label of the group of each run, starting from 1
+    '''
+    w, h = mask.shape[-2:]
+    zero = pad_grid(np.asarray(mask, dtype=bool)).ravel() # The padding keeps the runs in their row
+    start_cells = np.flatnonzero(zero[1:] > zero[:-1]) + 1
+    end_cells = np.flatnonzero(zero[:-1] > zero[1:]) + 1
+    del zero
+    if not len(start_cells):
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+
+    # The runs of the next row touching a run are the ones ending after the cell diagonal to its first cell and
+    # starting before the cell diagonal to its last cell, which are consecutive since the runs are sorted
+    first = np.searchsorted(end_cells, start_cells + h+1, side='right')
+    last = np.searchsorted(start_cells, end_cells + h+2, side='right')
+    counts = np.maximum(last - first, 0)
+    u = np.repeat(np.arange(len(start_cells), dtype=np.int32), counts)
+    v = np.arange(len(u), dtype=np.int32) + np.repeat((first - np.cumsum(counts) + counts).astype(np.int32), counts)
+    del first, last, counts
+    parent = hook(np.arange(len(start_cells), dtype=np.int32), u, v)
+    run_labels = np.cumsum(parent == np.arange(len(parent)), dtype=np.int32)[parent]
+
+    # Converts the indices of the padded cells to the indices of the cells, stored in 32 bits when they fit
+    dtype = np.int32 if np.size(mask) < 1 << 31 else np.int64
+    lengths = (end_cells - start_cells).astype(dtype)
+    del end_cells
+    rows, ys = np.divmod(start_cells, h+2) # The padded row of a run is its row plus 1 and 2 per grid before it
+    del start_cells
+    rows -= 2 * (rows // (w+2)) + 1
+    starts = (rows * h + ys - 1).astype(dtype)
+    return starts, starts + lengths, run_labels
+
+
+def label_runs(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    '''Labels the connected groups of cells of a mask on a square board, see find_runs
+    
+    :param np.ndarray mask: The boolean mask of the cells to group
+    :return tuple[np.ndarray, np.ndarray]: A tuple containing:
+        - an array in which each cell contains the label of its group, starting from 1, or 0 if the cell is outside of the mask
+        - an array of shape (k+1, 4) containing the bounds (x0, y0, x1, y1) of each of the k groups, the upper bounds being exclusive
+    '''
+    w, h = mask.shape[-2:]
+    starts, ends, run_labels = find_runs(mask)
+
+    # Each run adds its label at its first cell and removes it after its last cell, so that the cumulative sum paints
+    # the runs. The end of a run can be the start of the run of the next row, so the starts are written first
+    labels = np.zeros(np.size(mask) + 1, dtype=np.int32)
+    labels[starts] = run_labels
+    labels[ends] -= run_labels
+    np.cumsum(labels, out=labels)
+    labels = labels[:-1].reshape(np.shape(mask))
+
+    bounds = np.empty((int(run_labels.max(initial=0)) + 1, 4), dtype=np.intp)
+    bounds[:, :2] = max(w, h)
+    bounds[:, 2:] = 0
+    rows, y0s = np.divmod(starts, h)
+    xs = rows % w
+    np.minimum.at(bounds[:, 0], run_labels, xs)
+    np.minimum.at(bounds[:, 1], run_labels, y0s)
+    np.maximum.at(bounds[:, 2], run_labels, xs + 1)
+    np.maximum.at(bounds[:, 3], run_labels, y0s + (ends - starts))
+    if len(bounds) == 1:
+        bounds[0] = 0
+    return labels, bounds
+
+
+class Topology:
+    '''The neighbours of the cells of a square board, in which each cell touches the 8 cells around it
+    The neighbours are found with shifted slices of the grids, so that a square board needs no table, and the methods
+    taking grids also accept a stack of grids, the neighbours being taken along the last two axes. The other kinds of
+    boards are TableTopology. The cells are identified by their flat index x * height + y
+    '''
+    kind = SQUARE
+
+    def __init__(self, grid_size: tuple[int, int]) -> None:
+        '''Initializes the topology
+
+        :param tuple[int, int] grid_size: The size of the grid, using format (width, height)
+        '''
+        self.grid_size = tuple(grid_size)
+        self.cell_count = self.grid_size[0] * self.grid_size[1]
+
+    @property
+    def staggered(self) -> bool:
+        '''Whether the odd columns are drawn half a cell lower'''
+        return self.kind == HEX
+
+    def neighbour_indices(self, cells: np.ndarray) -> np.ndarray:
+        '''Returns the neighbours of some cells
+
+        :param np.ndarray cells: The flat indices of the cells
+        :return np.ndarray: The flat indices of the neighbours, with one row per cell, the missing neighbours of the cells
+            on the border being cell_count
+        '''
+        w, h = self.grid_size
+        xs, ys = np.divmod(np.asarray(cells), h)
+        offsets = np.array(SQUARE_OFFSETS)
+        nx, ny = xs[:, None] + offsets[:, 0], ys[:, None] + offsets[:, 1]
+        return np.where((nx >= 0) & (nx < w) & (ny >= 0) & (ny < h), nx * h + ny, self.cell_count)
+
+    def neighbours(self, x: int, y: int) -> np.ndarray:
+        '''Returns the neighbours of a cell
+
+        :param int x: The x-coordinate of the cell
+        :param int y: The y-coordinate of the cell
+        :return np.ndarray: The coordinates of the neighbours, with shape (n, 2)
+        '''
+        cells = self.neighbour_indices(np.array([x * self.grid_size[1] + y]))[0]
+        return np.stack(np.divmod(cells[cells < self.cell_count], self.grid_size[1]), axis=1)
+
+    def iter_neighbours(self, x: int, y: int) -> Iterator[tuple[int, int]]:
+        '''Yields the neighbours of a cell one at a time, for the loops visiting cells one by one without allocating
+        an array per cell
+
+        :param int x: The x-coordinate of the cell
+        :param int y: The y-coordinate of the cell
+        :return Iterator[tuple[int, int]]: The coordinates of the neighbours
+        '''
+        w, h = self.grid_size
+        for i, j in SQUARE_OFFSETS:
+            if 0 <= x+i < w and 0 <= y+j < h:
+                yield x+i, y+j
+
+    def count(self, grid: np.ndarray, dtype: type = int) -> np.ndarray:
+        '''Counts the neighbours of every cell that are in a grid
+
+        :param np.ndarray grid: The boolean mask of the cells to count, or a grid of zeros and ones
+        :param type dtype: The type of the counts (optional)
+        :return np.ndarray: The number of neighbours in the grid of each cell
+        '''
+        w, h = grid.shape[-2:]
+        padded = pad_grid(np.asarray(grid))
+        counts = np.zeros(grid.shape, dtype=dtype)
+        for i, j in SQUARE_OFFSETS:
+            counts += padded[..., 1+i:1+i+w, 1+j:1+j+h]
+        return counts
+
+    def dilate(self, mask: np.ndarray) -> np.ndarray:
+        '''Extends a mask to the neighbouring cells of its cells
+
+        :param np.ndarray mask: The boolean mask to extend
+        :return np.ndarray: The extended mask
+        '''
+        mask = np.asarray(mask, dtype=bool)
+        w, h = mask.shape[-2:]
+        padded = pad_grid(mask)
+        dilated = mask.copy()
+        for i, j in SQUARE_OFFSETS:
+            dilated |= padded[..., 1+i:1+i+w, 1+j:1+j+h]
+        return dilated
+
+    def label(self, mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        '''Labels the connected groups of cells of a mask, see label_runs
+
+        :param np.ndarray mask: The boolean mask of the cells to group
+        :return tuple[np.ndarray, np.ndarray]: The label of the group of each cell, starting from 1, or 0 for the cells
+            outside of the mask, and the bounds (x0, y0, x1, y1) of each group, the upper bounds being exclusive
+        '''
+        return label_runs(mask)
+
+    def runs(self, mask: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        '''Labels the connected groups of cells of a mask as runs of consecutive flat indices, see find_runs
+
+        :param np.ndarray mask: The boolean mask of the cells to group
+        :return tuple[np.ndarray, np.ndarray, np.ndarray]: The flat index of the first cell of each run, in increasing
+            order, the flat index after its last cell, and the label of its group
+        '''
+        return find_runs(mask)
+
+    def with_neighbours(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        '''Returns some cells along with their neighbours
+        Only the bounding box of the cells is dilated
+
+        :param np.ndarray xs: The x-coordinates of the cells
+        :param np.ndarray ys: The y-coordinates of the cells
+        :return np.ndarray: The coordinates of the cells and of their neighbours, each cell once, with shape (n, 2)
+        '''
+        if len(xs) == 0:
+            return np.empty((0, 2), dtype=int)
+        w, h = self.grid_size
+        x0, y0 = max(int(xs.min()) - 1, 0), max(int(ys.min()) - 1, 0)
+        x1, y1 = min(int(xs.max()) + 2, w), min(int(ys.max()) + 2, h)
+        mask = np.zeros((x1 - x0, y1 - y0), dtype=bool)
+        mask[xs - x0, ys - y0] = True
+        nx, ny = np.nonzero(self.dilate(mask))
+        return np.stack((nx + x0, ny + y0), axis=1)
+
+
+
+class TableTopology(Topology):
+    '''The neighbours of the cells of a torus or of a hexagonal board, computed once per kind and size of board
+    The neighbours are stored as a table with one row per cell, padded with the index of a sentinel cell placed after
+    the last cell, and in CSR form: the neighbours of the cell i are indices[indptr[i]:indptr[i+1]]
+    '''
+    table: np.ndarray
+    indptr: np.ndarray
+    indices: np.ndarray
+
+    def __init__(self, kind: str, grid_size: tuple[int, int]) -> None:
+        '''Computes the neighbours of the cells
+
+        :param str kind: The kind of board, TORUS or HEX
+        :param tuple[int, int] grid_size: The size of the grid, using format (width, height)
+        '''
+        if kind not in (TORUS, HEX):
+            raise ValueError(f'Unknown topology {kind}, expected one of {", ".join(KINDS)}')
+        if kind == TORUS and min(grid_size) < 3:
+            raise ValueError('A torus must be at least 3 cells wide and high, so that the neighbours of a cell are distinct')
+
+        super().__init__(grid_size)
+        self.kind = kind
+        w, h = self.grid_size
+        xs, ys = np.divmod(np.arange(self.cell_count), h)
+
+        if kind == HEX:
+            odd = (xs & 1).astype(bool)
+            dx = np.where(odd[:, None], np.array(HEX_OFFSETS[1])[:, 0], np.array(HEX_OFFSETS[0])[:, 0])
+            dy = np.where(odd[:, None], np.array(HEX_OFFSETS[1])[:, 1], np.array(HEX_OFFSETS[0])[:, 1])
+            nx, ny = xs[:, None] + dx, ys[:, None] + dy
+            valid = (nx >= 0) & (nx < w) & (ny >= 0) & (ny < h)
+        else:
+            nx = (xs[:, None] + np.array(SQUARE_OFFSETS)[:, 0]) % w
+            ny = (ys[:, None] + np.array(SQUARE_OFFSETS)[:, 1]) % h
+            valid = np.ones(nx.shape, dtype=bool)
+
+        # The indices fit in 32 bits for any board that fits in memory, which halves the size of the tables
+        dtype = np.int32 if self.cell_count < 1 << 31 else np.int64
+        self.table = np.where(valid, nx * h + ny, self.cell_count).astype(dtype)
+        self.indices = self.table[valid]
+        self.indptr = np.zeros(self.cell_count + 1, dtype=dtype)
+        np.cumsum(valid.sum(axis=1), out=self.indptr[1:])
+
+    def neighbour_indices(self, cells: np.ndarray) -> np.ndarray:
+        return self.table[cells]
+
+    def iter_neighbours(self, x: int, y: int) -> Iterator[tuple[int, int]]:
+        h = self.grid_size[1]
+        cell = x * h + y
+        for i in range(int(self.indptr[cell]), int(self.indptr[cell+1])):
+            yield divmod(int(self.indices[i]), h)
+
+    def gather(self, values: np.ndarray, fill=0) -> np.ndarray:
+        '''Returns the values of the neighbours of every cell
+
+        :param np.ndarray values: The value of each cell, as a grid or a stack of grids
+        :param fill: The value of the missing neighbours of the cells on the border
+        :return np.ndarray: The values, with shape (grids, cells, neighbours)
+        '''
+        values = np.asarray(values).reshape(-1, self.cell_count)
+        padded = np.concatenate((values, np.full((len(values), 1), fill, dtype=values.dtype)), axis=1)
+        return padded[:, self.table]
+
+    def count(self, grid: np.ndarray, dtype: type = int) -> np.ndarray:
+        counts = np.count_nonzero(self.gather(np.asarray(grid, dtype=bool), False), axis=-1)
+        return counts.astype(dtype).reshape(np.shape(grid))
+
+    def dilate(self, mask: np.ndarray) -> np.ndarray:
+        mask = np.asarray(mask, dtype=bool)
+        return mask | self.gather(mask, False).any(axis=-1).reshape(mask.shape)
+
+    def label(self, mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        '''Labels the connected groups of cells of a mask, with a union-find over the edges of the table
+        The labels are unique across a stack of grids. A group of a torus can wrap around the borders, in which case its
+        bounds cover the board
+
+        :param np.ndarray mask: The boolean mask of the cells to group
+        :return tuple[np.ndarray, np.ndarray]: The label of the group of each cell, starting from 1, or 0 for the cells
+            outside of the mask, and the bounds (x0, y0, x1, y1) of each group, the upper bounds being exclusive
+        '''
+        mask = np.asarray(mask, dtype=bool)
+        flat = mask.reshape(-1, self.cell_count)
+        grids, local = np.nonzero(flat)
+        cells = grids * self.cell_count + local
+        index = np.full(flat.size + 1, -1, dtype=np.intp) # The index of each cell of the mask among those cells
+        index[cells] = np.arange(len(cells))
+
+        table = self.table[local]
+        neighbours = index[np.where(table < self.cell_count, table + (grids * self.cell_count)[:, None], flat.size)]
+        u = np.repeat(np.arange(len(cells)), neighbours.shape[1])
+        v = neighbours.ravel()
+        connected = v > u # Each edge is kept once
+        parent = hook(np.arange(len(cells)), u[connected], v[connected])
+
+        cell_labels = np.cumsum(parent == np.arange(len(parent)), dtype=np.int32)[parent]
+        labels = np.zeros(flat.size, dtype=np.int32)
+        labels[cells] = cell_labels
+        group_count = int(cell_labels.max(initial=0))
+
+        bounds = np.empty((group_count + 1, 4), dtype=np.intp)
+        bounds[:, :2] = max(self.grid_size)
+        bounds[:, 2:] = 0
+        xs, ys = np.divmod(local, self.grid_size[1])
+        np.minimum.at(bounds[:, 0], cell_labels, xs)
+        np.minimum.at(bounds[:, 1], cell_labels, ys)
+        np.maximum.at(bounds[:, 2], cell_labels, xs + 1)
+        np.maximum.at(bounds[:, 3], cell_labels, ys + 1)
+        return labels.reshape(mask.shape), bounds
+
+    def runs(self, mask: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        flat, _ = self.label(mask)
+        flat = flat.ravel()
+        starts = np.flatnonzero(np.diff(flat, prepend=0, append=0)) # The cells whose label differs from the previous one
+        starts, ends = starts[:-1], starts[1:]
+        run_labels = flat[starts]
+        keep = run_labels > 0
+        return starts[keep], ends[keep], run_labels[keep]
+
+    def with_neighbours(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        h = self.grid_size[1]
+        cells = np.asarray(xs) * h + ys
+        cells = np.unique(np.concatenate((cells, self.table[cells].ravel())))
+        cells = cells[cells < self.cell_count] # Removes the sentinel of the missing neighbours
+        return np.stack(np.divmod(cells, h), axis=1)
+
+
+
+@lru_cache(maxsize=4) # The tables take about 70 bytes per cell, so only the boards being played are kept
+def get_topology(kind: str, grid_size: tuple[int, int]) -> Topology:
+    '''Returns the topology of a kind and size of board, which is computed on the first call
+    A square board has no table, its neighbours being found with shifted slices
+
+    :param str kind: The kind of board, one of SQUARE, TORUS and HEX
+    :param tuple[int, int] grid_size: The size of the grid, using format (width, height)
+    :return Topology: The topology
+    '''
+    if kind == SQUARE:
+        return Topology(grid_size)
+    return TableTopology(kind, tuple(grid_size))
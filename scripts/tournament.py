@@ -0,0 +1,179 @@
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from math import sqrt
+
+import numpy as np
+
+import scripts.game_logic as GameLogic
+from scripts.engine import DISCOVER, FLAG
+
+
+loaded_bots = {} # The bots already imported by the process, by specification
+
+
+
+def load_bot(spec: str):
+    '''Imports a bot from its specification
+
+    :param str spec: The specification of the bot, using format 'module:name', for example 'scripts.bots:SolverBot'
+    :return: The bot, either a function or a class to instantiate for each game
+    '''
+    if spec not in loaded_bots:
+        module, _, name = spec.partition(':')
+        if not name:
+            raise ValueError(f'The bot {spec!r} must be given using format module:name')
+        loaded_bots[spec] = getattr(importlib.import_module(module), name)
+    return loaded_bots[spec]
+
+
+def game_seeds(root_seed: int, game: int) -> tuple[np.random.SeedSequence, np.random.SeedSequence]:
+    '''Derives the seeds of a game from the root seed and the index of the game only, so that the results do not depend
+    on the number of workers, and every bot plays the same grids
+
+    :param int root_seed: The root seed of the tournament
+    :param int game: The index of the game
+    :return tuple[np.random.SeedSequence, np.random.SeedSequence]: The seed of the grid and the seed of the bot
+    '''
+    return (
+        np.random.SeedSequence(root_seed, spawn_key=(game, 0)),
+        np.random.SeedSequence(root_seed, spawn_key=(game, 1)),
+    )
+
+
+def play_game(spec: str, game: int, grid_size: tuple[int, int], mine_count: int, root_seed: int) -> dict:
+    '''Plays a game with a bot, the grid being generated from its first discovered cell
+
+    :param str spec: The specification of the bot
+    :param int game: The index of the game
+    :param tuple[int, int] grid_size: The size of the grid, using format (width, height)
+    :param int mine_count: The number of mines in the grid
+    :param int root_seed: The root seed of the tournament
+    :return dict: The result of the game
+    '''
+    bot = load_bot(spec)
+    if isinstance(bot, type):
+        bot = bot()
+    grid_seed, bot_seed = game_seeds(root_seed, game)
+    bot_rng = np.random.default_rng(bot_seed)
+
+    grid = neighbours_grid = regions = state = None
+    discovered_grid = np.zeros(grid_size, dtype=int)
+    moves, move_time = 0, 0.
+    won = lost = False
+    max_moves = 2 * grid_size[0] * grid_size[1] # Stops bots that keep toggling flags
+
+    while not (won or lost) and moves < max_moves:
+        visible = np.full(grid_size, -2) if grid is None else np.where(discovered_grid == 2, neighbours_grid, -2)
+        start = time.perf_counter()
+        action, x, y = bot(visible, discovered_grid.copy(), mine_count, bot_rng)
+        move_time += time.perf_counter() - start
+        moves += 1
+
+        if action == DISCOVER:
+            if grid is None:
+                grid, neighbours_grid, discovered_grid, regions = GameLogic.create_from_coords(x, y, grid_size, mine_count, np.random.default_rng(grid_seed))
+                state = GameLogic.GameState(grid, discovered_grid, mine_count)
+            elif discovered_grid[x, y] != 2:
+                lost, _ = GameLogic.discover_cell(grid, neighbours_grid, discovered_grid, x, y, state, regions)
+        elif action == FLAG:
+            GameLogic.flag_cell(discovered_grid, x, y, state)
+        won = state is not None and not lost and state.has_won()
+
+    return {
+        'bot': spec,
+        'game': game,
+        'won': bool(won),
+        'moves': moves,
+        'revealed': int(np.count_nonzero(discovered_grid == 2)),
+        'time_per_move': move_time / moves,
+    }
+
+
+def play_game_args(args: tuple) -> dict:
+    '''Unpacks the arguments of play_game, for Executor.map'''
+    return play_game(*args)
+
+
+def wilson_interval(wins: int, games: int, z: float = 1.96) -> tuple[float, float]:
+    '''Returns the Wilson score interval of a win rate
+
+    :param int wins: The number of games won
+    :param int games: The number of games played
+    :param float z: The quantile of the normal distribution, 1.96 for a 95% interval
+    :return tuple[float, float]: The bounds of the interval
+    '''
+    if games == 0:
+        return 0., 1.
+    p = wins / games
+    center = (p + z*z / (2*games)) / (1 + z*z / games)
+    margin = z * sqrt(p * (1-p) / games + z*z / (4*games*games)) / (1 + z*z / games)
+    return max(center - margin, 0.), min(center + margin, 1.)
+
+
+def run(specs: list[str], games: int, grid_size: tuple[int, int], mine_count: int, root_seed: int, workers: int, output) -> dict[str, dict]:
+    '''Plays the games of every bot across a pool of processes, writing each result as a line of JSON
+
+    :param list[str] specs: The specifications of the bots
+    :param int games: The number of games played by each bot
+    :param tuple[int, int] grid_size: The size of the grids, using format (width, height)
+    :param int mine_count: The number of mines in each grid
+    :param int root_seed: The root seed of the tournament
+    :param int workers: The number of processes, 0 to use all the cores
+    :param output: The file to write the results to
+    :return dict[str, dict]: The aggregated results of each bot
+    '''
+    for spec in specs: # Fails early on a wrong specification
+        load_bot(spec)
+
+    totals = {spec: {'games': 0, 'wins': 0, 'moves': 0, 'revealed': 0, 'time': 0.} for spec in specs}
+    tasks = [(spec, game, grid_size, mine_count, root_seed) for spec in specs for game in range(games)]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (workers * 16))
+
+    with ProcessPoolExecutor(workers) as executor:
+        for result in executor.map(play_game_args, tasks, chunksize=chunksize): # The results come in the order of the tasks
+            output.write(json.dumps(result) + '\n')
+            total = totals[result['bot']]
+            total['games'] += 1
+            total['wins'] += result['won']
+            total['moves'] += result['moves']
+            total['revealed'] += result['revealed']
+            total['time'] += result['time_per_move']
+    return totals
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Plays seeded games with several bots and compares their win rates')
+    parser.add_argument('bots', nargs='+', help='the bots, using format module:name, for example scripts.bots:SolverBot')
+    parser.add_argument('--games', type=int, default=100, help='the number of games played by each bot')
+    parser.add_argument('--width', type=int, default=30, help='the width of the grids')
+    parser.add_argument('--height', type=int, default=16, help='the height of the grids')
+    parser.add_argument('--mines', type=int, default=99, help='the number of mines in each grid')
+    parser.add_argument('--seed', type=int, default=0, help='the root seed of the tournament')
+    parser.add_argument('--workers', type=int, default=0, help='the number of processes, 0 to use all the cores')
+    parser.add_argument('--output', help='the JSONL file to write the result of each game to, - for the standard output')
+    args = parser.parse_args()
+
+    if args.output == '-': # The standard output is not closed, and the summary goes to stderr to keep the output JSONL
+        output, summary = nullcontext(sys.stdout), sys.stderr
+    else:
+        output, summary = open(args.output or os.devnull, 'w'), sys.stdout
+    start = time.perf_counter()
+    with output as file:
+        totals = run(args.bots, args.games, (args.width, args.height), args.mines, args.seed, args.workers, file)
+    duration = time.perf_counter() - start
+
+    print(f'{"bot":<30} {"games":>6} {"win rate":>9} {"95% interval":>16} {"moves":>7} {"revealed":>9} {"ms/move":>8}', file=summary)
+    for spec, total in totals.items():
+        n = total['games']
+        low, high = wilson_interval(total['wins'], n)
+        print(f'{spec:<30} {n:>6} {total["wins"] / n:>9.3f} {f"[{low:.3f}, {high:.3f}]":>16} '
+              f'{total["moves"] / n:>7.1f} {total["revealed"] / n:>9.1f} {total["time"] / n * 1000:>8.3f}', file=summary)
+    print(f'{sum(t["games"] for t in totals.values()) / duration:.1f} games/s', file=sys.stderr)
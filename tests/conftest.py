@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules are imported as scripts.<name>, like main.py does, so the tests run from the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,104 @@
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+import pygame
+import pytest
+
+import scripts.assets as Assets
+import scripts.renderer as Renderer
+from scripts.camera import Camera
+
+
+CELL_SIZE = 16
+
+
+@pytest.fixture(scope='module')
+def textures() -> Assets.Textures:
+    pygame.font.init()
+    return Assets.Textures(CELL_SIZE, pygame.font.Font(None, CELL_SIZE))
+
+
+def square(radius: int, origin: tuple[int, int] = (10, 10)) -> np.ndarray:
+    xs, ys = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+    return np.stack([xs.ravel() + origin[0], ys.ravel() + origin[1]], axis=1)
+
+
+def test_reveal_rings() -> None:
+    cells = square(3)
+    animation = Renderer.RevealAnimation(cells, (10, 10), step=.1)
+    assert len(animation.pending) == len(cells)
+    assert animation.update(0.).tolist() == [[10, 10]]
+    assert len(animation.update(.1)) == 8
+    assert not animation.is_done()
+    revealed = animation.update(.2)
+    assert len(revealed) == 16 + 24 and animation.is_done()
+    assert np.abs(revealed - 10).max(axis=1).tolist() == [2] * 16 + [3] * 24
+
+
+def test_reveal_max_duration() -> None:
+    animation = Renderer.RevealAnimation(square(100), (10, 10))
+    assert animation.duration == pytest.approx(Renderer.REVEAL_MAX_DURATION)
+    animation.update(Renderer.REVEAL_MAX_DURATION)
+    assert animation.is_done()
+
+
+def test_reveal_buffers_are_reused() -> None:
+    animation = Renderer.RevealAnimation(square(5), (10, 10))
+    buffer = animation.cell_buffer
+    animation.restart(square(2, (3, 4)), (3, 4))
+    assert animation.cell_buffer is buffer and len(animation.pending) == 25
+    animation.restart(np.empty((0, 2), dtype=int), (0, 0))
+    assert animation.is_done()
+
+
+def test_scheduler_pools_animations() -> None:
+    scheduler = Renderer.AnimationScheduler()
+    scheduler.reveal(square(2), (10, 10))
+    scheduler.reveal(np.empty((0, 2), dtype=int), (0, 0)) # An empty cascade starts nothing
+    assert scheduler.active and len(scheduler.reveals) == 1
+    first = scheduler.reveals[0]
+
+    revealed = scheduler.update(1.)
+    assert len(revealed) == 25 and not scheduler.active
+    assert scheduler.pool[Renderer.RevealAnimation] == [first]
+
+    scheduler.reveal(square(1), (10, 10))
+    assert scheduler.reveals == [first] and not scheduler.pool[Renderer.RevealAnimation]
+
+
+def test_scheduler_explosions(textures: Assets.Textures) -> None:
+    scheduler = Renderer.AnimationScheduler()
+    screen = pygame.Surface((20 * CELL_SIZE, 20 * CELL_SIZE))
+    screen.fill('#123456')
+    before = pygame.surfarray.array3d(screen)
+    camera = Camera(screen.get_size(), CELL_SIZE, (20, 20))
+
+    scheduler.explode(5, 5, CELL_SIZE)
+    rects = scheduler.render(screen, camera, textures, full=True)
+    assert len(rects) == 1 and rects[0].collidepoint(5 * CELL_SIZE + CELL_SIZE // 2, 5 * CELL_SIZE + CELL_SIZE // 2)
+    assert not np.array_equal(pygame.surfarray.array3d(screen), before)
+
+    scheduler.update(Renderer.EXPLOSION_DURATION)
+    assert scheduler.active and not scheduler.explosions
+    scheduler.render(screen, camera, textures)
+    np.testing.assert_array_equal(pygame.surfarray.array3d(screen), before) # The background is drawn back
+    assert not scheduler.active
+    assert len(scheduler.pool[Renderer.ExplosionAnimation]) == 1
+
+
+def test_scheduler_hides_pending_cells(textures: Assets.Textures) -> None:
+    scheduler = Renderer.AnimationScheduler()
+    screen = pygame.Surface((20 * CELL_SIZE, 20 * CELL_SIZE))
+    camera = Camera(screen.get_size(), CELL_SIZE, (20, 20))
+    scheduler.reveal(square(2), (10, 10))
+    scheduler.update(0.)
+    rects = scheduler.render(screen, camera, textures)
+    assert len(rects) == 24 # Every cell but the origin is drawn hidden
+    hidden = pygame.surfarray.array3d(textures.atlas.subsurface(textures.tiles[Assets.TILE_HIDDEN]))
+    np.testing.assert_array_equal(pygame.surfarray.array3d(screen.subsurface(rects[0])), hidden)
+    assert scheduler.render(screen, camera, textures) == [] # The started cascades are only hidden once
+
+    scheduler.stop()
+    assert not scheduler.active and len(scheduler.pool[Renderer.RevealAnimation]) == 1
@@ -0,0 +1,71 @@
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+import pygame
+import pytest
+
+import scripts.assets as Assets
+
+
+CELL_SIZE = 16
+
+
+@pytest.fixture(autouse=True)
+def fonts() -> None:
+    pygame.font.init()
+
+
+def atlas_array(textures: Assets.Textures) -> np.ndarray:
+    return pygame.surfarray.array3d(textures.atlas)
+
+
+def test_cache_miss_then_hit(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    drawn = Assets.Textures.load(CELL_SIZE, cache_directory=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 1
+
+    def no_font(*args, **kwargs):
+        raise AssertionError('A cache hit must not create a font')
+
+    monkeypatch.setattr(pygame.font, 'SysFont', no_font)
+    cached = Assets.Textures.load(CELL_SIZE, cache_directory=str(tmp_path))
+    np.testing.assert_array_equal(atlas_array(cached), atlas_array(drawn))
+    assert cached.numbers[0] is None and len(cached.numbers) == 9
+
+
+def test_cache_keys(tmp_path) -> None:
+    Assets.Textures.load(CELL_SIZE, cache_directory=str(tmp_path))
+    Assets.Textures.load(CELL_SIZE + 1, cache_directory=str(tmp_path))
+    Assets.Textures.load(CELL_SIZE, bold=False, cache_directory=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 3
+
+
+def test_unwritable_cache(tmp_path) -> None:
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    textures = Assets.Textures.load(CELL_SIZE, cache_directory=str(blocker / 'textures'))
+    assert textures.atlas.get_size() == (CELL_SIZE * Assets.TILE_COUNT, CELL_SIZE)
+
+
+def test_invalid_cache(tmp_path) -> None:
+    Assets.Textures.load(CELL_SIZE, cache_directory=str(tmp_path))
+    path = tmp_path / os.listdir(tmp_path)[0]
+    drawn = path.read_bytes()
+
+    # A strip of the wrong size is drawn again and replaced
+    pygame.image.save(pygame.Surface((CELL_SIZE, CELL_SIZE)), str(path))
+    textures = Assets.Textures.load(CELL_SIZE, cache_directory=str(tmp_path))
+    assert textures.atlas.get_size() == (CELL_SIZE * Assets.TILE_COUNT, CELL_SIZE)
+    assert pygame.image.load(str(path)).get_size() == (CELL_SIZE * Assets.STRIP_LENGTH, CELL_SIZE)
+
+    # A truncated file cannot be decoded, and is replaced too
+    path.write_bytes(drawn[:len(drawn) // 2])
+    Assets.Textures.load(CELL_SIZE, cache_directory=str(tmp_path))
+    assert pygame.image.load(str(path)).get_size() == (CELL_SIZE * Assets.STRIP_LENGTH, CELL_SIZE)
+
+
+def test_strip_round_trip() -> None:
+    textures = Assets.Textures(CELL_SIZE, pygame.font.Font(None, CELL_SIZE))
+    copy = Assets.Textures(CELL_SIZE, strip=textures.to_strip())
+    np.testing.assert_array_equal(atlas_array(copy), atlas_array(textures))
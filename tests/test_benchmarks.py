@@ -0,0 +1,28 @@
+import pygame
+
+import benchmarks.suite as Suite
+
+
+def test_every_operation() -> None:
+    pygame.font.init() # The rendering operations draw the numbers
+    results = Suite.run(list(Suite.OPERATIONS), [16, 64], [.1], 1, 0, 8, 32 * 32)
+    measured = {(r['operation'], r['size']) for r in results}
+    for name in Suite.OPERATIONS:
+        assert (name, 16) in measured
+        assert ((name, 64) in measured) == (name not in Suite.RENDER_OPERATIONS) # The large grids are not rendered
+    assert all(r['time'] >= 0 and r['peak_memory'] >= 0 for r in results)
+
+
+def test_compare() -> None:
+    baseline = [
+        {'operation': 'a', 'size': 8, 'density': .1, 'time': 1., 'peak_memory': 100},
+        {'operation': 'b', 'size': 8, 'density': .1, 'time': 1., 'peak_memory': 100},
+    ]
+    results = [
+        {'operation': 'a', 'size': 8, 'density': .1, 'time': 1.05, 'peak_memory': 100},
+        {'operation': 'b', 'size': 8, 'density': .1, 'time': 1., 'peak_memory': 150},
+        {'operation': 'c', 'size': 8, 'density': .1, 'time': 9., 'peak_memory': 900}, # Not in the baseline
+    ]
+    regressions = Suite.compare(results, baseline, .1)
+    assert [r['operation'] for r in regressions] == ['b']
+    assert regressions[0]['memory_ratio'] == 1.5
@@ -0,0 +1,76 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+import scripts.game_logic as GameLogic
+from scripts.board import Board
+
+
+def test_from_grids() -> None:
+    rng = np.random.default_rng(0)
+    grid, neighbours_grid, discovered_grid = GameLogic.create_from_coords(4, 4, (20, 11), 40, rng)[:3]
+    discovered_grid[np.nonzero(grid)[0][:5], np.nonzero(grid)[1][:5]] = 1
+    board = Board.from_grids(grid, neighbours_grid, discovered_grid)
+
+    assert board.shape == (20, 11) and board.mine_count == 40 and board.cells.dtype == np.uint8
+    np.testing.assert_array_equal(board.grid, grid)
+    np.testing.assert_array_equal(board.neighbours_grid, neighbours_grid)
+    np.testing.assert_array_equal(board.discovered_grid, discovered_grid)
+    np.testing.assert_array_equal(board.mines, grid == 1)
+    np.testing.assert_array_equal(board.flagged, discovered_grid == 1)
+    np.testing.assert_array_equal(board.discovered, discovered_grid == 2)
+
+
+def test_fields() -> None:
+    board = Board.empty((5, 4))
+    board.grid[1, 2] = 1
+    board.neighbours_grid[0, :] = 3
+    board.discovered_grid[2:4, 1] = 2
+    board.discovered_grid[4, 3] = 1
+
+    assert board.grid[1, 2] == 1 and board.neighbours_grid[1, 2] == -1 # A mine has a count of -1
+    np.testing.assert_array_equal(board.neighbours_grid[0], [3, 3, 3, 3])
+    assert (board.discovered_grid == 2).sum() == 2 and board.discovered_grid[4, 3] == 1
+    assert board.discovered_grid[1, 2] == 0 # Each field is written without changing the others
+    np.testing.assert_array_equal(board.discovered_grid + 1, np.asarray(board.discovered_grid) + 1) # NumPy operations decode the field
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_from_coords(seed: int) -> None:
+    grid_size, mine_count, (x, y) = (30, 16), 99, (10, 7)
+    board = Board.from_coords(x, y, grid_size, mine_count, np.random.default_rng(seed))
+    assert board.mine_count == np.count_nonzero(board.mines) == mine_count
+    np.testing.assert_array_equal(board.neighbours_grid, GameLogic.create_neighbours_grid(np.asarray(board.grid)))
+
+    # The first cell is discovered like game_logic does it on the same mines
+    grid = np.asarray(board.grid).astype(int)
+    discovered_grid = GameLogic.create_discovered_grid(grid)
+    GameLogic.discover_cell(grid, GameLogic.create_neighbours_grid(grid), discovered_grid, x, y)
+    np.testing.assert_array_equal(board.discovered_grid, discovered_grid)
+
+
+def test_play() -> None:
+    board = Board.from_coords(3, 3, (16, 16), 40, np.random.default_rng(1))
+    state = GameLogic.GameState(board.grid, board.discovered_grid, board.mine_count, debug=True)
+    for x, y in np.argwhere(~board.mines & ~board.discovered).tolist():
+        board.discover(x, y, state)
+    assert state.has_won()
+    mine = np.argwhere(board.mines)[0]
+    assert len(board.flag(*mine, state)) == 1 and board.flagged[tuple(mine)]
+    assert board.discover(*mine, state)[0]
+
+
+def test_memory() -> None:
+    # The board keeps its packed cells and the runs of its regions, without any temporary of more than a byte per cell
+    size = (1000, 1000)
+    mines = np.random.default_rng(3).random(size) < .15
+    mines[:3, :3] = False
+    tracemalloc.start()
+    try:
+        board = Board.from_mines(mines, 1, 1)
+        kept, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert board.discovered[1, 1]
+    assert kept < 3 * mines.size and peak < 10 * mines.size
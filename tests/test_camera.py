@@ -0,0 +1,30 @@
+import pytest
+
+from scripts.camera import Camera
+
+
+@pytest.mark.parametrize('cell_size', [1, 4, 32])
+def test_zoom_without_steps(cell_size: int) -> None:
+    camera = Camera((640, 480), cell_size, (500, 500), min_cell_size=1)
+    position = (camera.x, camera.y)
+    assert not camera.zoom(0, (320, 240))
+    assert camera.cell_size == cell_size
+    assert (camera.x, camera.y) == position
+
+
+def test_zoom_small_cells() -> None:
+    camera = Camera((640, 480), 2, (500, 500), min_cell_size=1)
+    assert camera.zoom(1, (0, 0))
+    assert camera.cell_size == 3
+    assert camera.zoom(-1, (0, 0))
+    assert camera.cell_size == 2
+
+
+def test_zoom_keeps_anchor() -> None:
+    camera = Camera((640, 480), 16, (500, 500))
+    camera.center_on(250, 250)
+    anchor = (200, 100)
+    cell = ((camera.x + anchor[0]) / camera.cell_size, (camera.y + anchor[1]) / camera.cell_size)
+    assert camera.zoom(2, anchor)
+    assert (camera.x + anchor[0]) / camera.cell_size == pytest.approx(cell[0], abs=1 / camera.cell_size)
+    assert (camera.y + anchor[1]) / camera.cell_size == pytest.approx(cell[1], abs=1 / camera.cell_size)
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+import scripts.game_logic as GameLogic
+from scripts.chunked_board import ChunkedBoard
+
+
+def brute_force_neighbours(board: ChunkedBoard, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+    size = board.chunk_size
+    cx0, cy0, cx1, cy1 = x0 // size - 1, y0 // size - 1, (x1 - 1) // size + 2, (y1 - 1) // size + 2
+    mines = np.block([[board.chunk_mines(cx, cy) for cy in range(cy0, cy1)] for cx in range(cx0, cx1)])
+    neighbours = GameLogic.create_neighbours_grid(mines, np.int8)
+    return neighbours[x0 - cx0 * size:x1 - cx0 * size, y0 - cy0 * size:y1 - cy0 * size]
+
+
+def test_chunks_from_seed() -> None:
+    a, b = ChunkedBoard(3, 0.2, chunk_size=8), ChunkedBoard(3, 0.2, chunk_size=8)
+    assert np.array_equal(a.chunk_mines(-2, 5), b.chunk_mines(-2, 5))
+    assert not np.array_equal(a.chunk_mines(1, 0), a.chunk_mines(0, 1))
+    assert not np.array_equal(a.chunk_mines(1, 0), ChunkedBoard(4, 0.2, chunk_size=8).chunk_mines(1, 0))
+
+
+def test_starting_cells_are_safe() -> None:
+    board = ChunkedBoard(0, 1.0, chunk_size=8)
+    for x in range(-1, 2):
+        for y in range(-1, 2):
+            assert board.neighbours_at(x, y) != -1
+    assert board.neighbours_at(2, 2) == -1
+
+
+@pytest.mark.parametrize('cache_size', [1, 256])
+def test_window_across_chunks(cache_size: int) -> None:
+    board = ChunkedBoard(1, 0.25, chunk_size=8, cache_size=cache_size)
+    x0, y0, x1, y1 = -13, -5, 19, 22
+    grid, neighbours_grid, discovered_grid = board.window(x0, y0, x1, y1)
+    expected = brute_force_neighbours(board, x0, y0, x1, y1)
+    assert np.array_equal(neighbours_grid, expected)
+    assert np.array_equal(grid, expected == -1)
+    assert not discovered_grid.any()
+    assert len(board.chunks) <= cache_size
+    assert board.neighbours_at(x0 + 3, y0 + 7) == expected[3, 7]
+
+
+def test_discover_matches_bounded_board() -> None:
+    board = ChunkedBoard(2, 0.15, chunk_size=8)
+    mine, changed = board.discover(0, 0)
+    assert not mine and len(changed) > 1
+
+    # The region fits in the window, so discovering the same cell of the bounded board gives the same cells
+    x0, y0 = changed.min(axis=0) - 1
+    x1, y1 = changed.max(axis=0) + 2
+    grid, neighbours_grid, discovered_grid = board.window(x0, y0, x1, y1)
+    expected = np.zeros_like(discovered_grid)
+    GameLogic.discover_cell(grid, neighbours_grid, expected, -x0, -y0)
+    assert np.array_equal(discovered_grid, expected)
+    assert sorted(map(tuple, changed)) == sorted(map(tuple, np.argwhere(expected == 2) + (x0, y0)))
+
+
+def test_discover_stops_at_max_reveal() -> None:
+    board = ChunkedBoard(0, 0.0, chunk_size=8, max_reveal=100)
+    _, changed = board.discover(0, 0)
+    assert len(changed) == 100
+    assert board.revealing()
+
+    # The rest of the region is discovered around the rectangle only, without discovering a cell twice
+    area = (-16, -16, 16, 16)
+    revealed = [changed]
+    while board.revealing(area):
+        revealed.append(board.reveal(area))
+        assert len(revealed[-1]) <= 100
+    revealed = np.concatenate(revealed)
+    assert len(revealed) == len(set(map(tuple, revealed)))
+    assert (board.window(*area)[2] == 2).all()
+    assert board.revealing() and board.discovered_at(100, 0) == 0
+
+
+def test_packed_chunks() -> None:
+    board = ChunkedBoard(2, 0.15, chunk_size=8, cache_size=1)
+    _, changed = board.discover(0, 0)
+    board.flag(-20, 30)
+    assert len(board.discovered_chunks) == 1
+    assert all(isinstance(packed, int | tuple) for packed in board.packed_chunks.values())
+
+    # Reading the cells back decompresses their chunks, and the values match a board that compresses nothing
+    expected = ChunkedBoard(2, 0.15, chunk_size=8)
+    expected.discover(0, 0)
+    expected.flag(-20, 30)
+    x0, y0 = changed.min(axis=0) - 1
+    x1, y1 = changed.max(axis=0) + 2
+    assert np.array_equal(board.window(x0, y0, x1, y1)[2], expected.window(x0, y0, x1, y1)[2])
+    assert board.discovered_at(-20, 30) == 1
+    assert len(board.discovered_chunks) == 1
+
+
+def test_flag() -> None:
+    board = ChunkedBoard(0, 0.2, chunk_size=8)
+    board.flag(-20, 30)
+    assert board.discovered_at(-20, 30) == 1
+    assert board.discovered_grid[-20, 30] == 1
+    assert board.window(-21, 29, -19, 31)[2][1, 1] == 1
+    board.flag(-20, 30)
+    assert board.discovered_at(-20, 30) == 0
+    with pytest.raises(TypeError):
+        board.grid[0, 0] = 1
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+import scripts.engine as Engine
+import scripts.game_logic as GameLogic
+
+
+@pytest.mark.parametrize('grid_size, mine_count', [((9, 9), 10), ((16, 16), 40), ((30, 16), 99)])
+def test_matches_game_logic(grid_size: tuple[int, int], mine_count: int) -> None:
+    '''Plays the same random moves with the engine and with game_logic, one board at a time'''
+    n = 24
+    rng = np.random.default_rng(mine_count)
+    engine = Engine.BatchEngine(n, grid_size, mine_count, seed=1)
+    xs, ys = rng.integers(grid_size[0], size=n), rng.integers(grid_size[1], size=n)
+    result = engine.reset(xs, ys)
+    assert not result.hit_mine.any()
+
+    boards = []
+    for i in range(n):
+        grid = engine.grid[i].astype(int)
+        assert np.count_nonzero(grid) == mine_count
+        neighbours_grid = GameLogic.create_neighbours_grid(grid)
+        discovered_grid = GameLogic.create_discovered_grid(grid)
+        changed = GameLogic.discover_cell(grid, neighbours_grid, discovered_grid, int(xs[i]), int(ys[i]))[1]
+        assert result.revealed[i] == len(changed)
+        boards.append((grid, neighbours_grid, discovered_grid, GameLogic.GameState(grid, discovered_grid, mine_count)))
+    finished = np.zeros(n, dtype=bool)
+
+    for _ in range(150):
+        actions = rng.choice([Engine.NO_ACTION, Engine.DISCOVER, Engine.FLAG], size=n, p=[.1, .6, .3])
+        xs, ys = rng.integers(grid_size[0], size=n), rng.integers(grid_size[1], size=n)
+        # The mines are mostly flagged rather than discovered, so that some games are won
+        avoid = (engine.grid[np.arange(n), xs, ys] == 1) & (actions == Engine.DISCOVER) & (rng.random(n) < .95)
+        actions[avoid] = Engine.FLAG
+        result = engine.step(actions, xs, ys)
+
+        for i, (grid, neighbours_grid, discovered_grid, state) in enumerate(boards):
+            hit_mine, revealed, won = False, 0, False
+            if not finished[i]:
+                if actions[i] == Engine.DISCOVER:
+                    hit_mine, changed = GameLogic.discover_cell(grid, neighbours_grid, discovered_grid, int(xs[i]), int(ys[i]), state)
+                    revealed = len(changed)
+                elif actions[i] == Engine.FLAG:
+                    GameLogic.flag_cell(discovered_grid, int(xs[i]), int(ys[i]), state)
+                won = state.has_won() and not hit_mine
+                finished[i] = hit_mine or won
+            assert (result.hit_mine[i], result.revealed[i], result.won[i]) == (hit_mine, revealed, won)
+            np.testing.assert_array_equal(engine.discovered_grid[i], discovered_grid)
+            assert (engine.flagged_mines[i], engine.discovered_cells[i]) == (state.flagged_mines, state.discovered_cells)
+    assert finished.any()
+
+
+def test_seeded() -> None:
+    a = Engine.BatchEngine(8, (16, 16), 40, seed=3)
+    b = Engine.BatchEngine(8, (16, 16), 40, seed=3)
+    xs, ys = np.full(8, 5), np.arange(8)
+    a.reset(xs, ys)
+    b.reset(xs, ys)
+    np.testing.assert_array_equal(a.grid, b.grid)
+    assert len({a.grid[i].tobytes() for i in range(8)}) == 8 # Each board gets its own generator
+
+
+def test_visible_neighbours() -> None:
+    engine = Engine.BatchEngine(4, (9, 9), 10, seed=0)
+    engine.reset(np.full(4, 4), np.full(4, 4))
+    visible = engine.visible_neighbours()
+    np.testing.assert_array_equal(visible[engine.discovered_grid == 2], engine.neighbours_grid[engine.discovered_grid == 2])
+    assert (visible[engine.discovered_grid != 2] == -2).all()
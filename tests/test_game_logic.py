@@ -0,0 +1,208 @@
+import numpy as np
+import pytest
+
+import scripts.game_logic as GameLogic
+
+
+@pytest.mark.parametrize('grid_size, mine_count', [((9, 9), 10), ((30, 16), 99), ((8, 8), 63), ((50, 40), 0)])
+def test_create_grid(grid_size: tuple[int, int], mine_count: int) -> None:
+    safe_cells = np.array([0, 5, grid_size[0] * grid_size[1] - 1]) if mine_count < 63 else np.array([3])
+    grid = GameLogic.create_grid(grid_size, mine_count, safe_cells, np.random.default_rng(0))
+    assert grid.shape == grid_size
+    assert np.count_nonzero(grid) == mine_count
+    assert not grid.flat[safe_cells].any()
+
+
+def test_create_grid_seeded() -> None:
+    a = GameLogic.create_grid((30, 16), 99, rng=np.random.default_rng(7))
+    b = GameLogic.create_grid((30, 16), 99, rng=np.random.default_rng(7))
+    np.testing.assert_array_equal(a, b)
+
+
+def test_create_grid_uniform() -> None:
+    # Every cell that is not safe is as likely to get a mine, including the cells right after the safe cells
+    rng = np.random.default_rng(1)
+    safe_cells = np.array([4, 5, 6, 12])
+    counts = sum(GameLogic.create_grid((4, 4), 6, safe_cells, rng).ravel() for _ in range(4000))
+    assert (counts[safe_cells] == 0).all()
+    expected = 4000 * 6 / 12
+    assert np.abs(np.delete(counts, safe_cells) - expected).max() < 5 * np.sqrt(expected)
+
+
+def test_create_grid_too_many_mines() -> None:
+    with pytest.raises(ValueError):
+        GameLogic.create_grid((4, 4), 16, np.array([0]))
+
+
+def test_neighbours_grid() -> None:
+    grid = GameLogic.create_grid((20, 13), 60, rng=np.random.default_rng(2))
+    neighbours_grid = GameLogic.create_neighbours_grid(grid)
+    for x in range(grid.shape[0]):
+        for y in range(grid.shape[1]):
+            assert neighbours_grid[x, y] == (-1 if grid[x, y] else GameLogic.count_neighbours(grid, x, y))
+
+
+@pytest.mark.parametrize('x, y, size', [(4, 4, 9), (0, 0, 4), (8, 3, 6)])
+def test_safe_zone(x: int, y: int, size: int) -> None:
+    zone = GameLogic.safe_zone(x, y, (9, 9), 10)
+    cells = {divmod(int(c), 9) for c in zone}
+    assert len(cells) == size
+    assert all(max(abs(cx - x), abs(cy - y)) <= 1 for cx, cy in cells)
+
+
+def test_safe_zone_dense() -> None:
+    np.testing.assert_array_equal(GameLogic.safe_zone(4, 4, (9, 9), 75), [4 * 9 + 4])
+
+
+def test_create_from_coords() -> None:
+    rng = np.random.default_rng(3)
+    for _ in range(20):
+        x, y = rng.integers(30), rng.integers(16)
+        grid, neighbours_grid, discovered_grid = GameLogic.create_from_coords(int(x), int(y), (30, 16), 99, rng)[:3]
+        assert np.count_nonzero(grid) == 99
+        assert grid[x, y] == 0 and neighbours_grid[x, y] == 0 # The first click always opens a region
+        assert discovered_grid[x, y] == 2
+        assert not (discovered_grid[grid == 1] == 2).any()
+
+
+def test_discover_cell() -> None:
+    grid = np.zeros((5, 5), dtype=int)
+    grid[4, 4] = 1
+    neighbours_grid = GameLogic.create_neighbours_grid(grid)
+    discovered_grid = GameLogic.create_discovered_grid(grid)
+    is_mine = GameLogic.discover_cell(grid, neighbours_grid, discovered_grid, 0, 0)[0]
+    assert not is_mine
+    assert np.count_nonzero(discovered_grid == 2) == 24
+    assert GameLogic.check_win(grid, discovered_grid, 1)
+
+
+def test_changed_cells() -> None:
+    rng = np.random.default_rng(4)
+    grid, neighbours_grid, discovered_grid = GameLogic.create_from_coords(5, 5, (30, 16), 60, rng)[:3]
+    for x, y in np.argwhere(grid == 0)[::7].tolist():
+        before = discovered_grid.copy()
+        changed = GameLogic.discover_cell(grid, neighbours_grid, discovered_grid, x, y)[1]
+        assert {tuple(c) for c in changed.tolist()} == {tuple(c) for c in np.argwhere(before != discovered_grid).tolist()}
+
+
+def test_flag_cell() -> None:
+    discovered_grid = np.array([[0, 2]])
+    np.testing.assert_array_equal(GameLogic.flag_cell(discovered_grid, 0, 0), [[0, 0]])
+    assert discovered_grid[0, 0] == 1
+    GameLogic.flag_cell(discovered_grid, 0, 0)
+    assert discovered_grid[0, 0] == 0
+    assert len(GameLogic.flag_cell(discovered_grid, 0, 1)) == 0 # A discovered cell cannot be flagged
+    assert discovered_grid[0, 1] == 2
+
+
+def test_game_state_counters() -> None:
+    rng = np.random.default_rng(5)
+    grid, neighbours_grid, discovered_grid = GameLogic.create_from_coords(5, 5, (16, 16), 40, rng)[:3]
+    state = GameLogic.GameState(grid, discovered_grid, 40)
+    for _ in range(300):
+        x, y = int(rng.integers(16)), int(rng.integers(16))
+        if grid[x, y] == 1 or rng.random() < .2:
+            GameLogic.flag_cell(discovered_grid, x, y, state)
+        else:
+            GameLogic.discover_cell(grid, neighbours_grid, discovered_grid, x, y, state)
+        assert (state.flagged_mines, state.discovered_cells) == GameLogic.count_progress(grid, discovered_grid)
+        assert state.has_won() == GameLogic.check_win(grid, discovered_grid, 40)
+
+
+def test_game_state_win() -> None:
+    grid = np.zeros((4, 4), dtype=int)
+    grid[0, 0] = grid[3, 3] = 1
+    discovered_grid = GameLogic.create_discovered_grid(grid)
+    state = GameLogic.GameState(grid, discovered_grid, 2, debug=True)
+    GameLogic.flag_cell(discovered_grid, 0, 0, state)
+    GameLogic.flag_cell(discovered_grid, 1, 1, state) # A wrong flag does not count
+    assert not state.has_won()
+    GameLogic.flag_cell(discovered_grid, 3, 3, state)
+    assert state.has_won()
+
+
+def test_game_state_verify() -> None:
+    grid = np.zeros((3, 3), dtype=int)
+    discovered_grid = GameLogic.create_discovered_grid(grid)
+    state = GameLogic.GameState(grid, discovered_grid, 0)
+    discovered_grid[1, 1] = 2 # Changed without updating the state
+    with pytest.raises(RuntimeError):
+        state.verify()
+
+
+def reference_regions(neighbours_grid: np.ndarray) -> list[set[tuple[int, int]]]:
+    '''The regions of cells without neighbouring mines, with a breadth-first search from each cell'''
+    w, h = neighbours_grid.shape
+    seen, regions = set(), []
+    for start in zip(*np.nonzero(neighbours_grid == 0)):
+        if start in seen:
+            continue
+        region, queue = {start}, [start]
+        while queue:
+            x, y = queue.pop()
+            for i in range(-1, 2):
+                for j in range(-1, 2):
+                    n = (x + i, y + j)
+                    if 0 <= n[0] < w and 0 <= n[1] < h and neighbours_grid[n] == 0 and n not in region:
+                        region.add(n)
+                        queue.append(n)
+        seen |= region
+        regions.append(region)
+    return regions
+
+
+@pytest.mark.parametrize('density', [.02, .1, .2])
+def test_label_regions(density: float) -> None:
+    rng = np.random.default_rng(int(density * 100))
+    grid = (rng.random((37, 23)) < density).astype(int)
+    neighbours_grid = GameLogic.create_neighbours_grid(grid)
+    labels, bounds = GameLogic.label_regions(neighbours_grid)
+
+    regions = reference_regions(neighbours_grid)
+    assert labels.max() == len(regions) == len(bounds) - 1
+    for region in regions:
+        cells = np.array(sorted(region))
+        label = labels[cells[0][0], cells[0][1]]
+        assert {tuple(c) for c in np.argwhere(labels == label).tolist()} == region
+        assert tuple(bounds[label]) == (*cells.min(axis=0), *(cells.max(axis=0) + 1))
+    assert (labels[neighbours_grid != 0] == 0).all()
+
+    # The regions store the same labels as runs of cells
+    labelled = GameLogic.Regions(neighbours_grid)
+    assert labelled.region_count == len(regions)
+    np.testing.assert_array_equal(labelled.sizes, np.bincount(labels.ravel(), minlength=len(bounds)) * (np.arange(len(bounds)) > 0))
+    for x, y in np.ndindex(*labels.shape):
+        assert labelled.label(x, y) == labels[x, y]
+    for label in range(1, len(bounds)):
+        assert {tuple(c) for c in labelled.members(label).tolist()} == {tuple(c) for c in np.argwhere(labels == label).tolist()}
+
+
+@pytest.mark.parametrize('density', [.05, .15])
+def test_regions_reveal(density: float) -> None:
+    rng = np.random.default_rng(int(density * 100))
+    for _ in range(10):
+        grid = (rng.random((30, 16)) < density).astype(int)
+        neighbours_grid = GameLogic.create_neighbours_grid(grid)
+        regions = GameLogic.Regions(neighbours_grid)
+        flagged = rng.random(grid.shape) < .05
+        expected, discovered_grid = np.where(flagged, 1, 0), np.where(flagged, 1, 0)
+        for x, y in np.argwhere(grid == 0)[::11].tolist():
+            a = GameLogic.discover_cell(grid, neighbours_grid, expected, x, y)[1]
+            b = GameLogic.discover_cell(grid, neighbours_grid, discovered_grid, x, y, regions=regions)[1]
+            np.testing.assert_array_equal(discovered_grid, expected)
+            assert {tuple(c) for c in a.tolist()} == {tuple(c) for c in b.tolist()}
+
+
+def test_mine_mask_chunks(monkeypatch) -> None:
+    # The mines are split between the chunks without changing their distribution
+    monkeypatch.setattr(GameLogic, 'SAMPLING_CHUNK_SIZE', 5)
+    rng = np.random.default_rng(6)
+    safe_cells = np.array([0, 7, 8, 19])
+    counts = np.zeros(24)
+    for _ in range(4000):
+        mask = GameLogic.create_mine_mask((4, 6), 8, safe_cells, rng)
+        assert np.count_nonzero(mask) == 8
+        counts += mask.ravel()
+    assert (counts[safe_cells] == 0).all()
+    expected = 4000 * 8 / 20
+    assert np.abs(np.delete(counts, safe_cells) - expected).max() < 5 * np.sqrt(expected)
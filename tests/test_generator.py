@@ -0,0 +1,40 @@
+import threading
+import time
+
+import numpy as np
+
+import scripts.generator as Generator
+
+
+def test_background_tasks_stop() -> None:
+    event = threading.Event()
+    Generator.init_worker(event)
+    try:
+        seed = np.random.SeedSequence(0)
+        event.set()
+        assert Generator.find_solvable(5, 5, (16, 16), 20, seed, 50, background=True) is None
+        mines = Generator.find_solvable(5, 5, (16, 16), 20, seed, 50)
+        assert mines is not None and np.count_nonzero(mines) == 20
+        assert Generator.is_solvable(mines, 5, 5)
+
+        event.clear()
+        np.testing.assert_array_equal(Generator.find_solvable(5, 5, (16, 16), 20, seed, 50, background=True), mines)
+    finally:
+        Generator.init_worker(None)
+
+
+def test_generator() -> None:
+    generator = Generator.Generator((16, 16), 40, workers=2, queue_size=2, seed=0)
+    try:
+        board = generator.generate(8, 8)
+        assert board is not None and board.discovered[8, 8] and board.mine_count == 40
+        assert Generator.is_solvable(board.mines, 8, 8)
+
+        for _ in range(600): # The boards prepared in the background come without blocking
+            prepared = generator.pop()
+            if prepared is not None:
+                break
+            time.sleep(.05)
+        assert prepared is not None
+    finally:
+        generator.close()
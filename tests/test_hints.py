@@ -0,0 +1,67 @@
+import time
+
+import numpy as np
+import pytest
+
+from scripts.board import Board
+from scripts.hints import GENERATION, STOP, WRITING, HintWorker
+from scripts.solver import Solver
+
+
+GRID_SIZE = (30, 16)
+MINE_COUNT = 99
+
+
+def wait_result(worker: HintWorker, timeout: float = 30.) -> np.ndarray:
+    deadline = time.perf_counter() + timeout
+    while (probabilities := worker.poll()) is None:
+        assert time.perf_counter() < deadline, 'The worker did not publish the probabilities'
+        time.sleep(.01)
+    return probabilities
+
+
+@pytest.fixture
+def worker():
+    worker = HintWorker(GRID_SIZE, MINE_COUNT)
+    yield worker
+    worker.close()
+
+
+def expected(board: Board) -> np.ndarray:
+    return Solver().solve(np.asarray(board.neighbours_grid), np.asarray(board.discovered_grid), MINE_COUNT).probabilities
+
+
+def test_probabilities(worker: HintWorker) -> None:
+    board = Board.from_coords(10, 8, GRID_SIZE, MINE_COUNT, np.random.default_rng(4))
+    worker.update(board.cells)
+    np.testing.assert_allclose(wait_result(worker), expected(board), rtol=1e-6, equal_nan=True)
+    assert not worker.pending
+    assert worker.poll() is None # A result is only returned once
+
+    safe = np.argwhere(expected(board) == 0)
+    _, changed = board.discover(*map(int, safe[0]))
+    worker.update(board.cells, changed)
+    assert worker.generation == 2
+    np.testing.assert_allclose(wait_result(worker), expected(board), rtol=1e-6, equal_nan=True)
+
+
+def test_stale_results(worker: HintWorker) -> None:
+    worker.input_header[STOP] = 1 # The worker is stopped, so that the results are only those written by the test
+    worker.changed.set()
+    worker.process.join()
+    board = Board.from_coords(10, 8, GRID_SIZE, MINE_COUNT, np.random.default_rng(5))
+
+    worker.update(board.cells)
+    worker.update(board.cells)
+    for generation in (WRITING, 1): # Being written, or the result of a board that has changed since
+        worker.output_header[GENERATION] = generation
+        assert worker.pending
+        assert worker.poll() is None
+
+    worker.output_header[GENERATION] = 2
+    assert not worker.pending
+    assert worker.poll() is worker.probabilities
+    assert worker.poll() is None
+
+    worker.update(board.cells)
+    assert worker.pending and worker.poll() is None
@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+
+import scripts.game_logic as GameLogic
+from scripts.board import Board
+from scripts.history import History
+
+
+GRID_SIZE = (30, 24)
+MINE_COUNT = 120
+
+
+def create_game(packed: bool, rng: np.random.Generator) -> tuple:
+    '''Creates a board and returns its grid, its discovered grid and the functions playing on it'''
+    if packed:
+        board = Board.from_coords(10, 10, GRID_SIZE, MINE_COUNT, rng)
+        return board.grid, board.discovered_grid, board.discover, board.flag
+    grid, neighbours_grid, discovered_grid, regions = GameLogic.create_from_coords(10, 10, GRID_SIZE, MINE_COUNT, rng)
+    discover = lambda x, y, state: GameLogic.discover_cell(grid, neighbours_grid, discovered_grid, x, y, state, regions)
+    flag = lambda x, y, state: GameLogic.flag_cell(discovered_grid, x, y, state)
+    return grid, discovered_grid, discover, flag
+
+
+def play(history: History, state: GameLogic.GameState, discover, flag, rng: np.random.Generator, moves: int) -> dict[int, np.ndarray]:
+    '''Plays random moves, mostly flagging the mines and discovering the safe cells, and returns the discovered grid
+    after each move'''
+    grid = np.asarray(state.grid)
+    snapshots = {history.position: np.array(state.discovered_grid)}
+    for _ in range(moves):
+        x, y = int(rng.integers(GRID_SIZE[0])), int(rng.integers(GRID_SIZE[1]))
+        if grid[x, y] == 1 and rng.random() < .9 or rng.random() < .3:
+            flag(x, y, state)
+        elif grid[x, y] == 0:
+            discover(x, y, state)
+        snapshots[history.position] = np.array(state.discovered_grid)
+    return snapshots
+
+
+def check(history: History, state: GameLogic.GameState, snapshots: dict[int, np.ndarray]) -> None:
+    np.testing.assert_array_equal(np.asarray(state.discovered_grid), snapshots[history.position])
+    state.verify()
+
+
+@pytest.mark.parametrize('packed', [False, True])
+@pytest.mark.parametrize('checkpoint_interval', [1, 4, 64])
+def test_random_jumps(packed: bool, checkpoint_interval: int) -> None:
+    rng = np.random.default_rng(checkpoint_interval)
+    grid, discovered_grid, discover, flag = create_game(packed, rng)
+    history = History(checkpoint_interval=checkpoint_interval)
+    history.reset(discovered_grid)
+    state = GameLogic.GameState(grid, discovered_grid, MINE_COUNT, history=history)
+    snapshots = play(history, state, discover, flag, rng, 150)
+
+    for position in rng.integers(history.first, history.last + 1, 60):
+        history.jump(int(position), state)
+        assert history.position == position
+        check(history, state, snapshots)
+
+
+@pytest.mark.parametrize('packed', [False, True])
+def test_undo_redo(packed: bool) -> None:
+    rng = np.random.default_rng(0)
+    grid, discovered_grid, discover, flag = create_game(packed, rng)
+    history = History(checkpoint_interval=8)
+    history.reset(discovered_grid)
+    state = GameLogic.GameState(grid, discovered_grid, MINE_COUNT, history=history)
+    snapshots = play(history, state, discover, flag, rng, 40)
+
+    while history.can_undo:
+        history.undo(state)
+        check(history, state, snapshots)
+    assert history.position == 0
+    while history.can_redo:
+        history.redo(state)
+        check(history, state, snapshots)
+    assert history.position == history.last
+
+
+@pytest.mark.parametrize('packed', [False, True])
+def test_restore_after_flags(packed: bool) -> None:
+    rng = np.random.default_rng(1)
+    grid, discovered_grid, discover, flag = create_game(packed, rng)
+    history = History(checkpoint_interval=1)
+    history.reset(discovered_grid)
+    state = GameLogic.GameState(grid, discovered_grid, MINE_COUNT, history=history)
+    snapshots = {0: np.array(discovered_grid)}
+
+    mines = np.argwhere(np.asarray(grid) == 1)
+    for x, y in mines[:3]:
+        flag(int(x), int(y), state)
+    x, y = np.argwhere((np.asarray(grid) == 0) & (np.asarray(discovered_grid) == 0))[0]
+    discover(int(x), int(y), state)
+
+    history.jump(0, state) # Further than the checkpoint interval, so the checkpoint of the first move is restored
+    check(history, state, snapshots)
+    assert (state.flagged_mines, state.discovered_cells) == GameLogic.count_progress(grid, discovered_grid)
+
+
+def test_new_move_forgets_redo() -> None:
+    rng = np.random.default_rng(2)
+    grid, discovered_grid, discover, flag = create_game(True, rng)
+    history = History(checkpoint_interval=4)
+    history.reset(discovered_grid)
+    state = GameLogic.GameState(grid, discovered_grid, MINE_COUNT, history=history)
+    play(history, state, discover, flag, rng, 20)
+
+    for _ in range(5):
+        history.undo(state)
+    position = history.position
+    x, y = np.argwhere(np.asarray(discovered_grid) == 0)[0]
+    flag(int(x), int(y), state)
+    assert history.last == position + 1
+    assert not history.can_redo
+    assert all(p <= history.position for p in history.checkpoints)
+
+
+def test_budget() -> None:
+    rng = np.random.default_rng(3)
+    grid, discovered_grid, discover, flag = create_game(True, rng)
+    history = History(budget=3000, checkpoint_interval=8)
+    history.reset(discovered_grid)
+    state = GameLogic.GameState(grid, discovered_grid, MINE_COUNT, history=history)
+    snapshots = play(history, state, discover, flag, rng, 200)
+
+    assert history.first > 0
+    assert history.nbytes <= history.budget or history.first == history.position
+    history.jump(0, state)
+    assert history.position == history.first
+    check(history, state, snapshots)
@@ -0,0 +1,104 @@
+import configparser
+import csv
+import json
+
+import numpy as np
+import pytest
+
+import scripts.profiler as Profiler
+
+
+def record(profiler: Profiler.FrameProfiler, frames: list[list[tuple[str, float]]], monkeypatch: pytest.MonkeyPatch) -> None:
+    '''Records frames with the given phase durations, using a fake clock'''
+    clock = [0.]
+    monkeypatch.setattr(Profiler.time, 'perf_counter', lambda: clock[0])
+    for frame in frames:
+        profiler.begin_frame()
+        for phase, duration in frame:
+            clock[0] += duration
+            profiler.lap(phase)
+        profiler.end_frame()
+
+
+def test_laps(monkeypatch: pytest.MonkeyPatch) -> None:
+    profiler = Profiler.FrameProfiler(history=8)
+    record(profiler, [
+        [('events', .001), ('render', .004), ('display', .002), ('moves', .003)],
+        [('events', .001), ('render', .002), ('moves', .003), ('render', .005)], # A phase timed twice in a frame
+    ], monkeypatch)
+    window = profiler.window()
+    assert window.shape == (2, len(Profiler.PHASES) + 1)
+    expected = np.zeros((2, len(Profiler.PHASES) + 1))
+    for i, durations in enumerate([{'events': .001, 'moves': .003, 'render': .004, 'display': .002}, {'events': .001, 'moves': .003, 'render': .007}]):
+        for phase, duration in durations.items():
+            expected[i, Profiler.PHASES.index(phase)] = duration
+    expected[:, -1] = .010, .011
+    np.testing.assert_allclose(window, expected)
+
+
+def test_ring_buffer(monkeypatch: pytest.MonkeyPatch) -> None:
+    profiler = Profiler.FrameProfiler(history=4)
+    record(profiler, [[('render', i / 1000)] for i in range(1, 11)], monkeypatch)
+    assert profiler.frame_count == 10
+    np.testing.assert_allclose(profiler.window()[:, -1], [.007, .008, .009, .010])
+    assert profiler.summary()['total']['max'] == pytest.approx(.010)
+    assert profiler.histograms[-1].sum() == 10 # The histograms count every frame, not only the last ones
+    assert profiler.hud_lines()[-1] == '4 of 10 frames'
+
+
+def test_summary_without_frames() -> None:
+    summary = Profiler.FrameProfiler().summary()
+    assert set(summary) == set(Profiler.PHASES) | {'total'}
+    assert all(value == 0 for stats in summary.values() for value in stats.values())
+
+
+def test_dump(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    profiler = Profiler.FrameProfiler(history=4)
+    record(profiler, [[('events', .001), ('render', .002)]] * 6, monkeypatch)
+    profiler.note('first_frame', 'first frame after 50ms')
+
+    profiler.dump(str(tmp_path / 'frames.csv'))
+    with open(tmp_path / 'frames.csv', newline='') as file:
+        rows = list(csv.reader(file))
+    assert rows[0][0] == 'frame' and rows[0][-1] == 'total_ms'
+    assert [row[0] for row in rows[1:]] == ['2', '3', '4', '5']
+    assert float(rows[1][-1]) == pytest.approx(3)
+
+    profiler.dump(str(tmp_path / 'frames.json'))
+    with open(tmp_path / 'frames.json') as file:
+        report = json.load(file)
+    assert report['frames'] == 6
+    assert report['notes'] == {'first_frame': 'first frame after 50ms'}
+    assert sum(report['histograms']['render']) == 6
+    assert len(report['histograms']['render']) == len(report['histogram_edges']) + 1
+
+    with pytest.raises(ValueError):
+        profiler.dump(str(tmp_path / 'frames.txt'))
+
+
+def test_config_rejects_unsupported_output(monkeypatch: pytest.MonkeyPatch) -> None:
+    # The output is checked when the config is read, rather than when the game exits
+    import main
+    get = configparser.ConfigParser.get
+    def get_output(self, section, option, **kwargs):
+        return 'frames.txt' if (section, option) == ('profiler', 'output') else get(self, section, option, **kwargs)
+    monkeypatch.setattr(configparser.ConfigParser, 'get', get_output)
+    with pytest.raises(ValueError, match='frames.txt'):
+        main.init_config()
+
+
+def test_notes() -> None:
+    profiler = Profiler.FrameProfiler(history=4)
+    profiler.note('capture', 'capture started')
+    profiler.note('capture', 'capture saved')
+    assert profiler.hud_lines()[-1] == 'capture saved'
+    assert len(profiler.hud_lines()) == len(Profiler.PHASES) + 4
+
+
+def test_null_profiler() -> None:
+    profiler = Profiler.NullProfiler()
+    assert not profiler.enabled
+    profiler.begin_frame()
+    profiler.lap('anything')
+    profiler.end_frame()
+    profiler.note('anything', 'ignored')
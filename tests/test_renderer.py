@@ -0,0 +1,162 @@
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+import pygame
+import pytest
+
+import scripts.assets as Assets
+import scripts.game_logic as GameLogic
+import scripts.renderer as Renderer
+from scripts.board import Board
+from scripts.camera import Camera
+
+
+CELL_SIZE = 16
+
+
+@pytest.fixture(scope='module')
+def textures() -> Assets.Textures:
+    pygame.font.init()
+    return Assets.Textures(CELL_SIZE, pygame.font.Font(None, CELL_SIZE))
+
+
+def test_render_changed_cells(textures: Assets.Textures) -> None:
+    rng = np.random.default_rng(0)
+    grid, neighbours_grid, discovered_grid = GameLogic.create_from_coords(3, 3, (20, 12), 40, rng)[:3]
+    screen = pygame.Surface((20 * CELL_SIZE, 12 * CELL_SIZE))
+    Renderer.render_grid(screen, grid, neighbours_grid, discovered_grid, CELL_SIZE, textures)
+
+    changed = [GameLogic.flag_cell(discovered_grid, *map(int, np.argwhere(discovered_grid == 0)[0]))]
+    for x, y in np.argwhere((grid == 0) & (discovered_grid == 0))[:3].tolist():
+        changed.append(GameLogic.discover_cell(grid, neighbours_grid, discovered_grid, x, y)[1])
+    changed = np.concatenate(changed)
+    rects = Renderer.render_cells(screen, grid, neighbours_grid, discovered_grid, changed, CELL_SIZE, textures)
+    assert sorted((r.x // CELL_SIZE, r.y // CELL_SIZE) for r in rects) == sorted(map(tuple, changed.tolist()))
+    assert all(r.size == (CELL_SIZE, CELL_SIZE) for r in rects)
+
+    expected = pygame.Surface(screen.get_size())
+    Renderer.render_grid(expected, grid, neighbours_grid, discovered_grid, CELL_SIZE, textures)
+    np.testing.assert_array_equal(pygame.surfarray.array3d(screen), pygame.surfarray.array3d(expected))
+
+
+def test_tile_indices() -> None:
+    grid = np.array([[0, 0, 0, 1, 1]])
+    neighbours_grid = np.array([[3, 0, 8, 2, 2]])
+    discovered_grid = np.array([[0, 1, 2, 2, 0]])
+    expected = [Assets.TILE_HIDDEN, Assets.TILE_FLAG, Assets.TILE_NUMBER + 8, Assets.TILE_MINE, Assets.TILE_HIDDEN]
+    assert Renderer.tile_indices(grid, neighbours_grid, discovered_grid).tolist() == [expected]
+
+
+def test_atlas_tiles(textures: Assets.Textures) -> None:
+    assert textures.atlas.get_size() == (CELL_SIZE * Assets.TILE_COUNT, CELL_SIZE)
+    assert len(textures.tiles) == Assets.TILE_COUNT
+    tiles = [pygame.surfarray.array3d(textures.atlas.subsurface(tile)) for tile in textures.tiles]
+    for i in range(Assets.TILE_COUNT):
+        for j in range(i):
+            assert not np.array_equal(tiles[i], tiles[j]), (i, j)
+
+
+def test_render_view_exploded(textures: Assets.Textures) -> None:
+    grid = np.array([[0, 1], [1, 0]])
+    neighbours_grid = np.array([[2, 1], [1, 2]])
+    discovered_grid = np.full((2, 2), 2)
+    screen = pygame.Surface((2 * CELL_SIZE, 2 * CELL_SIZE))
+    camera = Camera(screen.get_size(), CELL_SIZE)
+    camera.pan(5 * CELL_SIZE, 7 * CELL_SIZE)
+    Renderer.render_view(screen, grid, neighbours_grid, discovered_grid, (5, 7), camera, textures, (6, 7))
+
+    def tile_at(x: int, y: int) -> np.ndarray:
+        return pygame.surfarray.array3d(screen.subsurface((x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)))
+
+    def atlas_tile(tile: int) -> np.ndarray:
+        return pygame.surfarray.array3d(textures.atlas.subsurface(textures.tiles[tile]))
+
+    np.testing.assert_array_equal(tile_at(1, 0), atlas_tile(Assets.TILE_EXPLODED))
+    np.testing.assert_array_equal(tile_at(0, 1), atlas_tile(Assets.TILE_MINE))
+    np.testing.assert_array_equal(tile_at(0, 0), atlas_tile(Assets.TILE_NUMBER + 2))
+
+
+@pytest.mark.parametrize('win', [True, False])
+def test_end_text_is_cached(win: bool) -> None:
+    font = pygame.font.Font(None, 24)
+    screen = pygame.Surface((200, 100))
+    rect = Renderer.render_end_text(screen, win, font)
+    overlay = Renderer.end_overlays[win, font]
+    assert rect.size == overlay.get_size()
+    assert rect.center == screen.get_rect().center
+    Renderer.render_end_text(screen, win, font)
+    assert Renderer.end_overlays[win, font] is overlay
+
+
+@pytest.fixture
+def board() -> Board:
+    rng = np.random.default_rng(0)
+    board = Board.from_coords(5, 5, (200, 150), 4000, rng)
+    board.discovered_grid[rng.random(board.shape) < .2] = 1
+    return board
+
+
+def decoded_tiles(grid, neighbours_grid, discovered_grid) -> np.ndarray:
+    '''The tiles computed from plain arrays, which do not take the packed path'''
+    return Renderer.tile_indices(np.asarray(grid), np.asarray(neighbours_grid), np.asarray(discovered_grid))
+
+
+def test_packed_tiles_match_decoded(board: Board) -> None:
+    np.testing.assert_array_equal(Renderer.tile_indices(board.grid, board.neighbours_grid, board.discovered_grid), decoded_tiles(board.grid, board.neighbours_grid, board.discovered_grid))
+
+
+def test_window_is_packed(board: Board) -> None:
+    window = board.window(30, 20, 120, 90)
+    assert Renderer.packed_cells(*window) is not None
+    assert np.shares_memory(Renderer.packed_cells(*window), board.cells)
+    np.testing.assert_array_equal(Renderer.tile_indices(*window), decoded_tiles(*window))
+
+
+@pytest.mark.parametrize('size', [16, 64, 500])
+def test_sample_tiles(board: Board, size: int) -> None:
+    tiles = Renderer.sample_tiles(board.grid, board.neighbours_grid, board.discovered_grid, size)
+    assert max(tiles.shape) <= max(size, max(board.shape))
+    np.testing.assert_array_equal(tiles, Renderer.sample_tiles(np.asarray(board.grid), np.asarray(board.neighbours_grid), np.asarray(board.discovered_grid), size))
+
+
+def test_sample_tiles_revealed(board: Board) -> None:
+    revealed = np.broadcast_to(np.int8(2), board.shape)
+    tiles = Renderer.sample_tiles(board.grid, board.neighbours_grid, revealed, 50)
+    assert not np.isin(tiles, [Renderer.Assets.TILE_HIDDEN, Renderer.Assets.TILE_FLAG]).any()
+
+
+@pytest.mark.parametrize('stagger', [False, True])
+def test_lod_surface(stagger: bool) -> None:
+    tiles = np.arange(12, dtype=np.uint8).reshape(4, 3)
+    pixels = pygame.surfarray.array2d(Renderer.lod_surface(tiles, stagger))
+    if not stagger:
+        np.testing.assert_array_equal(pixels, tiles)
+    else:
+        assert pixels.shape == (4, 7)
+        np.testing.assert_array_equal(pixels[0, :6], np.repeat(tiles[0], 2))
+        np.testing.assert_array_equal(pixels[1, 1:], np.repeat(tiles[1], 2))
+        assert pixels[1, 0] == pixels[0, 6] == Renderer.LOD_BACKGROUND
+
+
+def test_render_view_lod(board: Board) -> None:
+    screen = pygame.Surface((320, 240))
+    camera = Camera(screen.get_size(), 2, board.shape, min_cell_size=1)
+    x0, y0, x1, y1 = camera.visible_cells()
+    Renderer.render_view(screen, *board.window(x0, y0, x1, y1), (x0, y0), camera, None)
+
+    tiles = decoded_tiles(*board.window(x0, y0, x1, y1))
+    for x, y in [(0, 0), (10, 7), (x1 - x0 - 1, y1 - y0 - 1)]:
+        px, py = (x0 + x) * camera.cell_size - camera.x, (y0 + y) * camera.cell_size - camera.y
+        if 0 <= px < screen.get_width() and 0 <= py < screen.get_height():
+            assert tuple(screen.get_at((px, py)))[:3] == tuple(Renderer.LOD_PALETTE[tiles[x, y]])
+
+
+def test_render_minimap(board: Board) -> None:
+    screen = pygame.Surface((640, 480))
+    tiles = Renderer.sample_tiles(board.grid, board.neighbours_grid, board.discovered_grid, 100)
+    rect = Renderer.render_minimap(screen, tiles, (.25, .25, .5, .5), 100)
+    assert screen.get_rect().contains(rect)
+    assert rect.right == screen.get_width() - Renderer.MINIMAP_MARGIN
+    assert max(rect.size) == 100 + 2 * Renderer.MINIMAP_BORDER
@@ -0,0 +1,58 @@
+import io
+
+import numpy as np
+import pytest
+
+import scripts.engine as Engine
+import scripts.replay as Replay
+
+
+def create_archive() -> bytes:
+    '''Writes two replays, the second one storing its mines'''
+    file = io.BytesIO()
+    writer = Replay.ReplayWriter(file, (9, 9), 10, 1234)
+    writer.record(0, Engine.DISCOVER, 4, 4)
+    writer.record(250, Engine.FLAG, 0, 0)
+    writer.close(400, Replay.RESULT_NONE)
+    mines = np.zeros((10, 8), dtype=bool)
+    mines[::3, ::2] = True
+    writer = Replay.ReplayWriter(file, (10, 8), int(mines.sum()), 0, mines)
+    writer.record(0, Engine.DISCOVER, 1, 1)
+    writer.close(100, Replay.RESULT_LOST)
+    return file.getvalue()
+
+
+def test_round_trip(tmp_path) -> None:
+    path = tmp_path / 'archive.msr'
+    path.write_bytes(create_archive())
+    mapped = list(Replay.map_replays(str(path)))
+    with open(path, 'rb') as file:
+        read = list(Replay.read_replays(file))
+
+    assert len(mapped) == len(read) == 2
+    for a, b in zip(mapped, read):
+        assert (a.grid_size, a.mine_count, a.seed, a.result) == (b.grid_size, b.mine_count, b.seed, b.result)
+        np.testing.assert_array_equal(a.records, b.records)
+    assert mapped[0].mines is None and mapped[0].records['tick'].tolist() == [0, 250]
+    assert mapped[1].mines is not None and mapped[1].result == Replay.RESULT_LOST
+
+
+def test_truncated(tmp_path) -> None:
+    archive = create_archive()
+    first = Replay.HEADER.size + 3 * Replay.RECORD.itemsize # The size of the first replay
+    for length in range(1, len(archive)):
+        if length == first:
+            continue
+        path = tmp_path / f'truncated-{length}.msr'
+        path.write_bytes(archive[:length])
+        replays = []
+        with pytest.raises(ValueError, match=path.name):
+            replays.extend(Replay.map_replays(str(path)))
+        assert len(replays) == (length > first) # The complete replays before the truncated one are returned
+
+
+def test_not_a_replay(tmp_path) -> None:
+    path = tmp_path / 'other.msr'
+    path.write_bytes(b'x' * 100)
+    with pytest.raises(ValueError, match='Not a replay file'):
+        list(Replay.map_replays(str(path)))
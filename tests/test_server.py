@@ -0,0 +1,131 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import scripts.engine as Engine
+import scripts.server as Server
+from benchmarks.server_load import benchmark
+
+
+def test_play_to_the_end() -> None:
+    server = Server.GameServer(seed=0)
+    game_id = server.new_game((9, 9), 10)
+    with pytest.raises(Server.ServerError) as error:
+        server.apply(game_id, Engine.FLAG, 0, 0)
+    assert error.value.code == Server.NOT_STARTED
+
+    status, cells = server.apply(game_id, Engine.DISCOVER, 4, 4)
+    view = np.full((9, 9), Server.HIDDEN)
+    view[cells['x'], cells['y']] = cells['value']
+    assert status == Server.PLAYING and view[4, 4] == 0
+
+    board = server.games[game_id].board
+    for x, y in np.argwhere(~board.mines & (view == Server.HIDDEN)).tolist():
+        if view[x, y] == Server.HIDDEN:
+            status, cells = server.apply(game_id, Engine.DISCOVER, x, y)
+            assert not (cells['value'] == Server.MINE).any()
+            view[cells['x'], cells['y']] = cells['value']
+    assert status == Server.WON
+    assert (view[board.mines] == Server.HIDDEN).all()
+    np.testing.assert_array_equal(view[~board.mines], board.neighbours_grid[~board.mines])
+
+    with pytest.raises(Server.ServerError) as error:
+        server.apply(game_id, Engine.DISCOVER, 0, 0)
+    assert error.value.code == Server.GAME_OVER
+
+
+def test_lose_and_flags() -> None:
+    server = Server.GameServer(seed=1)
+    game_id = server.new_game((9, 9), 10)
+    server.apply(game_id, Engine.DISCOVER, 0, 0)
+    board = server.games[game_id].board
+    x, y = np.argwhere(board.mines)[0].tolist()
+
+    status, cells = server.apply(game_id, Engine.FLAG, x, y)
+    assert status == Server.PLAYING and cells.tolist() == [(x, y, Server.FLAGGED)]
+    server.apply(game_id, Engine.FLAG, x, y)
+    status, cells = server.apply(game_id, Engine.DISCOVER, x, y)
+    assert status == Server.LOST and cells.tolist() == [(x, y, -1)]
+
+
+def test_flagging_every_cell_does_not_win() -> None:
+    server = Server.GameServer(seed=2)
+    game_id = server.new_game((9, 9), 20)
+    server.apply(game_id, Engine.DISCOVER, 4, 4)
+    board = server.games[game_id].board
+    hidden = np.argwhere(board.discovered_grid == 0).tolist()
+    assert len(hidden) > 20
+    for x, y in hidden:
+        status, _ = server.apply(game_id, Engine.FLAG, x, y)
+    assert status == Server.PLAYING
+
+
+@pytest.mark.parametrize('grid_size, mine_count', [((0, 5), 1), ((5, 5), 0), ((5, 5), 25), ((2048, 1024), 10)])
+def test_bad_games(grid_size: tuple[int, int], mine_count: int) -> None:
+    with pytest.raises(Server.ServerError) as error:
+        Server.GameServer().new_game(grid_size, mine_count)
+    assert error.value.code == Server.BAD_REQUEST
+
+
+def test_requests() -> None:
+    server = Server.GameServer(max_games=1, seed=0)
+    owned, other = set(), set()
+    kind, status, game_id, count = Server.RESPONSE.unpack(server.handle_request(Server.REQUEST.pack(Server.NEW, 0, 10, 9, 9), owned))
+    assert (kind, count) == (Server.NEW, 0) and owned == {game_id}
+
+    def error(request: bytes, owned: set[int]) -> int:
+        kind, status, _, _ = Server.RESPONSE.unpack(server.handle_request(request, owned)[:Server.RESPONSE.size])
+        return status if kind == Server.ERROR else 0
+
+    assert error(Server.REQUEST.pack(Server.NEW, 0, 10, 9, 9), other) == Server.TOO_MANY_GAMES
+    assert error(Server.REQUEST.pack(Server.ACTION, Engine.DISCOVER, game_id, 0, 0), other) == Server.UNKNOWN_GAME
+    assert error(Server.REQUEST.pack(Server.ACTION, 7, game_id, 0, 0), owned) == Server.BAD_REQUEST
+    assert error(Server.REQUEST.pack(Server.ACTION, Engine.DISCOVER, game_id, 9, 0), owned) == Server.OUT_OF_BOUNDS
+    assert error(Server.REQUEST.pack(9, 0, game_id, 0, 0), owned) == Server.BAD_REQUEST
+
+    response = server.handle_request(Server.REQUEST.pack(Server.ACTION, Engine.DISCOVER, game_id, 4, 4), owned)
+    count = Server.RESPONSE.unpack(response[:Server.RESPONSE.size])[3]
+    assert len(response) == Server.RESPONSE.size + count * Server.CELL.itemsize
+
+    assert error(Server.REQUEST.pack(Server.CLOSE, 0, game_id, 0, 0), owned) == 0
+    assert not owned and not server.games
+
+
+def test_seeded_games() -> None:
+    boards = []
+    for _ in range(2):
+        server = Server.GameServer(seed=5)
+        game_id = server.new_game((16, 16), 40)
+        server.apply(game_id, Engine.DISCOVER, 8, 8)
+        boards.append(server.games[game_id].board.mines)
+    np.testing.assert_array_equal(*boards)
+
+
+def test_connections() -> None:
+    async def session() -> None:
+        server = Server.GameServer(seed=0)
+        listener = await server.serve('127.0.0.1', 0)
+        client = await Server.Client.connect(*listener.sockets[0].getsockname()[:2])
+        game_id = await client.new_game((9, 9), 10)
+        status, cells = await client.act(game_id, Engine.DISCOVER, 4, 4)
+        assert status == Server.PLAYING and len(cells) > 0
+        with pytest.raises(Server.ServerError):
+            await client.act(game_id + 1, Engine.DISCOVER, 4, 4)
+
+        await client.close() # The games of a connection are deleted when it closes
+        for _ in range(100):
+            if not server.games:
+                break
+            await asyncio.sleep(.01)
+        assert not server.games
+        listener.close()
+        await listener.wait_closed()
+
+    asyncio.run(session())
+
+
+def test_benchmark() -> None:
+    result = asyncio.run(benchmark(None, 0, 4, .2, (9, 9), 10, .1, 0))
+    assert result['actions'] > 0 and result['games'] >= 4
+    assert result['p50'] <= result['p99'] <= result['max']
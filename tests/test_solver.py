@@ -0,0 +1,77 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+import scripts.game_logic as GameLogic
+from scripts.solver import Solver
+
+
+def brute_force(neighbours_grid: np.ndarray, discovered_grid: np.ndarray, mine_count: int) -> np.ndarray:
+    '''The probability of each hidden cell to contain a mine, from every placement of the mines that agrees with the
+    discovered numbers, the flags being mines'''
+    w, h = discovered_grid.shape
+    hidden = [tuple(c) for c in np.argwhere(discovered_grid == 0).tolist()]
+    flagged = discovered_grid == 1
+    numbers = [(x, y, neighbours_grid[x, y]) for x, y in np.argwhere(discovered_grid == 2).tolist()]
+    counts, total = np.zeros((w, h)), 0
+    for placement in combinations(hidden, mine_count - int(flagged.sum())):
+        mines = flagged.copy()
+        for cell in placement:
+            mines[cell] = True
+        if all(mines[max(x-1, 0):x+2, max(y-1, 0):y+2].sum() == n for x, y, n in numbers):
+            total += 1
+            for cell in placement:
+                counts[cell] += 1
+    probabilities = np.full((w, h), np.nan)
+    probabilities[discovered_grid == 0] = counts[discovered_grid == 0] / total
+    probabilities[flagged] = np.nan
+    return probabilities
+
+
+def random_state(rng: np.random.Generator, grid_size: tuple[int, int], mine_count: int) -> tuple[np.ndarray, np.ndarray]:
+    '''Opens a grid and discovers a few more safe cells, flagging some of the mines'''
+    grid, neighbours_grid, discovered_grid = GameLogic.create_from_coords(0, 0, grid_size, mine_count, rng)[:3]
+    for x, y in np.argwhere((grid == 0) & (discovered_grid == 0)).tolist():
+        if rng.random() < .15:
+            GameLogic.discover_cell(grid, neighbours_grid, discovered_grid, x, y)
+    for x, y in np.argwhere(grid == 1).tolist():
+        if rng.random() < .3:
+            discovered_grid[x, y] = 1
+    return neighbours_grid, discovered_grid
+
+
+@pytest.mark.parametrize('seed', range(12))
+def test_brute_force(seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    grid_size, mine_count = (6, 5), 7
+    neighbours_grid, discovered_grid = random_state(rng, grid_size, mine_count)
+    result = Solver().solve(neighbours_grid, discovered_grid, mine_count)
+    expected = brute_force(neighbours_grid, discovered_grid, mine_count)
+
+    hidden = discovered_grid == 0
+    np.testing.assert_allclose(result.probabilities[hidden], expected[hidden], atol=1e-9)
+    np.testing.assert_array_equal(result.safe[hidden], expected[hidden] == 0)
+    np.testing.assert_array_equal(result.mines[hidden], expected[hidden] == 1)
+    assert np.isnan(result.probabilities[~hidden]).all()
+
+
+def test_without_mine_count() -> None:
+    # 1 1 ?     Only the cells touching a number are constrained, and the cells away from it get no probability
+    # ? ? ?
+    neighbours_grid = np.array([[1, 1, 1], [1, 1, 1], [0, 0, 0]])
+    discovered_grid = np.array([[2, 0, 0], [0, 0, 0], [0, 0, 0]])
+    result = Solver().solve(neighbours_grid, discovered_grid)
+    np.testing.assert_allclose(result.probabilities[[0, 1, 1], [1, 0, 1]], 1/3)
+    assert np.isnan(result.probabilities[2]).all()
+    assert not result.safe.any() and not result.mines.any()
+
+
+def test_cache() -> None:
+    rng = np.random.default_rng(0)
+    neighbours_grid, discovered_grid = random_state(rng, (16, 16), 40)
+    solver = Solver(cache_size=2)
+    first = solver.solve(neighbours_grid, discovered_grid, 40)
+    assert len(solver.cache) <= 2
+    second = solver.solve(neighbours_grid, discovered_grid, 40)
+    np.testing.assert_array_equal(first.probabilities, second.probabilities)
@@ -0,0 +1,151 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+import scripts.engine as Engine
+import scripts.game_logic as GameLogic
+from scripts.solver import extract_constraints
+from scripts.topology import HEX, KINDS, SQUARE, TORUS, TableTopology, Topology, get_topology
+
+
+GRID_SIZE = (13, 9)
+
+
+def reference_neighbours(kind: str, x: int, y: int, grid_size: tuple[int, int]) -> set[tuple[int, int]]:
+    '''The neighbours of a cell, from the geometry of each kind of board'''
+    w, h = grid_size
+    if kind == HEX: # The odd columns are half a cell lower, so they touch the rows below in the columns next to them
+        rows = (y - 1, y) if x % 2 == 0 else (y, y + 1)
+        cells = [(x, y - 1), (x, y + 1)] + [(x + i, j) for i in (-1, 1) for j in rows]
+    else:
+        cells = [(x + i, y + j) for i in range(-1, 2) for j in range(-1, 2) if (i, j) != (0, 0)]
+    if kind == TORUS:
+        return {(cx % w, cy % h) for cx, cy in cells}
+    return {(cx, cy) for cx, cy in cells if 0 <= cx < w and 0 <= cy < h}
+
+
+def reference_flood(kind: str, mines: np.ndarray, x: int, y: int) -> set[tuple[int, int]]:
+    '''The cells discovered from a cell, with a breadth-first search through the cells without neighbouring mines'''
+    discovered, queue = {(x, y)}, deque([(x, y)])
+    while queue:
+        cell = queue.popleft()
+        neighbours = reference_neighbours(kind, *cell, mines.shape)
+        if mines[cell] or any(mines[n] for n in neighbours):
+            continue
+        for n in neighbours - discovered:
+            discovered.add(n)
+            queue.append(n)
+    return discovered
+
+
+@pytest.mark.parametrize('kind', KINDS)
+def test_neighbours(kind: str) -> None:
+    topology = get_topology(kind, GRID_SIZE)
+    for x in range(GRID_SIZE[0]):
+        for y in range(GRID_SIZE[1]):
+            assert {tuple(c) for c in topology.neighbours(x, y).tolist()} == reference_neighbours(kind, x, y, GRID_SIZE)
+
+
+def test_square_has_no_table() -> None:
+    square = get_topology(SQUARE, GRID_SIZE)
+    assert type(square) is Topology and not hasattr(square, 'table')
+    assert get_topology(TORUS, GRID_SIZE) is get_topology(TORUS, GRID_SIZE)
+    with pytest.raises(ValueError):
+        TableTopology(SQUARE, GRID_SIZE)
+
+
+@pytest.mark.parametrize('kind', KINDS)
+def test_count_neighbours(kind: str) -> None:
+    rng = np.random.default_rng(0)
+    grid = (rng.random(GRID_SIZE) < .3).astype(np.int8)
+    topology = get_topology(kind, GRID_SIZE)
+    neighbours_grid = GameLogic.create_neighbours_grid(grid, topology=topology)
+    for x in range(GRID_SIZE[0]):
+        for y in range(GRID_SIZE[1]):
+            count = sum(int(grid[n]) for n in reference_neighbours(kind, x, y, GRID_SIZE))
+            assert GameLogic.count_neighbours(grid, x, y, topology) == count
+            assert neighbours_grid[x, y] == (-1 if grid[x, y] else count)
+
+
+@pytest.mark.parametrize('kind', KINDS)
+@pytest.mark.parametrize('density', [.05, .15])
+@pytest.mark.parametrize('regions', [False, True])
+def test_flood(kind: str, density: float, regions: bool) -> None:
+    rng = np.random.default_rng(int(density * 100))
+    topology = get_topology(kind, GRID_SIZE)
+    for _ in range(10):
+        grid = (rng.random(GRID_SIZE) < density).astype(np.int8)
+        neighbours_grid = GameLogic.create_neighbours_grid(grid, topology=topology)
+        x, y = np.argwhere(grid == 0)[rng.integers(np.count_nonzero(grid == 0))]
+        discovered_grid = GameLogic.create_discovered_grid(grid)
+        labels = GameLogic.Regions(neighbours_grid, topology) if regions else None
+
+        is_mine, changed = GameLogic.discover_cell(grid, neighbours_grid, discovered_grid, int(x), int(y), regions=labels, topology=topology)
+        expected = reference_flood(kind, grid.astype(bool), int(x), int(y))
+        assert not is_mine
+        assert {tuple(c) for c in changed.tolist()} == expected
+        assert {tuple(c) for c in np.argwhere(discovered_grid == 2).tolist()} == expected
+
+
+@pytest.mark.parametrize('kind', KINDS)
+def test_label_stack(kind: str) -> None:
+    rng = np.random.default_rng(1)
+    topology = get_topology(kind, GRID_SIZE)
+    masks = rng.random((3, *GRID_SIZE)) < .6
+    labels, bounds = topology.label(masks)
+    for mask, grid_labels in zip(masks, labels):
+        assert np.array_equal(grid_labels > 0, mask)
+        for x, y in np.argwhere(mask).tolist():
+            for n in reference_neighbours(kind, x, y, GRID_SIZE):
+                assert not mask[n] or grid_labels[n] == grid_labels[x, y]
+    # The labels are unique across the stack, and each group lies in its bounds
+    assert not set(np.unique(labels[0])[1:]) & set(np.unique(labels[1])[1:])
+    for label in range(1, len(bounds)):
+        _, xs, ys = np.nonzero(labels == label)
+        x0, y0, x1, y1 = bounds[label]
+        assert x0 <= xs.min() and xs.max() < x1 and y0 <= ys.min() and ys.max() < y1
+
+
+@pytest.mark.parametrize('kind', KINDS)
+def test_constraints(kind: str) -> None:
+    rng = np.random.default_rng(2)
+    topology = get_topology(kind, GRID_SIZE)
+    grid = (rng.random(GRID_SIZE) < .2).astype(np.int8)
+    neighbours_grid = GameLogic.create_neighbours_grid(grid, np.int8, topology)
+    discovered_grid = np.where(rng.random(GRID_SIZE) < .5, 2, 0).astype(np.int8)
+    discovered_grid[(grid == 1) & (discovered_grid == 2)] = 1
+
+    constraints, _, _ = extract_constraints(neighbours_grid, discovered_grid, topology)
+    expected = {}
+    h = GRID_SIZE[1]
+    for x, y in np.argwhere((discovered_grid == 2) & (neighbours_grid > 0)).tolist():
+        neighbours = reference_neighbours(kind, x, y, GRID_SIZE)
+        cells = frozenset(nx * h + ny for nx, ny in neighbours if discovered_grid[nx, ny] == 0)
+        if cells:
+            expected[cells] = int(neighbours_grid[x, y]) - sum(discovered_grid[n] == 1 for n in neighbours)
+    assert constraints == expected
+
+
+@pytest.mark.parametrize('kind', KINDS)
+def test_batch_engine(kind: str) -> None:
+    rng = np.random.default_rng(3)
+    n = 8
+    engine = Engine.BatchEngine(n, GRID_SIZE, 15, seed=4, topology=kind)
+    xs, ys = rng.integers(GRID_SIZE[0], size=n), rng.integers(GRID_SIZE[1], size=n)
+    engine.reset(xs, ys)
+    grids = engine.grid.copy()
+    topology = get_topology(kind, GRID_SIZE)
+    discovered = [GameLogic.create_discovered_grid(grid) for grid in grids]
+    for board, (x, y) in enumerate(zip(xs.tolist(), ys.tolist())):
+        assert grids[board][x, y] == 0 # The first cell is kept free of mines
+        GameLogic.discover_cell(grids[board], engine.neighbours_grid[board], discovered[board], x, y, topology=topology)
+
+    for _ in range(20):
+        xs, ys = rng.integers(GRID_SIZE[0], size=n), rng.integers(GRID_SIZE[1], size=n)
+        finished = engine.finished.copy()
+        engine.step(np.full(n, Engine.DISCOVER), xs, ys)
+        for board, (x, y) in enumerate(zip(xs.tolist(), ys.tolist())):
+            if not finished[board]:
+                GameLogic.discover_cell(grids[board], engine.neighbours_grid[board], discovered[board], x, y, topology=topology)
+        assert np.array_equal(engine.discovered_grid, np.stack(discovered))
@@ -0,0 +1,62 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+from scripts.bots import random_bot
+from scripts.engine import DISCOVER, FLAG
+import scripts.tournament as Tournament
+
+
+BOTS = ['scripts.bots:random_bot', 'scripts.bots:SolverBot']
+
+
+def results(workers: int) -> list[dict]:
+    output = io.StringIO()
+    Tournament.run(BOTS, 6, (9, 9), 10, 42, workers, output)
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    for line in lines:
+        del line['time_per_move']
+    return lines
+
+
+def test_reproducible() -> None:
+    # The results only depend on the seed, not on the number of workers
+    single = results(1)
+    assert len(single) == 12
+    assert single == results(2)
+    assert [(r['bot'], r['game']) for r in single] == [(bot, game) for bot in BOTS for game in range(6)]
+
+
+def test_seeds() -> None:
+    grid_seed, bot_seed = Tournament.game_seeds(0, 3)
+    assert grid_seed.generate_state(4).tolist() == Tournament.game_seeds(0, 3)[0].generate_state(4).tolist()
+    assert grid_seed.generate_state(4).tolist() != bot_seed.generate_state(4).tolist()
+    assert grid_seed.generate_state(4).tolist() != Tournament.game_seeds(0, 4)[0].generate_state(4).tolist()
+
+
+def test_solver_bot_wins() -> None:
+    wins = sum(Tournament.play_game('scripts.bots:SolverBot', game, (9, 9), 10, 0)['won'] for game in range(20))
+    assert wins >= 12 # Beginner grids are mostly won without guessing
+
+
+def test_random_bot_unflags() -> None:
+    rng = np.random.default_rng(0)
+    discovered_grid = np.array([[2, 1], [1, 2]])
+    action, x, y = random_bot(np.full((2, 2), -2), discovered_grid, 2, rng)
+    assert action == FLAG and discovered_grid[x, y] == 1
+    discovered_grid[x, y] = 0
+    assert random_bot(np.full((2, 2), -2), discovered_grid, 2, rng) == (DISCOVER, x, y)
+
+
+def test_wilson_interval() -> None:
+    assert Tournament.wilson_interval(0, 0) == (0., 1.)
+    low, high = Tournament.wilson_interval(50, 100)
+    assert low == pytest.approx(.404, abs=1e-3) and high == pytest.approx(.596, abs=1e-3)
+    assert Tournament.wilson_interval(10, 10)[1] == 1.
+
+
+def test_wrong_spec() -> None:
+    with pytest.raises(ValueError):
+        Tournament.load_bot('scripts.bots')